@@ -0,0 +1,61 @@
+"""add fetch_runs / fetch_shards (SKIP LOCKED work queue)
+
+Revision ID: 3b8e51c0d7fa
+Revises: 7d4f0b91c2a6
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision: str = "3b8e51c0d7fa"
+down_revision: Union[str, Sequence[str], None] = "7d4f0b91c2a6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "fetch_runs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("shard_count", sa.Integer(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_table(
+        "fetch_shards",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "run_id",
+            sa.Integer(),
+            sa.ForeignKey("fetch_runs.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("domains", postgresql.JSONB(), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("claimed_by", sa.String(length=100), nullable=True),
+        sa.Column("claimed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("result", postgresql.JSONB(), nullable=True),
+    )
+    op.create_index("ix_fetch_shards_run_id", "fetch_shards", ["run_id"])
+    op.create_index("ix_fetch_shards_status_id", "fetch_shards", ["status", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_fetch_shards_status_id", table_name="fetch_shards")
+    op.drop_index("ix_fetch_shards_run_id", table_name="fetch_shards")
+    op.drop_table("fetch_shards")
+    op.drop_table("fetch_runs")
@@ -0,0 +1,35 @@
+"""add ranking_runs (input fingerprint per fetch_cycle run)
+
+Revision ID: 7d4f0b91c2a6
+Revises: e2c33a2a4db1
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "7d4f0b91c2a6"
+down_revision: Union[str, Sequence[str], None] = "e2c33a2a4db1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ranking_runs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("computed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("fingerprint", sa.String(length=64), nullable=False),
+        sa.Column("last_verified_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("ticker_count", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_ranking_runs_computed_at", "ranking_runs", ["computed_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ranking_runs_computed_at", table_name="ranking_runs")
+    op.drop_table("ranking_runs")
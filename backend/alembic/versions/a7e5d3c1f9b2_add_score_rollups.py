@@ -0,0 +1,53 @@
+"""add score_rollups (hourly/daily score and rank OHLC per ticker)
+
+Backfilled from the raw ranking_results still on disk; from then on every
+ranking write maintains its buckets (app/services/rollups.py).
+
+Revision ID: a7e5d3c1f9b2
+Revises: f3b7c2d9a1e4
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "a7e5d3c1f9b2"
+down_revision: Union[str, Sequence[str], None] = "f3b7c2d9a1e4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    from app.services.rollups import backfill_rollups
+
+    stamp = sa.DateTime(timezone=True)
+    op.create_table(
+        "score_rollups",
+        sa.Column("ticker", sa.String(length=10), nullable=False),
+        sa.Column("resolution", sa.String(length=8), nullable=False),
+        sa.Column("bucket", stamp, nullable=False),
+        sa.Column("domain", sa.String(length=50), nullable=False),
+        sa.Column("samples", sa.Integer(), nullable=False),
+        sa.Column("first_at", stamp, nullable=False),
+        sa.Column("last_at", stamp, nullable=False),
+        *(
+            sa.Column(f"score_{part}", sa.Float(), nullable=False)
+            for part in ("open", "high", "low", "close", "mean")
+        ),
+        *(
+            sa.Column(f"rank_{part}", sa.Integer(), nullable=False)
+            for part in ("open", "high", "low", "close")
+        ),
+        sa.Column("rank_mean", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("ticker", "resolution", "bucket"),
+    )
+    # ranking_results has no keyframe column yet: every stored run is complete
+    backfill_rollups(op.get_bind(), full_runs_only=True)
+
+
+def downgrade() -> None:
+    op.drop_table("score_rollups")
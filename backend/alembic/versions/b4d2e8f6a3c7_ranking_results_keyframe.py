@@ -0,0 +1,39 @@
+"""ranking_results.keyframe for change-only ranking storage
+
+Existing rows are full runs, so they all become keyframes. The partial index
+finds each domain's latest keyframe (app/services/ranking_store.py).
+
+Revision ID: b4d2e8f6a3c7
+Revises: a7e5d3c1f9b2
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "b4d2e8f6a3c7"
+down_revision: Union[str, Sequence[str], None] = "a7e5d3c1f9b2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "ranking_results",
+        sa.Column("keyframe", sa.Boolean(), server_default=sa.true(), nullable=False),
+    )
+    op.create_index(
+        "ix_ranking_results_domain_keyframe",
+        "ranking_results",
+        ["domain", "computed_at"],
+        postgresql_where=sa.text("keyframe"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ranking_results_domain_keyframe", table_name="ranking_results")
+    op.drop_column("ranking_results", "keyframe")
@@ -0,0 +1,29 @@
+"""add ranking_runs.domain_fingerprints (per-domain input hashes)
+
+Revision ID: c5a2d8e94f13
+Revises: 3b8e51c0d7fa
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision: str = "c5a2d8e94f13"
+down_revision: Union[str, Sequence[str], None] = "3b8e51c0d7fa"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "ranking_runs", sa.Column("domain_fingerprints", postgresql.JSONB(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("ranking_runs", "domain_fingerprints")
@@ -0,0 +1,43 @@
+"""add pipeline_runs (per-run performance ledger)
+
+Revision ID: d8f1a4c6b2e0
+Revises: c5a2d8e94f13
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision: str = "d8f1a4c6b2e0"
+down_revision: Union[str, Sequence[str], None] = "c5a2d8e94f13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pipeline_runs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("job", sa.String(length=32), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("stage_seconds", postgresql.JSONB(), nullable=False),
+        sa.Column("tickers_attempted", sa.Integer(), nullable=False),
+        sa.Column("tickers_succeeded", sa.Integer(), nullable=False),
+        sa.Column("tickers_failed", sa.Integer(), nullable=False),
+        sa.Column("bytes_downloaded", sa.BigInteger(), nullable=False),
+        sa.Column("rows_inserted", sa.Integer(), nullable=False),
+        sa.Column("peak_rss_bytes", sa.BigInteger(), nullable=True),
+    )
+    op.create_index("ix_pipeline_runs_job_started_at", "pipeline_runs", ["job", "started_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_pipeline_runs_job_started_at", table_name="pipeline_runs")
+    op.drop_table("pipeline_runs")
@@ -0,0 +1,28 @@
+"""ranking_results (domain, computed_at) index for per-domain latest runs
+
+Revision ID: e2c33a2a4db1
+Revises: 05_02_user_domains
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "e2c33a2a4db1"
+down_revision: Union[str, Sequence[str], None] = "05_02_user_domains"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_ranking_results_domain_computed_at",
+        "ranking_results",
+        ["domain", "computed_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ranking_results_domain_computed_at", table_name="ranking_results")
@@ -0,0 +1,107 @@
+"""range-partition ranking_results and score_snapshots, BRIN time indexes
+
+Each table is rebuilt as a RANGE-partitioned parent (PARTITION_INTERVAL) with
+a DEFAULT partition; partitions covering the existing rows are created before
+the rows are copied over, so nothing lands in the default. The id sequences
+carry over. Later partitions and retention are handled by
+partition_maintenance() (app/services/partitions.py).
+
+Revision ID: f3b7c2d9a1e4
+Revises: d8f1a4c6b2e0
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from sqlalchemy import text
+
+from alembic import op
+
+revision: str = "f3b7c2d9a1e4"
+down_revision: Union[str, Sequence[str], None] = "d8f1a4c6b2e0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> (partition column, b-tree indexes to rebuild on the parent, time b-tree replaced by BRIN)
+TABLES = {
+    "ranking_results": (
+        "computed_at",
+        {
+            "ix_ranking_results_ticker": "ticker",
+            "ix_ranking_results_domain": "domain",
+            "ix_ranking_results_domain_computed_at": "domain, computed_at",
+        },
+        "ix_ranking_results_computed_at",
+    ),
+    "score_snapshots": (
+        "fetched_at",
+        {"ix_score_snapshots_ticker": "ticker"},
+        "ix_score_snapshots_fetched_at",
+    ),
+}
+
+
+def _is_partitioned(conn, table: str) -> bool | None:
+    """None when *table* does not exist (create_all builds it partitioned later)."""
+    # relkind is a "char"; asyncpg (alembic's driver here) returns that as bytes
+    kind = conn.execute(
+        text("SELECT relkind::text FROM pg_class WHERE oid = to_regclass(:t)"), {"t": table}
+    ).scalar()
+    return None if kind is None else kind == "p"
+
+
+def upgrade() -> None:
+    from app.config import settings
+    from app.services.partitions import create_partitions, period_end
+
+    conn = op.get_bind()
+    for table, (column, indexes, time_index) in TABLES.items():
+        if _is_partitioned(conn, table) is not False:
+            continue
+        old = f"{table}_unpartitioned"
+        op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+        op.execute(f"ALTER TABLE {old} RENAME CONSTRAINT {table}_pkey TO {old}_pkey")
+        for name in [*indexes, time_index]:
+            op.execute(f"DROP INDEX IF EXISTS {name}")
+        op.execute(
+            f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS, PRIMARY KEY (id, {column})) "
+            f"PARTITION BY RANGE ({column})"
+        )
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+        for name, columns in indexes.items():
+            op.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+        op.execute(f"CREATE INDEX {time_index}_brin ON {table} USING brin ({column})")
+
+        oldest, newest = conn.execute(text(f"SELECT min({column}), max({column}) FROM {old}")).one()
+        if oldest is not None:
+            interval = settings.partition_interval
+            end = max(newest, datetime.now(timezone.utc))
+            create_partitions(conn, table, oldest, period_end(end, interval), interval)
+        op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+        op.execute(f"DROP TABLE {old}")
+
+
+def downgrade() -> None:
+    # Partitions detached by retention are plain tables by then and are not folded back in
+    conn = op.get_bind()
+    for table, (column, indexes, time_index) in TABLES.items():
+        if not _is_partitioned(conn, table):
+            continue
+        partitioned = f"{table}_partitioned"
+        op.execute(f"ALTER TABLE {table} RENAME TO {partitioned}")
+        for name in indexes:
+            op.execute(f"DROP INDEX IF EXISTS {name}")
+        op.execute(f"DROP INDEX IF EXISTS {time_index}_brin")
+        op.execute(f"ALTER TABLE {partitioned} DROP CONSTRAINT {table}_pkey")
+        op.execute(
+            f"CREATE TABLE {table} (LIKE {partitioned} INCLUDING DEFAULTS, PRIMARY KEY (id))"
+        )
+        op.execute(f"INSERT INTO {table} SELECT * FROM {partitioned}")
+        op.execute(f"ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id")
+        op.execute(f"DROP TABLE {partitioned}")
+        for name, columns in indexes.items():
+            op.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+        op.execute(f"CREATE INDEX {time_index} ON {table} ({column})")
@@ -0,0 +1,288 @@
+"""
+bench.py — End-to-end pipeline benchmarks on synthetic universes.
+
+  python -m app.bench                      # 50, 500 and 5,000 tickers vs the baseline
+  python -m app.bench --sizes 50000        # the 50k universe (tens of minutes)
+  python -m app.bench --update-baseline    # record this machine's numbers as the baseline
+  python -m app.bench --no-db              # compute stages only, no Postgres needed
+
+Each size is served by an in-memory ReplayProvider over synthetic_market(), so
+nothing touches the network. Stages, timed separately:
+
+  history    replay download, slim_panel + extract_latest per pipeline chunk
+  factors    compute-backend price factors + fundamentals per chunk
+  long_term  1-year closes -> long-term scores
+  rank       rank_domain() per domain
+  persist    the scheduler's RankingResult inserts
+  snapshot   snapshot_job() over the persisted run
+  api        GET /api/rankings and /api/rankings/{domain} through the ASGI app
+  cycle      one complete local fetch_cycle on the same universe
+
+Database stages run in a scratch schema of DATABASE_URL (a local Postgres),
+dropped afterwards. Peak memory is the stage's highest resident set size
+above the RSS it started with (sampled from /proc, so Linux only).
+The run is compared against benchmarks/baseline.json; a stage slower or
+hungrier than its baseline by more than --tolerance fails the run (exit 1).
+Baselines are machine-specific: record one per perf box.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import httpx
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from . import scheduler
+from .config import settings
+from .database import Base, get_db
+from .main import app
+from .replay import load_universe
+from .services import market_data
+from .services.compute_pool import get_backend
+from .services.data_fetcher import extract_latest, fetch_financial_ratio, slim_panel
+from .services.fetch_queue import plan_shards
+from .services.market_data import ReplayProvider, synthetic_market
+from .services.ranking_engine import rank_domain
+from .services.run_ledger import RssSampler
+from .services.snapshot_service import snapshot_job
+
+BASELINE = Path(__file__).resolve().parent.parent / "benchmarks" / "baseline.json"
+DEFAULT_SIZES = (50, 500, 5000)
+# Differences below these are noise, whatever the ratio
+MIN_SECONDS = 0.05
+MIN_MIB = 5.0
+
+
+@contextmanager
+def _stage(results: dict[str, dict], sampler: RssSampler, name: str):
+    base = sampler.reset()
+    start = time.perf_counter()
+    yield
+    seconds = time.perf_counter() - start
+    peak = max(sampler.peak, sampler.rss())
+    results[name] = {
+        "seconds": round(seconds, 4),
+        "peak_mib": round((peak - base) / 2**20, 2),
+    }
+    print(f"  {name:<10} {seconds:9.3f}s  {results[name]['peak_mib']:9.1f} MiB", flush=True)
+
+
+class _ScratchDatabase:
+    """Sync and async engines bound to a throwaway schema of DATABASE_URL."""
+
+    def __init__(self) -> None:
+        from . import models  # noqa: F401
+        from .models import (  # noqa: F401
+            daily_snapshot,
+            fetch_queue,
+            pipeline_run,
+            ranking_result,
+            ranking_run,
+            user_domain,
+            user_preference,
+        )
+
+        self.schema = f"bench_{os.getpid()}"
+        self._admin = create_engine(settings.sync_database_url)
+        with self._admin.begin() as conn:
+            conn.execute(text(f"CREATE SCHEMA {self.schema}"))
+        self.sync = create_engine(
+            settings.sync_database_url,
+            connect_args={"options": f"-csearch_path={self.schema}"},
+        )
+        Base.metadata.create_all(self.sync)
+        self.tables = [t.name for t in Base.metadata.sorted_tables]
+
+    def reset(self) -> None:
+        with self.sync.begin() as conn:
+            conn.execute(text(f"TRUNCATE {', '.join(self.tables)} RESTART IDENTITY CASCADE"))
+
+    def async_sessions(self) -> async_sessionmaker:
+        engine = create_async_engine(
+            settings.database_url,
+            connect_args={"server_settings": {"search_path": self.schema}},
+        )
+        return async_sessionmaker(engine, expire_on_commit=False)
+
+    def drop(self) -> None:
+        self.sync.dispose()
+        with self._admin.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {self.schema} CASCADE"))
+        self._admin.dispose()
+
+
+async def _call_api(sessions: async_sessionmaker, domain: str) -> None:
+    async def bench_db():
+        async with sessions() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = bench_db
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for path in ("/api/rankings", f"/api/rankings/{domain}"):
+                response = await client.get(path)
+                response.raise_for_status()
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        await sessions.kw["bind"].dispose()
+
+
+def run_size(size: int, db: _ScratchDatabase | None, sampler: RssSampler) -> dict[str, dict]:
+    print(f"{size} tickers", flush=True)
+    panel, fundamentals, universe = synthetic_market(tickers=size, days=300)
+    provider = ReplayProvider(panel, fundamentals)
+    groups: dict[str, list[str]] = {}
+    for row in universe.itertuples(index=False):
+        groups.setdefault(row.domain, []).append(row.ticker)
+    chunks = plan_shards(groups, settings.pipeline_chunk_size)
+    market_data._provider = provider
+    results: dict[str, dict] = {}
+
+    with _stage(results, sampler, "history"):
+        downloaded = []
+        for chunk in chunks:
+            tickers = [t for group in chunk.values() for t in group]
+            raw = provider.history(tickers)
+            downloaded.append((chunk, slim_panel(raw, tickers), extract_latest(raw, tickers)))
+
+    with _stage(results, sampler, "factors"):
+        factors: dict[str, dict[str, dict]] = {}
+        for chunk, history, _ in downloaded:
+            price = get_backend().price_factors(history, chunk)
+            for name, group in chunk.items():
+                factors[name] = {
+                    t: {**price[name][t], "financial_ratio": fetch_financial_ratio(t)}
+                    for t in group
+                }
+
+    with _stage(results, sampler, "long_term"):
+        tickers = list(universe["ticker"])
+        closes = slim_panel(provider.history(tickers, "1y"), tickers, dtype="float64")["Close"]
+        long_term = get_backend().long_term_scores(closes)
+
+    with _stage(results, sampler, "rank"):
+        ranked = {name: rank_domain(domain_factors) for name, domain_factors in factors.items()}
+
+    if db is None:
+        return results
+    db.reset()
+    with Session(db.sync) as session:
+        load_universe(session, universe.to_dict("records"))
+
+    with _stage(results, sampler, "persist"):
+        computed_at = datetime.now(timezone.utc)
+        with Session(db.sync) as session:
+            for name, scores in ranked.items():
+                scheduler._persist_rankings(session, name, scores, long_term, computed_at)
+            session.commit()
+
+    with _stage(results, sampler, "snapshot"):
+        snapshot_job(snap_date=date.today())
+
+    with _stage(results, sampler, "api"):
+        asyncio.run(_call_api(db.async_sessions(), next(iter(groups))))
+
+    with _stage(results, sampler, "cycle"):
+        scheduler._run_local_cycle()
+    return results
+
+
+def compare(current: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+    """Stages (per size) slower or hungrier than baseline by more than *tolerance*."""
+    regressions = []
+    for size, stages in current.items():
+        for name, now in stages.items():
+            before = baseline.get(size, {}).get(name)
+            if before is None:
+                continue
+            checks = (("seconds", MIN_SECONDS, "s"), ("peak_mib", MIN_MIB, " MiB"))
+            for key, floor, unit in checks:
+                if now[key] > before[key] * (1 + tolerance) and now[key] - before[key] > floor:
+                    regressions.append(
+                        f"{size} tickers / {name}: {now[key]}{unit} vs baseline "
+                        f"{before[key]}{unit} (+{now[key] / max(before[key], 1e-9) - 1:.0%})"
+                    )
+    return regressions
+
+
+def _environment() -> dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "compute_backend": settings.compute_backend,
+        "pipeline_chunk_size": settings.pipeline_chunk_size,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Pipeline benchmarks on synthetic universes.")
+    parser.add_argument(
+        "--sizes",
+        type=lambda v: [int(s) for s in v.split(",")],
+        default=list(DEFAULT_SIZES),
+        help="comma-separated universe sizes (default 50,500,5000; 50000 is available)",
+    )
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown ratio")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--no-db", action="store_true", help="skip the Postgres stages")
+    parser.add_argument("--output", type=Path, help="also write this run's JSON here")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    db = None if args.no_db else _ScratchDatabase()
+    engine, provider = scheduler._sync_engine, market_data._provider
+    if db is not None:
+        scheduler._sync_engine = db.sync
+    sampler = RssSampler()
+    sampler.start()
+    try:
+        current = {str(size): run_size(size, db, sampler) for size in args.sizes}
+    finally:
+        sampler.stop()
+        scheduler._sync_engine, market_data._provider = engine, provider
+        if db is not None:
+            db.drop()
+
+    run = {"environment": _environment(), "results": current}
+    if args.output:
+        args.output.write_text(json.dumps(run, indent=2) + "\n")
+    if args.update_baseline:
+        if args.baseline.exists():
+            recorded = json.loads(args.baseline.read_text())
+            run["results"] = {**recorded.get("results", {}), **current}
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(run, indent=2) + "\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline}; run with --update-baseline to record one")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("environment") != _environment():
+        print(f"note: baseline recorded on {baseline.get('environment')}")
+    regressions = compare(current, baseline.get("results", {}), args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print(f"no regressions beyond {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
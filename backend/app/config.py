@@ -1,12 +1,132 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     database_url: str
     fetch_interval_minutes: int = 5
+    # "interval": fetch every fetch_interval_minutes around the clock, snapshot at 21:00 UTC
+    # "market": follow the NYSE calendar (dense in regular hours, sparse pre/post-market,
+    # nothing on closed days) and snapshot right after the final post-close cycle
+    schedule_mode: Literal["interval", "market"] = "interval"
+    # Pre- and post-market fetch interval in "market" mode
+    market_sparse_minutes: int = 30
     supabase_url: str
     supabase_anon_key: str
     supabase_jwt_secret: str
+    # Cross-check every incremental re-rank against a full rank_domain() (slow; for debugging)
+    ranking_verify_incremental: bool = False
+    # How often the scheduler checks stocks.domain_id for membership changes
+    membership_poll_seconds: int = 15
+    # Run the scheduler elector in API processes; set false when `python -m app.worker` runs it
+    run_scheduler: bool = True
+    # Postgres advisory lock key shared by every process competing to run the scheduler
+    scheduler_lock_key: int = 0x53544B52
+    # How often followers retry the lock (and the leader checks its connection)
+    scheduler_poll_seconds: float = 2.0
+    # fetch_cycle pipeline: tickers per download chunk (whole domains), threads per stage
+    # and items buffered between stages
+    pipeline_chunk_size: int = 50
+    pipeline_download_workers: int = 2
+    pipeline_factor_workers: int = 2
+    pipeline_rank_workers: int = 1
+    pipeline_persist_workers: int = 2
+    pipeline_queue_size: int = 4
+    # Retry job for tickers missing a price or factor: poll interval, backoff base and cap,
+    # and attempts before a ticker is parked until a full cycle succeeds for it
+    retry_poll_seconds: int = 10
+    retry_base_seconds: float = 30.0
+    retry_max_seconds: float = 900.0
+    retry_max_attempts: int = 6
+    # "process" runs factor / long-term / trend math in a process pool (shared-memory
+    # panels); worth it once chunks reach hundreds of tickers (raise PIPELINE_CHUNK_SIZE)
+    compute_backend: Literal["thread", "process"] = "thread"
+    compute_workers: int = 0  # 0 = os.cpu_count()
+    compute_min_tickers: int = 100  # smaller batches run inline
+    # "local": the scheduler leader fetches and ranks in-process
+    # "queue": the leader enqueues domain shards for `python -m app.worker` processes
+    fetch_mode: Literal["local", "queue"] = "local"
+    # Target tickers per queue shard (whole domains are never split)
+    queue_shard_size: int = 50
+    # A claimed shard not completed within this many seconds is handed to another worker
+    queue_claim_timeout_seconds: int = 300
+    queue_max_attempts: int = 3
+    # Idle workers re-check the queue this often
+    queue_poll_seconds: float = 2.0
+    # Market-data provider gateway: shared request budget (one token per ticker requested),
+    # concurrent-call ceiling, latency multiple over baseline that counts as overload, and
+    # the circuit breaker's consecutive-failure threshold and open period
+    provider_rate_per_second: float = 20.0
+    provider_burst: float = 100.0
+    provider_max_concurrency: int = 8
+    provider_latency_tolerance: float = 2.0
+    provider_breaker_threshold: int = 5
+    provider_breaker_reset_seconds: float = 60.0
+    # "replay" serves recorded panels from REPLAY_PATH instead of calling Yahoo (offline
+    # benchmarks / CI); REPLAY_SPEED bars per second (0 = frozen at the last bar) and a
+    # fixed per-call delay standing in for upstream latency
+    market_data_provider: Literal["yfinance", "replay"] = "yfinance"
+    replay_path: str = ""
+    replay_speed: float = 0.0
+    replay_latency_ms: float = 0.0
+    # Run ledger: warn when a fetch_cycle / snapshot_job stage is this much slower (0.5 = 50%)
+    # than its median over the trailing RUN_BASELINE_DAYS of successful runs
+    run_regression_threshold: float = 0.5
+    run_baseline_days: int = 7
+    # Fraction of requests / jobs traced (0 = tracing off) and the JSON-lines file spans
+    # are appended to; view with `python -m app.traces`
+    trace_sample_rate: float = 0.0
+    trace_path: str = "traces.jsonl"
+    # On-demand profiles (POST /api/admin/profiles) are written here — share it between the
+    # API and worker processes — with one stack sample every PROFILE_INTERVAL_MS
+    profile_dir: str = "profiles"
+    profile_interval_ms: float = 5.0
+    # Statements slower than this are kept (last SLOW_QUERY_BUFFER) with an EXPLAIN plan,
+    # at most SLOW_QUERY_EXPLAINS_PER_MINUTE plans; 0 turns the slow-query log off
+    slow_query_ms: float = 500.0
+    slow_query_buffer: int = 200
+    slow_query_explains_per_minute: int = 6
+    # /api/health/ready reuses its database probe for this long; a probe slower than
+    # HEALTH_PROBE_TIMEOUT_SECONDS counts as not ready
+    health_cache_seconds: float = 10.0
+    health_probe_timeout_seconds: float = 2.0
+    # ranking_results / score_snapshots partitions: one per "day" or "month", created
+    # PARTITION_PREMAKE intervals ahead. Partitions older than the retention days
+    # (0 = keep forever) are "detach"ed (left as plain tables) or "drop"ped. Charts read
+    # score_rollups, which outlive the raw rankings, so RANKING_RETENTION_DAYS can be short
+    partition_interval: Literal["day", "month"] = "day"
+    partition_premake: int = 3
+    ranking_retention_days: int = 0
+    snapshot_retention_days: int = 0
+    partition_retention_mode: Literal["detach", "drop"] = "detach"
+    # "full" stores every ticker's ranking row on every run; "delta" stores a domain keyframe
+    # when its tickers change or after RANKING_KEYFRAME_EVERY change-only writes, and in
+    # between only rows whose rank changed or whose values moved by more than
+    # RANKING_DELTA_EPSILON (relative). Reads rebuild full runs either way
+    ranking_storage: Literal["full", "delta"] = "full"
+    ranking_keyframe_every: int = 12
+    ranking_delta_epsilon: float = 0.001
+    # API and scheduler engine pools: connections kept open, extra ones allowed under load,
+    # seconds to wait for a free one (waits show in db_pool_checkout_seconds), seconds before
+    # a connection is replaced (-1 = never) and a liveness check on every checkout
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
+    # Prepared statements cached per API connection. DB_PGBOUNCER=true when DATABASE_URL
+    # points at a transaction-pooling PgBouncer: no caching, unique statement names
+    db_statement_cache_size: int = 100
+    db_pgbouncer: bool = False
+    # Read-only routes (rankings, history, domains) use this database when set. If it can't
+    # hand out a connection (connect timeout REPLICA_CONNECT_TIMEOUT_SECONDS) they read from
+    # the primary for REPLICA_RETRY_SECONDS before trying it again
+    database_replica_url: str | None = None
+    replica_connect_timeout_seconds: float = 2.0
+    replica_retry_seconds: float = 30.0
+    # Supabase user ids (JWT "sub") allowed to call /api/admin endpoints
+    admin_user_ids: list[str] = []
 
     @property
     def sync_database_url(self) -> str:
@@ -1,12 +1,68 @@
+import logging
+import time
+from uuid import uuid4
+
+from fastapi import Depends
 from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import DeclarativeBase
 
 from .config import settings
+from .services.metrics import REPLICA_FALLBACKS, instrument_engine
+from .services.slow_queries import watch_slow_queries
+from .services.tracing import trace_engine
+
+logger = logging.getLogger(__name__)
+
+
+def pool_options() -> dict:
+    """DB_POOL_* settings, shared by the API engines and the scheduler's sync engine."""
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
 
-engine = create_async_engine(settings.database_url, echo=False)
+def _asyncpg_args() -> dict:
+    if settings.db_pgbouncer:
+        # A transaction-mode pooler hands each transaction to any server connection, so
+        # nothing prepared on one can be reused and every statement name must be unique
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return {"prepared_statement_cache_size": settings.db_statement_cache_size}
+
+
+def _api_engine(url: str, name: str, **connect_args) -> AsyncEngine:
+    engine = create_async_engine(
+        url, echo=False, connect_args={**_asyncpg_args(), **connect_args}, **pool_options()
+    )
+    instrument_engine(engine.sync_engine, name)
+    trace_engine(engine.sync_engine)
+    watch_slow_queries(engine.sync_engine, name)
+    return engine
+
+
+engine = _api_engine(settings.database_url, "api")
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
+replica_engine: AsyncEngine | None = None
+if settings.database_replica_url:
+    replica_engine = _api_engine(
+        settings.database_replica_url, "replica", timeout=settings.replica_connect_timeout_seconds
+    )
+
 
 class Base(DeclarativeBase):
     pass
@@ -17,6 +73,52 @@ async def get_db() -> AsyncSession:
         yield session
 
 
+class _ReadReplica:
+    """Replica sessions for read-only routes; after a failed checkout the replica is
+    skipped for REPLICA_RETRY_SECONDS and those routes read from the primary."""
+
+    def __init__(self, engine: AsyncEngine | None) -> None:
+        self.sessions = (
+            async_sessionmaker(engine, expire_on_commit=False) if engine is not None else None
+        )
+        self.down_until = 0.0
+
+    async def session(self) -> AsyncSession | None:
+        if self.sessions is None:
+            return None
+        if time.monotonic() < self.down_until:
+            REPLICA_FALLBACKS.inc()
+            return None
+        session = self.sessions()
+        try:
+            await session.connection()  # check out now, while falling back is still possible
+        except (OSError, SQLAlchemyError) as exc:
+            await session.close()
+            self.down_until = time.monotonic() + settings.replica_retry_seconds
+            REPLICA_FALLBACKS.inc()
+            logger.warning(
+                "read replica unavailable (%s); reading from the primary for %.0fs",
+                exc,
+                settings.replica_retry_seconds,
+            )
+            return None
+        return session
+
+
+read_replica = _ReadReplica(replica_engine)
+
+
+async def get_read_db(primary: AsyncSession = Depends(get_db)) -> AsyncSession:
+    """Session for read-only routes: the replica (DATABASE_REPLICA_URL) when set and
+    reachable, else *primary*, which only connects if it is used."""
+    session = await read_replica.session()
+    if session is None:
+        yield primary
+        return
+    async with session:
+        yield session
+
+
 async def seed_db():
     """Insert seed domains and stocks if they don't already exist."""
     from .models.stock import Domain, Stock
@@ -0,0 +1,135 @@
+"""
+leader.py — Single-leader scheduler election via a Postgres advisory lock.
+
+Every API worker (and any `python -m app.worker` process) runs a LeaderElector.
+Each one polls pg_try_advisory_lock() on its own dedicated connection; the one
+that gets the lock starts the APScheduler instance, everyone else stays idle.
+The lock is session-scoped, so when the leader process dies or its connection
+drops, Postgres releases it and another elector takes over on its next poll.
+
+Stepping down waits for running jobs before closing the session, so the next
+leader's first cycle never overlaps this one's last. (A leader whose session
+drops has lost the lock already; the successor's one-poll start delay covers
+the common case, and the old leader still finishes its jobs before it can
+compete for the lock again.)
+
+The lock connection must reach Postgres directly (or through a session-mode
+pooler): transaction-mode poolers do not keep session advisory locks.
+"""
+
+import logging
+import threading
+from collections.abc import Callable
+
+import psycopg2
+from apscheduler.schedulers.base import BaseScheduler
+
+from .config import settings
+from .services.health import health_state
+
+logger = logging.getLogger(__name__)
+
+# libpq keepalives so a half-open connection to a dead peer is noticed in seconds
+_KEEPALIVE_KWARGS = {
+    "keepalives": 1,
+    "keepalives_idle": 5,
+    "keepalives_interval": 2,
+    "keepalives_count": 3,
+}
+
+
+def _dsn() -> str:
+    return settings.sync_database_url.replace("postgresql+psycopg2", "postgresql", 1)
+
+
+class LeaderElector:
+    """Run the scheduler built by *factory* only while holding the advisory lock."""
+
+    def __init__(
+        self,
+        factory: Callable[[], BaseScheduler],
+        lock_key: int | None = None,
+        poll_seconds: float | None = None,
+    ) -> None:
+        self._factory = factory
+        self._lock_key = settings.scheduler_lock_key if lock_key is None else lock_key
+        self._poll = settings.scheduler_poll_seconds if poll_seconds is None else poll_seconds
+        self._conn = None
+        self._scheduler: BaseScheduler | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        # stop() and the poll thread can both step down; the second waits for the first
+        self._step_lock = threading.Lock()
+
+    @property
+    def is_leader(self) -> bool:
+        return self._scheduler is not None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="leader-elector", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the scheduler (if leading), wait for its running jobs and release the lock."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self._poll + 5)
+        self._step_down()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.is_leader:
+                    self._check_lock()
+                else:
+                    self._try_acquire()
+            except psycopg2.Error as exc:
+                if self.is_leader:
+                    logger.error("leader: lost lock connection (%s), stopping scheduler", exc)
+                else:
+                    logger.warning("leader: lock connection failed: %s", exc)
+                self._step_down()
+            self._stop.wait(self._poll)
+
+    def _connect(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg2.connect(
+                _dsn(), application_name="stocks-scheduler-lock", **_KEEPALIVE_KWARGS
+            )
+            self._conn.autocommit = True
+        return self._conn
+
+    def _try_acquire(self) -> None:
+        with self._connect().cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (self._lock_key,))
+            acquired = cur.fetchone()[0]
+        if not acquired:
+            return
+        # A previous leader that lost its connection notices within one poll; wait that
+        # long before starting so the two schedulers never overlap
+        if self._stop.wait(self._poll):
+            return
+        self._check_lock()
+        logger.info("leader: acquired scheduler lock %d, starting scheduler", self._lock_key)
+        scheduler = self._factory()
+        scheduler.start()
+        self._scheduler = scheduler
+
+    def _check_lock(self) -> None:
+        # A round trip proves the session (and with it the lock) is still alive
+        with self._conn.cursor() as cur:
+            cur.execute("SELECT 1")
+
+    def _step_down(self) -> None:
+        with self._step_lock:
+            scheduler, self._scheduler = self._scheduler, None
+            if scheduler is not None and scheduler.running:
+                scheduler.shutdown(wait=True)  # running jobs finish while the lock is held
+            if scheduler is not None:
+                health_state.clear()  # another process runs the jobs from now on
+            conn, self._conn = self._conn, None
+            if conn is not None and not conn.closed:
+                try:
+                    conn.close()  # ends the session, which releases the advisory lock
+                except psycopg2.Error:
+                    pass
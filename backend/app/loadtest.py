@@ -0,0 +1,421 @@
+"""
+loadtest.py — Seed realistic data volumes and drive concurrent API traffic.
+
+  python -m app.loadtest seed [--days 90] [--users 1000] [--runs-per-day 8] [--reset]
+  python -m app.loadtest run  [--base-url http://localhost:8000] [--users 1000]
+                              [--concurrency 50] [--duration 30] [--output report.json]
+
+`seed` fills DATABASE_URL (a disposable local Postgres) for the stocks already
+there (start the API once, or `python -m app.replay load`): N days of ranking
+runs and daily snapshots, M users with preferences and custom domains. Bulk
+tables are written with COPY. --reset empties those tables first.
+
+`run` signs HS256 test JWTs for the same users (ids are derived from the user
+index, so seed and run agree without sharing state) and replays a weighted mix
+of dashboard calls from --concurrency virtual users for --duration seconds. It
+reports count, errors, throughput and p50/p95/p99 latency per route. The
+server must share SUPABASE_JWT_SECRET (or pass --jwt-secret).
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import math
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from datetime import time as dtime
+
+import httpx
+import jwt
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.orm import Session, selectinload
+
+from .config import settings
+from .models.stock import Domain
+from .models.user_domain import UserDomain
+
+_USER_NAMESPACE = uuid.UUID("6f1c2d0e-3b7a-4e51-9a8c-2d4f6b1e7c90")
+
+# (route label, weight): what an open dashboard tab does, roughly
+MIX = (
+    ("GET /api/rankings", 45),
+    ("GET /api/history/{ticker}", 25),
+    ("GET /api/preferences", 15),
+    ("GET /api/domains/custom", 10),
+    ("PUT /api/preferences", 5),
+)
+
+_SEEDED_TABLES = (
+    "ranking_results",
+    "ranking_runs",
+    "daily_snapshots",
+    "user_domain_tickers",
+    "user_domains",
+    "user_preferences",
+)
+
+
+def user_id(index: int) -> uuid.UUID:
+    """Deterministic id of load-test user *index*."""
+    return uuid.uuid5(_USER_NAMESPACE, f"loadtest-user-{index}")
+
+
+def make_token(sub: uuid.UUID | str, secret: str, ttl_seconds: int = 3600) -> str:
+    """A Supabase-shaped HS256 access token that get_current_user() accepts."""
+    now = int(time.time())
+    claims = {
+        "sub": str(sub),
+        "aud": "authenticated",
+        "role": "authenticated",
+        "iat": now,
+        "exp": now + ttl_seconds,
+    }
+    return jwt.encode(claims, secret, algorithm="HS256")
+
+
+# ---------------------------------------------------------------------------
+# Data generator
+# ---------------------------------------------------------------------------
+
+
+def _copy(cursor, table: str, columns: tuple[str, ...], rows: list[tuple]) -> None:
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def _pg_array(values: list[str]) -> str:
+    return "{" + ",".join('"' + v.replace('"', '\\"') + '"' for v in values) + "}"
+
+
+def seed_database(
+    engine,
+    days: int = 90,
+    users: int = 1000,
+    runs_per_day: int = 8,
+    custom_domains: int = 3,
+    seed: int = 0,
+    reset: bool = False,
+) -> dict[str, int]:
+    """Write load-test volumes for the stocks in the database. Returns rows per table."""
+    rng = random.Random(seed)
+    with Session(engine) as session:
+        domains = session.execute(select(Domain).options(selectinload(Domain.stocks))).scalars()
+        groups = {d.name: (d.id, sorted(s.ticker for s in d.stocks)) for d in domains}
+    groups = {name: g for name, g in groups.items() if g[1]}
+    if not groups:
+        raise SystemExit("no stocks in the database: start the API once or run app.replay load")
+    tickers = [t for _, members in groups.values() for t in members]
+    counts = dict.fromkeys(_SEEDED_TABLES, 0)
+
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        if reset:
+            cur.execute(f"TRUNCATE {', '.join(_SEEDED_TABLES)} RESTART IDENTITY")
+
+        # Scores drift as a bounded random walk, so ranks and trends look like real runs
+        score = {t: rng.uniform(20, 80) for t in tickers}
+        daily_scores: dict[str, list[float]] = {t: [] for t in tickers}
+        first_day = date.today() - timedelta(days=days)
+        spacing = timedelta(minutes=390 / runs_per_day)
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            if day.weekday() >= 5:
+                continue
+            opened = datetime.combine(day, dtime(13, 30), tzinfo=timezone.utc)
+            results, runs, ranks = [], [], {}
+            for k in range(runs_per_day):
+                computed_at = opened + k * spacing
+                for t in tickers:
+                    score[t] = min(100.0, max(0.0, score[t] + rng.gauss(0, 2.5)))
+                for name, (_, members) in groups.items():
+                    ordered = sorted(members, key=score.__getitem__, reverse=True)
+                    for rank, t in enumerate(ordered, 1):
+                        ranks[t] = rank
+                        results.append(
+                            (
+                                t,
+                                name,
+                                round(score[t], 3),
+                                rank,
+                                round(rng.gauss(0.01, 0.05), 5),
+                                round(rng.gauss(0.0, 0.3), 5),
+                                round(rng.uniform(0.005, 0.05), 5),
+                                round(rng.gauss(0.0, 0.03), 5),
+                                round(-rng.uniform(5, 60), 2),
+                                round(rng.uniform(10, 90), 2),
+                                computed_at.isoformat(),
+                            )
+                        )
+                runs.append(
+                    (
+                        computed_at.isoformat(),
+                        f"{rng.getrandbits(256):064x}",
+                        computed_at.isoformat(),
+                        len(tickers),
+                    )
+                )
+            _copy(
+                cur,
+                "ranking_results",
+                (
+                    "ticker",
+                    "domain",
+                    "composite_score",
+                    "rank",
+                    "momentum",
+                    "volume_change",
+                    "volatility",
+                    "relative_strength",
+                    "financial_ratio",
+                    "long_term_score",
+                    "computed_at",
+                ),
+                results,
+            )
+            _copy(
+                cur,
+                "ranking_runs",
+                ("computed_at", "fingerprint", "last_verified_at", "ticker_count"),
+                runs,
+            )
+            snapshots = []
+            for name, (domain_id, members) in groups.items():
+                for t in members:
+                    history = daily_scores[t]
+                    history.append(score[t])
+                    slope = (history[-1] - history[-8]) / 7 if len(history) >= 8 else 0.0
+                    snapshots.append(
+                        (t, day.isoformat(), round(score[t], 3), ranks[t], domain_id, slope)
+                    )
+            _copy(
+                cur,
+                "daily_snapshots",
+                ("ticker", "snap_date", "composite_score", "rank", "domain_id", "trend_slope"),
+                snapshots,
+            )
+            counts["ranking_results"] += len(results)
+            counts["ranking_runs"] += len(runs)
+            counts["daily_snapshots"] += len(snapshots)
+
+        names = list(groups)
+        prefs = [
+            (str(uuid.uuid4()), str(user_id(i)), _pg_array(rng.sample(names, rng.randint(1, 5))))
+            for i in range(users)
+        ]
+        _copy(cur, "user_preferences", ("id", "user_id", "domains"), prefs)
+        counts["user_preferences"] = len(prefs)
+        raw.commit()
+    finally:
+        raw.close()
+
+    with Session(engine) as session:
+        owned = [
+            {"user_id": user_id(i), "name": f"Watchlist {n + 1}"}
+            for i in range(users)
+            for n in range(rng.randint(0, custom_domains))
+        ]
+        ids = (
+            session.scalars(insert(UserDomain).returning(UserDomain.id), owned).all()
+            if owned
+            else []
+        )
+        members = [
+            (domain_id, t)
+            for domain_id in ids
+            for t in rng.sample(tickers, min(len(tickers), rng.randint(3, 10)))
+        ]
+        if members:
+            cur = session.connection().connection.cursor()
+            _copy(cur, "user_domain_tickers", ("domain_id", "ticker"), members)
+        session.commit()
+    counts["user_domains"] = len(ids)
+    counts["user_domain_tickers"] = len(members)
+    return counts
+
+
+# ---------------------------------------------------------------------------
+# Load driver
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class RouteStats:
+    latencies: list[float] = field(default_factory=list)  # seconds, successful calls
+    errors: int = 0
+
+    def record(self, seconds: float, ok: bool) -> None:
+        if ok:
+            self.latencies.append(seconds)
+        else:
+            self.errors += 1
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of *values* (0 if empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+def summarize(stats: dict[str, RouteStats], elapsed: float) -> dict[str, dict]:
+    report = {}
+    everything = RouteStats()
+    for route, s in stats.items():
+        everything.latencies += s.latencies
+        everything.errors += s.errors
+    for route, s in [*stats.items(), ("total", everything)]:
+        report[route] = {
+            "count": len(s.latencies) + s.errors,
+            "errors": s.errors,
+            "rps": round((len(s.latencies) + s.errors) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(s.latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(s.latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(s.latencies, 99) * 1000, 1),
+        }
+    return report
+
+
+def format_report(report: dict[str, dict]) -> str:
+    lines = [f"{'route':<28} {'count':>7} {'err':>5} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8}"]
+    for route, r in report.items():
+        lines.append(
+            f"{route:<28} {r['count']:>7} {r['errors']:>5} {r['rps']:>7} "
+            f"{r['p50_ms']:>6}ms {r['p95_ms']:>6}ms {r['p99_ms']:>6}ms"
+        )
+    return "\n".join(lines)
+
+
+def _request(route: str, rng: random.Random, tickers: list[str], domains: list[str]):
+    if route == "GET /api/history/{ticker}":
+        return "GET", f"/api/history/{rng.choice(tickers)}", {"days": rng.choice((7, 30, 90))}, None
+    if route == "PUT /api/preferences":
+        body = {"domains": rng.sample(domains, rng.randint(1, min(5, len(domains))))}
+        return "PUT", "/api/preferences", None, body
+    method, path = route.split(" ", 1)
+    return method, path, None, None
+
+
+async def run_load(
+    base_url: str,
+    users: int = 1000,
+    concurrency: int = 50,
+    duration: float = 30.0,
+    secret: str | None = None,
+    think_ms: float = 0.0,
+    seed: int = 0,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> dict[str, dict]:
+    """Drive the mix against *base_url* and return summarize()'s per-route report."""
+    secret = secret or settings.supabase_jwt_secret
+    tokens = [
+        make_token(user_id(i), secret, ttl_seconds=int(duration) + 3600) for i in range(users)
+    ]
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    routes, weights = zip(*MIX)
+    stats = {route: RouteStats() for route in routes}
+
+    async with httpx.AsyncClient(
+        base_url=base_url, transport=transport, limits=limits, timeout=30.0
+    ) as client:
+        # Users click on what the dashboard shows them
+        dashboard = (await client.get("/api/rankings")).raise_for_status().json()
+        domains = [d["domain"] for d in dashboard["domains"]]
+        tickers = [s["ticker"] for d in dashboard["domains"] for s in d["top5"]]
+        if not tickers:
+            raise SystemExit("the API has no rankings yet: seed the database first")
+
+        async def virtual_user(index: int, deadline: float) -> None:
+            rng = random.Random(seed * 100_003 + index)
+            while time.monotonic() < deadline:
+                route = rng.choices(routes, weights)[0]
+                method, path, params, body = _request(route, rng, tickers, domains)
+                headers = {"Authorization": f"Bearer {rng.choice(tokens)}"}
+                start = time.perf_counter()
+                try:
+                    response = await client.request(
+                        method, path, params=params, json=body, headers=headers
+                    )
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                stats[route].record(time.perf_counter() - start, ok)
+                if think_ms:
+                    await asyncio.sleep(rng.expovariate(1000 / think_ms))
+
+        started = time.monotonic()
+        await asyncio.gather(*(virtual_user(i, started + duration) for i in range(concurrency)))
+        elapsed = time.monotonic() - started
+    return summarize(stats, elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="API load-test data generator and driver.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    seed = sub.add_parser("seed", help="fill DATABASE_URL with load-test volumes")
+    seed.add_argument("--days", type=int, default=90)
+    seed.add_argument("--users", type=int, default=1000)
+    seed.add_argument("--runs-per-day", type=int, default=8)
+    seed.add_argument("--custom-domains", type=int, default=3, help="max per user")
+    seed.add_argument("--seed", type=int, default=0)
+    seed.add_argument("--reset", action="store_true", help="empty the seeded tables first")
+    run = sub.add_parser("run", help="drive concurrent traffic against a running API")
+    run.add_argument("--base-url", default="http://localhost:8000")
+    run.add_argument("--users", type=int, default=1000)
+    run.add_argument("--concurrency", type=int, default=50)
+    run.add_argument("--duration", type=float, default=30.0)
+    run.add_argument("--think-ms", type=float, default=0.0, help="mean pause between calls")
+    run.add_argument("--jwt-secret", default=None)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--output", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    if args.command == "seed":
+        engine = create_engine(settings.sync_database_url)
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        start = time.perf_counter()
+        counts = seed_database(
+            engine,
+            days=args.days,
+            users=args.users,
+            runs_per_day=args.runs_per_day,
+            custom_domains=args.custom_domains,
+            seed=args.seed,
+            reset=args.reset,
+        )
+        for table, n in counts.items():
+            print(f"{table:<22} {n:>10}")
+        print(f"seeded in {time.perf_counter() - start:.1f}s")
+        return
+
+    report = asyncio.run(
+        run_load(
+            args.base_url,
+            users=args.users,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            secret=args.jwt_secret,
+            think_ms=args.think_ms,
+            seed=args.seed,
+        )
+    )
+    print(format_report(report))
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+    if report["total"]["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,69 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from .config import settings
 from .database import Base, engine
+from .leader import LeaderElector
+from .routers.admin import router as admin_router
 from .routers.auth import router as auth_router
 from .routers.custom_domains import router as custom_domains_router
 from .routers.domains import router as domains_router
 from .routers.health import router as health_router
 from .routers.history import router as history_router
+from .routers.metrics import router as metrics_router
 from .routers.preferences import router as preferences_router
 from .routers.rankings import router as rankings_router
 from .scheduler import create_scheduler
 from .seed import seed_db
+from .services.metrics import MetricsMiddleware
+from .services.profiler import ProfilerMiddleware
+from .services.tracing import configure_tracing
 
-_scheduler = None
+_elector: LeaderElector | None = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global _scheduler
+    global _elector
     # Initialize DB tables
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     # Seed initial data
     await seed_db()
-    # Start background scheduler
-    _scheduler = create_scheduler()
-    _scheduler.start()
+    # Compete for the scheduler lock — only the elected process runs scheduled jobs
+    if settings.run_scheduler:
+        _elector = LeaderElector(create_scheduler)
+        _elector.start()
     yield
-    # Graceful shutdown
-    if _scheduler:
-        _scheduler.shutdown(wait=False)
+    # Graceful shutdown; waits for a running cycle, so off the event loop
+    if _elector:
+        await asyncio.to_thread(_elector.stop)
     await engine.dispose()
 
 
-app = FastAPI(title="Smart Stock Ranker", lifespan=lifespan)
+# Installs the span provider when TRACE_SAMPLE_RATE > 0, which also switches on FastAPI's
+# request / endpoint / serialization spans; /metrics scrapes are never traced
+configure_tracing()
+app = FastAPI(
+    title="Smart Stock Ranker",
+    lifespan=lifespan,
+    telemetry={
+        "metrics": False,
+        "logs": False,
+        "exclude": lambda scope: scope["path"] == "/metrics",
+    },
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],
     allow_methods=["GET", "PUT", "POST", "DELETE"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilerMiddleware)
 app.include_router(health_router)
 app.include_router(rankings_router)
 app.include_router(domains_router)
@@ -49,6 +71,8 @@ app.include_router(preferences_router)
 app.include_router(auth_router)
 app.include_router(custom_domains_router)
 app.include_router(history_router, prefix="/api")
+app.include_router(admin_router)
+app.include_router(metrics_router)
 
 
 @app.get("/")
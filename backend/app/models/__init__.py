@@ -1,3 +1,4 @@
+from .score_rollup import ScoreRollup as ScoreRollup
 from .score_snapshot import ScoreSnapshot as ScoreSnapshot
 from .stock import Domain as Domain
 from .stock import Stock as Stock
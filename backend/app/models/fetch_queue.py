@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..database import Base
+
+
+class FetchRun(Base):
+    """One sharded fetch run, enqueued by the scheduler leader (see services/fetch_queue.py).
+
+    status: pending → done (or skipped when the inputs matched the previous run,
+    failed when no shard completed).
+    """
+
+    __tablename__ = "fetch_runs"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    shard_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class FetchShard(Base):
+    """A group of whole domains fetched and factored by a single worker.
+
+    status: pending → claimed → done. A claim older than the claim timeout is
+    considered abandoned and can be taken again. result holds the partial
+    output: {"latest": {ticker: {...}}, "factors": {domain: {ticker: {...}}},
+    "long_term": {ticker: score}, "fingerprints": {domain: fingerprint}}.
+    """
+
+    __tablename__ = "fetch_shards"
+    # Claim scans pending shards in id order (see claim_shard)
+    __table_args__ = (Index("ix_fetch_shards_status_id", "status", "id"),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    run_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("fetch_runs.id", ondelete="CASCADE"), index=True, nullable=False
+    )
+    domains: Mapped[dict] = mapped_column(JSONB, nullable=False)  # {domain: [tickers]}
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    claimed_by: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    claimed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    result: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
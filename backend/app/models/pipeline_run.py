@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..database import Base
+
+
+class PipelineRun(Base):
+    """Performance ledger: one row per fetch_cycle / snapshot_job run (see services/run_ledger.py).
+
+    stage_seconds maps stage name -> wall seconds, plus "total". Pipeline stages
+    overlap, so they don't add up to the total. status: ok, skipped (nothing to
+    do) or failed (the job raised, or a cycle got no data at all).
+    """
+
+    __tablename__ = "pipeline_runs"
+    # Recent runs per job, and the trailing-week baseline (see check_regressions)
+    __table_args__ = (Index("ix_pipeline_runs_job_started_at", "job", "started_at"),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job: Mapped[str] = mapped_column(String(32), nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False)
+    started_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    finished_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    stage_seconds: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    tickers_attempted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    tickers_succeeded: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    tickers_failed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    bytes_downloaded: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    rows_inserted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    peak_rss_bytes: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
@@ -1,13 +1,28 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime, Float, Integer, String
+from sqlalchemy import DDL, Boolean, DateTime, Float, Index, Integer, String, event, text, true
 from sqlalchemy.orm import Mapped, mapped_column
 
 from ..database import Base
 
 
 class RankingResult(Base):
+    """One ticker's scores in one run; range-partitioned on computed_at (services/partitions.py)."""
+
     __tablename__ = "ranking_results"
+    __table_args__ = (
+        # Latest run per domain is a backward scan of this index (see routers/rankings.py)
+        Index("ix_ranking_results_domain_computed_at", "domain", "computed_at"),
+        Index("ix_ranking_results_computed_at_brin", "computed_at", postgresql_using="brin"),
+        # Latest keyframe per domain under delta storage (see services/ranking_store.py)
+        Index(
+            "ix_ranking_results_domain_keyframe",
+            "domain",
+            "computed_at",
+            postgresql_where=text("keyframe"),
+        ),
+        {"postgresql_partition_by": "RANGE (computed_at)"},
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     ticker: Mapped[str] = mapped_column(String(10), index=True, nullable=False)
     domain: Mapped[str] = mapped_column(String(50), index=True, nullable=False)
@@ -19,6 +34,17 @@ class RankingResult(Base):
     relative_strength: Mapped[float | None] = mapped_column(Float, nullable=True)
     financial_ratio: Mapped[float | None] = mapped_column(Float, nullable=True)
     long_term_score: Mapped[float | None] = mapped_column(Float, nullable=True)
-    computed_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), index=True, nullable=False
+    # False for change-only rows written between keyframes (RANKING_STORAGE=delta)
+    keyframe: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=True, server_default=true()
     )
+    # Part of the key: a partitioned table's primary key must include the partition column
+    computed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+
+
+# Catches rows until partition_maintenance() creates their partition
+event.listen(
+    RankingResult.__table__,
+    "after_create",
+    DDL("CREATE TABLE ranking_results_default PARTITION OF ranking_results DEFAULT"),
+)
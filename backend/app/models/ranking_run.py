@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..database import Base
+
+
+class RankingRun(Base):
+    """One row per fetch_cycle run that persisted results.
+
+    fingerprint hashes the cycle's inputs (price panel, fundamentals, domain
+    membership). A later cycle with the same fingerprint writes nothing and only
+    bumps last_verified_at on this row. domain_fingerprints holds the same hash
+    per domain, so a cycle where only some domains changed persists just those.
+    """
+
+    __tablename__ = "ranking_runs"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    computed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), index=True, nullable=False
+    )
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    last_verified_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    ticker_count: Mapped[int] = mapped_column(Integer, nullable=False)
+    domain_fingerprints: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..database import Base
+
+
+class ScoreRollup(Base):
+    """Open/high/low/close/mean of a ticker's composite score and rank per hour or day.
+
+    Maintained by services/rollups.py after every ranking write; bucket is the
+    UTC start of the hour or day. Charts read these instead of ranking_results.
+    """
+
+    __tablename__ = "score_rollups"
+    ticker: Mapped[str] = mapped_column(String(10), primary_key=True)
+    resolution: Mapped[str] = mapped_column(String(8), primary_key=True)  # "hour" | "day"
+    bucket: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+    domain: Mapped[str] = mapped_column(String(50), nullable=False)  # as of the bucket's close
+    samples: Mapped[int] = mapped_column(Integer, nullable=False)
+    first_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    score_open: Mapped[float] = mapped_column(Float, nullable=False)
+    score_high: Mapped[float] = mapped_column(Float, nullable=False)
+    score_low: Mapped[float] = mapped_column(Float, nullable=False)
+    score_close: Mapped[float] = mapped_column(Float, nullable=False)
+    score_mean: Mapped[float] = mapped_column(Float, nullable=False)
+    rank_open: Mapped[int] = mapped_column(Integer, nullable=False)
+    rank_high: Mapped[int] = mapped_column(Integer, nullable=False)
+    rank_low: Mapped[int] = mapped_column(Integer, nullable=False)
+    rank_close: Mapped[int] = mapped_column(Integer, nullable=False)
+    rank_mean: Mapped[float] = mapped_column(Float, nullable=False)
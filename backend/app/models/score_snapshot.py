@@ -1,17 +1,28 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime, Float, Integer, String
+from sqlalchemy import DDL, DateTime, Float, Index, Integer, String, event
 from sqlalchemy.orm import Mapped, mapped_column
 
 from ..database import Base
 
 
 class ScoreSnapshot(Base):
+    """A ticker's price and volume at fetch time; range-partitioned on fetched_at."""
+
     __tablename__ = "score_snapshots"
+    __table_args__ = (
+        Index("ix_score_snapshots_fetched_at_brin", "fetched_at", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (fetched_at)"},
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     ticker: Mapped[str] = mapped_column(String(10), index=True, nullable=False)
     close_price: Mapped[float] = mapped_column(Float, nullable=False)
     volume: Mapped[float] = mapped_column(Float, nullable=False)
-    fetched_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), index=True, nullable=False
-    )
+    fetched_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
+
+
+event.listen(
+    ScoreSnapshot.__table__,
+    "after_create",
+    DDL("CREATE TABLE score_snapshots_default PARTITION OF score_snapshots DEFAULT"),
+)
@@ -0,0 +1,78 @@
+"""
+replay.py — Generate synthetic replay data and load its universe into the database.
+
+  python -m app.replay synth DIR [--tickers 5000] [--days 300] [--format csv|parquet]
+  python -m app.replay load DIR     # add universe.csv domains/stocks to DATABASE_URL
+
+Then run with MARKET_DATA_PROVIDER=replay REPLAY_PATH=DIR and every fetch_cycle
+is served from the recording (see services/market_data.py).
+"""
+
+import argparse
+import csv
+from collections.abc import Iterable
+from pathlib import Path
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .models.stock import Domain, Stock
+from .services.market_data import write_synthetic
+
+
+def load_universe(session: Session, rows: Iterable[dict]) -> int:
+    """Insert the missing domains and stocks of universe *rows* (ticker, name, domain).
+
+    Returns the number of stocks added.
+    """
+    domains = {d.name: d for d in session.execute(select(Domain)).scalars()}
+    existing = set(session.execute(select(Stock.ticker)).scalars())
+    added = 0
+    for row in rows:
+        domain = domains.get(row["domain"])
+        if domain is None:
+            domain = domains[row["domain"]] = Domain(name=row["domain"])
+            session.add(domain)
+        if row["ticker"] not in existing:
+            session.add(Stock(ticker=row["ticker"], name=row["name"], domain=domain))
+            existing.add(row["ticker"])
+            added += 1
+    session.commit()
+    return added
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Synthetic market-data replay tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    synth = sub.add_parser("synth", help="write a synthetic replay directory")
+    synth.add_argument("path", type=Path)
+    synth.add_argument("--tickers", type=int, default=5000)
+    synth.add_argument("--days", type=int, default=300)
+    synth.add_argument("--domain-size", type=int, default=25)
+    synth.add_argument("--seed", type=int, default=0)
+    synth.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    load = sub.add_parser("load", help="add a replay directory's universe to the database")
+    load.add_argument("path", type=Path)
+    args = parser.parse_args()
+
+    if args.command == "synth":
+        write_synthetic(
+            args.path,
+            tickers=args.tickers,
+            days=args.days,
+            domain_size=args.domain_size,
+            seed=args.seed,
+            fmt=args.format,
+        )
+        print(f"wrote {args.tickers} tickers x {args.days} days to {args.path}")
+    else:
+        engine = create_engine(settings.sync_database_url)
+        with Session(engine) as session:
+            with open(args.path / "universe.csv", newline="") as fh:
+                added = load_universe(session, csv.DictReader(fh))
+        print(f"added {added} stocks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.models.pipeline_run import PipelineRun
+from app.models.stock import Domain, Stock
+from app.routers.auth import require_admin
+from app.scheduler import notify_membership_change
+from app.services import profiler, slow_queries
+from app.services.provider_gateway import get_gateway
+
+router = APIRouter(prefix="/api/admin", tags=["admin"])
+
+
+class StockMembershipIn(BaseModel):
+    domain: str
+    name: str | None = None
+
+
+class StockMembershipOut(BaseModel):
+    ticker: str
+    name: str
+    domain: str
+
+
+@router.put("/stocks/{ticker}", response_model=StockMembershipOut)
+async def put_stock_membership(
+    ticker: str,
+    body: StockMembershipIn,
+    _admin: str = Depends(require_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    """Create a stock or move it to another domain, then re-rank the affected domains."""
+    ticker = ticker.upper()
+    domain = (
+        await db.execute(select(Domain).where(Domain.name == body.domain))
+    ).scalar_one_or_none()
+    if domain is None:
+        raise HTTPException(status_code=404, detail=f"Domain '{body.domain}' not found")
+
+    stock = (await db.execute(select(Stock).where(Stock.ticker == ticker))).scalar_one_or_none()
+    if stock is None:
+        if not body.name:
+            raise HTTPException(status_code=422, detail="name is required for a new stock")
+        stock = Stock(ticker=ticker, name=body.name, domain_id=domain.id)
+        db.add(stock)
+    else:
+        stock.domain_id = domain.id
+        if body.name:
+            stock.name = body.name
+    await db.commit()
+
+    notify_membership_change()
+    return StockMembershipOut(ticker=stock.ticker, name=stock.name, domain=domain.name)
+
+
+@router.get("/provider")
+async def get_provider_metrics(_admin: str = Depends(require_admin)):
+    """Market-data gateway counters, adaptive limits and circuit-breaker state."""
+    return get_gateway().metrics()
+
+
+class PipelineRunOut(BaseModel):
+    id: int
+    job: str
+    status: str
+    started_at: datetime
+    finished_at: datetime
+    stage_seconds: dict[str, float]
+    tickers_attempted: int
+    tickers_succeeded: int
+    tickers_failed: int
+    bytes_downloaded: int
+    rows_inserted: int
+    peak_rss_bytes: int | None
+
+    class Config:
+        from_attributes = True
+
+
+@router.get("/runs", response_model=list[PipelineRunOut])
+async def list_pipeline_runs(
+    job: str | None = Query(None, description="fetch_cycle, fetch_shard or snapshot_job"),
+    limit: int = Query(50, ge=1, le=500),
+    _admin: str = Depends(require_admin),
+    db: AsyncSession = Depends(get_db),
+):
+    """Most recent run-ledger rows, newest first."""
+    query = select(PipelineRun).order_by(PipelineRun.started_at.desc()).limit(limit)
+    if job is not None:
+        query = query.where(PipelineRun.job == job)
+    return (await db.execute(query)).scalars().all()
+
+
+class ProfileIn(BaseModel):
+    target: Literal["fetch_cycle", "snapshot_job", "route"]
+    # For target "route": a route template such as /api/rankings/{domain}
+    route: str | None = None
+    requests: int = Field(10, ge=1, le=1000)
+
+
+@router.post("/profiles", status_code=202)
+async def arm_profile(
+    body: ProfileIn, request: Request, _admin: str = Depends(require_admin)
+) -> dict:
+    """Arm the profiler for the next job run or the next N requests to a route.
+
+    Returns the profile's metadata; poll GET /profiles/{id} until its status is
+    done, then download its artifacts.
+    """
+    try:
+        if body.target != "route":
+            return profiler.arm_job(body.target)
+        route = next(
+            (r for r in request.app.routes if getattr(r, "path", None) == body.route), None
+        )
+        if route is None:
+            raise HTTPException(status_code=404, detail=f"No route '{body.route}'")
+        return profiler.arm_route(route.path, route.path_regex, body.requests)
+    except profiler.ProfileError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from None
+
+
+@router.get("/profiles/{handle}")
+async def get_profile(handle: str, _admin: str = Depends(require_admin)) -> dict:
+    """Profile status and, once done, the artifacts that can be downloaded."""
+    try:
+        meta = profiler.read_meta(handle)
+    except profiler.ProfileError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from None
+    finished = meta["status"] in ("done", "failed")
+    return {**meta, "artifacts": list(profiler.ARTIFACTS) if finished else []}
+
+
+@router.get("/profiles/{handle}/{artifact}")
+async def download_profile_artifact(
+    handle: str, artifact: str, _admin: str = Depends(require_admin)
+):
+    """stacks.collapsed (folded stacks for a flame graph) or allocations.txt."""
+    try:
+        path = profiler.artifact_path(handle, artifact)
+    except profiler.ProfileError as exc:
+        raise HTTPException(status_code=404, detail=str(exc)) from None
+    return FileResponse(path, media_type="text/plain", filename=f"{handle}-{artifact}")
+
+
+@router.get("/slow-queries")
+async def list_slow_queries(
+    limit: int = Query(50, ge=1, le=1000), _admin: str = Depends(require_admin)
+) -> list[dict]:
+    """Statements over SLOW_QUERY_MS in this process, newest first, with EXPLAIN plans."""
+    return slow_queries.recent(limit)
@@ -1,6 +1,6 @@
 import httpx
 import jwt
-from fastapi import APIRouter, Header, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException
 from pydantic import BaseModel
 
 from app.config import settings
@@ -41,6 +41,12 @@ def get_current_user(authorization: str = Header(...)) -> str:
     return payload["sub"]
 
 
+def require_admin(user_id: str = Depends(get_current_user)) -> str:
+    if user_id not in settings.admin_user_ids:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user_id
+
+
 @router.post("/register")
 async def register(body: AuthRequest):
     async with httpx.AsyncClient() as client:
@@ -1,7 +1,6 @@
 import asyncio
 import uuid
 
-import yfinance as yf
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy import select
@@ -11,6 +10,8 @@ from sqlalchemy.orm import selectinload
 from app.database import get_db
 from app.models.user_domain import UserDomain, UserDomainTicker
 from app.routers.auth import get_current_user
+from app.services.market_data import get_provider
+from app.services.provider_gateway import ProviderUnavailable
 
 router = APIRouter(prefix="/api/domains/custom", tags=["custom_domains"])
 
@@ -35,8 +36,9 @@ class DomainUpdateIn(BaseModel):
 
 def _validate_ticker_sync(symbol: str) -> bool:
     try:
-        info = yf.Ticker(symbol.upper()).info
-        return bool(info.get("shortName") or info.get("longName"))
+        return get_provider().lookup(symbol.upper()) is not None
+    except ProviderUnavailable:
+        raise
     except Exception:
         return False
 
@@ -47,7 +49,12 @@ async def validate_ticker(symbol: str) -> bool:
 
 
 async def _check_tickers(tickers: list[str]) -> None:
-    results = await asyncio.gather(*[validate_ticker(t) for t in tickers])
+    try:
+        results = await asyncio.gather(*[validate_ticker(t) for t in tickers])
+    except ProviderUnavailable:
+        raise HTTPException(
+            status_code=503, detail="Market data provider unavailable, try again shortly"
+        )
     invalid = [t for t, ok in zip(tickers, results) if not ok]
     if invalid:
         raise HTTPException(status_code=422, detail=f"Invalid tickers: {', '.join(invalid)}")
@@ -2,13 +2,13 @@ from fastapi import APIRouter, Depends
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_db
+from ..database import get_read_db
 from ..models.stock import Domain
 
 router = APIRouter(prefix="/api", tags=["domains"])
 
 
 @router.get("/domains")
-async def list_domains(db: AsyncSession = Depends(get_db)):
+async def list_domains(db: AsyncSession = Depends(get_read_db)):
     result = await db.execute(select(Domain.name).order_by(Domain.name))
     return {"domains": result.scalars().all()}
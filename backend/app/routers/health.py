@@ -1,25 +1,124 @@
+import asyncio
+import time
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from sqlalchemy import func, select
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_db
-from ..models.score_snapshot import ScoreSnapshot
+from ..config import settings
+from ..database import async_session_maker
+from ..models.ranking_run import RankingRun
+from ..services.health import health_state
+from ..services.provider_gateway import get_gateway
 
 router = APIRouter(prefix="/api", tags=["health"])
 
 
-@router.get("/health")
-async def health_check(db: AsyncSession = Depends(get_db)):
-    """Returns system health and last successful data fetch timestamp."""
-    # Query the most recent ScoreSnapshot fetched_at across all tickers
-    result = await db.execute(select(func.max(ScoreSnapshot.fetched_at)))
-    last_fetched = result.scalar_one_or_none()
+class _Probe:
+    """Database probe result shared by all requests for HEALTH_CACHE_SECONDS."""
+
+    def __init__(self) -> None:
+        self.result: dict | None = None
+        self.checked_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def get(self) -> dict:
+        if self.result is None or time.monotonic() - self.checked_at > (
+            settings.health_cache_seconds
+        ):
+            async with self.lock:  # one probe in flight; the others wait for its result
+                if self.result is None or time.monotonic() - self.checked_at > (
+                    settings.health_cache_seconds
+                ):
+                    self.result = await self._run()
+                    self.checked_at = time.monotonic()
+        return self.result
+
+    async def _run(self) -> dict:
+        start = time.perf_counter()
+        try:
+            last_fetched, last_verified = await asyncio.wait_for(
+                _read_freshness(), settings.health_probe_timeout_seconds
+            )
+        except Exception as exc:
+            error = "timeout" if isinstance(exc, TimeoutError) else type(exc).__name__
+            return {"ok": False, "error": error, "last_fetched": None, "last_verified": None}
+        return {
+            "ok": True,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "checked_at": datetime.now(timezone.utc).isoformat(),
+            "last_fetched": last_fetched,
+            "last_verified": last_verified,
+        }
+
+
+_probe = _Probe()
 
+
+async def _read_freshness() -> tuple[datetime | None, datetime | None]:
+    async with async_session_maker() as session:
+        # One round trip on the small ranking_runs table: the last run that wrote new data
+        # (its snapshots carry the same timestamp) and the latest confirmation of a run
+        last_fetched, verified = (
+            await session.execute(
+                select(func.max(RankingRun.computed_at), func.max(RankingRun.last_verified_at))
+            )
+        ).one()
+    # Unchanged cycles write no snapshots but confirm the data on the latest run
+    candidates = [ts for ts in (verified, last_fetched) if ts is not None]
+    return last_fetched, max(candidates) if candidates else None
+
+
+def _liveness() -> dict:
     return {
         "status": "ok",
+        "pipeline": health_state.snapshot(),
+        "provider": {"breaker": get_gateway().breaker.state},
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+@router.get("/health")
+async def health_check():
+    """Returns system health and last successful data fetch timestamp.
+
+    Served from the scheduler's in-memory state; a process that has not completed
+    a fetch cycle itself (no scheduler here, or just started) falls back to the
+    cached readiness probe, and reports "degraded" while that probe fails.
+    """
+    last_fetched, last_verified = health_state.freshness()
+    source = "scheduler"
+    if last_verified is None:
+        probe = await _probe.get()
+        last_fetched, last_verified = probe["last_fetched"], probe["last_verified"]
+        source = "database" if probe["ok"] else "unavailable"
+    return {
+        **_liveness(),
+        "status": "degraded" if source == "unavailable" else "ok",
         "last_fetched": last_fetched.isoformat() if last_fetched else None,
+        "last_verified": last_verified.isoformat() if last_verified else None,
         "data_available": last_fetched is not None,
+        "source": source,
+    }
+
+
+@router.get("/health/live")
+async def liveness():
+    """Liveness: never touches the database."""
+    return _liveness()
+
+
+@router.get("/health/ready")
+async def readiness():
+    """Readiness: a timed, cached database probe; 503 while the database is unreachable."""
+    probe = await _probe.get()
+    body = {
+        "status": "ok" if probe["ok"] else "unavailable",
+        "database": {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in probe.items()
+        },
         "timestamp": datetime.now(timezone.utc).isoformat(),
     }
+    return JSONResponse(body, status_code=200 if probe["ok"] else 503)
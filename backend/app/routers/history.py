@@ -1,10 +1,11 @@
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta, timezone
 
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy import select
 
-from app.database import get_db
+from app.database import get_read_db
 from app.models.daily_snapshot import DailySnapshot
+from app.models.score_rollup import ScoreRollup
 
 router = APIRouter()
 
@@ -13,7 +14,7 @@ router = APIRouter()
 async def get_history(
     ticker: str,
     days: int = Query(default=30, ge=1, le=365),
-    db=Depends(get_db),
+    db=Depends(get_read_db),
 ):
     since = date.today() - timedelta(days=days)
     result = await db.execute(
@@ -32,3 +33,43 @@ async def get_history(
         }
         for r in rows
     ]
+
+
+@router.get("/history/{ticker}/scores")
+async def get_score_history(
+    ticker: str,
+    resolution: str = Query(default="hour", pattern="^(hour|day)$"),
+    days: int = Query(default=7, ge=1, le=730),
+    db=Depends(get_read_db),
+):
+    """Intraday (hour) or multi-month (day) score and rank candles from the rollups."""
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    result = await db.execute(
+        select(ScoreRollup)
+        .where(ScoreRollup.ticker == ticker.upper())
+        .where(ScoreRollup.resolution == resolution)
+        .where(ScoreRollup.bucket >= since)
+        .order_by(ScoreRollup.bucket)
+    )
+    return [
+        {
+            "bucket": r.bucket.isoformat(),
+            "domain": r.domain,
+            "samples": r.samples,
+            "score": {
+                "open": r.score_open,
+                "high": r.score_high,
+                "low": r.score_low,
+                "close": r.score_close,
+                "mean": r.score_mean,
+            },
+            "rank": {
+                "open": r.rank_open,
+                "high": r.rank_high,
+                "low": r.rank_low,
+                "close": r.rank_close,
+                "mean": r.rank_mean,
+            },
+        }
+        for r in result.scalars().all()
+    ]
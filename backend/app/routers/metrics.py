@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..services.metrics import render
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape target (text exposition format 0.0.4)."""
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -2,14 +2,16 @@ from collections import defaultdict
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, HTTPException
+from opentelemetry import trace
 from pydantic import BaseModel
-from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_db
+from ..database import get_read_db
 from ..models.ranking_result import RankingResult
+from ..services.ranking_store import run_bounds, state
 
 router = APIRouter(prefix="/api", tags=["rankings"])
+tracer = trace.get_tracer(__name__)
 
 
 class FactorBreakdown(BaseModel):
@@ -58,61 +60,57 @@ def _row_to_stock_ranking(row: RankingResult) -> StockRanking:
 
 
 @router.get("/rankings", response_model=RankingsResponse)
-async def get_rankings(db: AsyncSession = Depends(get_db)):
-    latest_q = select(func.max(RankingResult.computed_at)).scalar_subquery()
-    rows = (
-        (
-            await db.execute(
-                select(RankingResult)
-                .where(RankingResult.computed_at == latest_q)
-                .order_by(RankingResult.domain, RankingResult.rank)
-            )
-        )
-        .scalars()
-        .all()
-    )
+async def get_rankings(db: AsyncSession = Depends(get_read_db)):
+    # The SQL itself is the db.execute child spans; the rest is row fetch + ORM hydration
+    with tracer.start_as_current_span("rankings.load"):
+        # Two steps so the row query names each domain's run window: the planner then
+        # reads only the partitions holding those runs instead of joining across all
+        # of them. Runs can be partial — a membership change re-ranks only the
+        # affected domains — so the window is resolved per domain.
+        bounds = [
+            tuple(bound)
+            for bound in (await db.execute(run_bounds())).all()
+            if bound.keyframe_at is not None
+        ]
+        rows = []
+        if bounds:
+            rows = (await db.execute(state(bounds))).scalars().all()
 
     if not rows:
         return RankingsResponse(domains=[], best_overall=None, last_fetched=None)
 
-    last_fetched = rows[0].computed_at
-    by_domain: dict[str, list[RankingResult]] = defaultdict(list)
-    for row in rows:
-        by_domain[row.domain].append(row)
+    with tracer.start_as_current_span("rankings.build", attributes={"rows": len(rows)}):
+        last_fetched = max(row.computed_at for row in rows)
+        by_domain: dict[str, list[RankingResult]] = defaultdict(list)
+        for row in rows:
+            by_domain[row.domain].append(row)
 
-    domains = [
-        DomainRankings(
-            domain=domain,
-            top5=[_row_to_stock_ranking(r) for r in domain_rows[:5]],
-        )
-        for domain, domain_rows in sorted(by_domain.items())
-    ]
+        domains = [
+            DomainRankings(
+                domain=domain,
+                top5=[_row_to_stock_ranking(r) for r in domain_rows[:5]],
+            )
+            for domain, domain_rows in sorted(by_domain.items())
+        ]
 
-    best_row = max(rows, key=lambda r: r.composite_score)
-    best_overall = _row_to_stock_ranking(best_row)
+        best_row = max(rows, key=lambda r: r.composite_score)
+        best_overall = _row_to_stock_ranking(best_row)
 
-    return RankingsResponse(domains=domains, best_overall=best_overall, last_fetched=last_fetched)
+        return RankingsResponse(
+            domains=domains, best_overall=best_overall, last_fetched=last_fetched
+        )
 
 
 @router.get("/rankings/{domain}", response_model=list[StockRanking])
-async def get_domain_rankings(domain: str, db: AsyncSession = Depends(get_db)):
-    latest_q = select(func.max(RankingResult.computed_at)).scalar_subquery()
-    rows = (
-        (
-            await db.execute(
-                select(RankingResult)
-                .where(
-                    RankingResult.computed_at == latest_q,
-                    RankingResult.domain == domain,
-                )
-                .order_by(RankingResult.rank)
-            )
-        )
-        .scalars()
-        .all()
-    )
+async def get_domain_rankings(domain: str, db: AsyncSession = Depends(get_read_db)):
+    with tracer.start_as_current_span("rankings.load"):
+        bound = (await db.execute(run_bounds(domain=domain))).one()
+        rows = []
+        if bound.keyframe_at is not None:
+            rows = (await db.execute(state([tuple(bound)]))).scalars().all()
 
     if not rows:
         raise HTTPException(status_code=404, detail=f"Domain '{domain}' not found or no data")
 
-    return [_row_to_stock_ranking(r) for r in rows]
+    with tracer.start_as_current_span("rankings.build", attributes={"rows": len(rows)}):
+        return [_row_to_stock_ranking(r) for r in rows]
@@ -1,153 +1,775 @@
+import hashlib
+import json
 import logging
-from datetime import datetime, timezone
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
 
-import yfinance as yf
+import numpy as np
+import pandas as pd
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
-from sqlalchemy import create_engine, select
+from opentelemetry import trace
+from sqlalchemy import create_engine, delete, select, update
 from sqlalchemy.orm import Session, selectinload
 
 from .config import settings
+from .database import pool_options
 from .models.ranking_result import RankingResult
+from .models.ranking_run import RankingRun
 from .models.score_snapshot import ScoreSnapshot
 from .models.stock import Domain, Stock
+from .services.compute_pool import get_backend
 from .services.data_fetcher import (
-    SEED_TICKERS,
     compute_factors_for_ticker,
     compute_long_term_score,
-    fetch_all_stocks,
+    compute_price_factors,
+    compute_relative_strength,
+    extract_latest,
+    fetch_financial_ratio,
+    fingerprint_inputs,
+    slim_panel,
 )
-from .services.ranking_engine import rank_domain
+from .services.fetch_queue import enqueue_run, plan_shards
+from .services.health import health_state
+from .services.market_calendar import MarketCalendarTrigger, completed_session, final_fetch_time
+from .services.market_data import get_provider
+from .services.metrics import CYCLE_SECONDS, STAGE_SECONDS, cache_lookup, instrument_engine
+from .services.partitions import partition_maintenance
+from .services.pipeline import Stage, run_pipeline
+from .services.profiler import profiled
+from .services.provider_gateway import get_gateway
+from .services.ranking_engine import IncrementalRanker, StockScore
+from .services.ranking_store import rows_to_store, run_bounds, tombstone
+from .services.retry_queue import RetryEntry, RetryQueue
+from .services.rollups import mark_touched
+from .services.run_ledger import RunStats, frame_bytes, recorded_run
+from .services.slow_queries import watch_slow_queries
 from .services.snapshot_service import snapshot_job
+from .services.tracing import trace_engine
 
 logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
 
 # Sync engine for the scheduler thread (yfinance + DB writes are sync)
-_sync_engine = create_engine(settings.sync_database_url)
+_sync_engine = create_engine(settings.sync_database_url, **pool_options())
+instrument_engine(_sync_engine, "scheduler")
+trace_engine(_sync_engine)
+watch_slow_queries(_sync_engine, "scheduler")
+
+# Ranking state carried across cycles — unchanged domains are not re-scored
+_ranker = IncrementalRanker(verify=settings.ranking_verify_incremental)
+
+# Set by create_scheduler() so membership events can wake the refresh job
+_active_scheduler: BackgroundScheduler | None = None
+
+
+@dataclass
+class _CycleCache:
+    """Inputs of the last fetch_cycle, reused by targeted re-ranks."""
+
+    history: pd.DataFrame | None = None
+    latest: dict[str, dict] = field(default_factory=dict)
+    factors: dict[str, dict] = field(default_factory=dict)
+    long_term: dict[str, float | None] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+_cycle_cache = _CycleCache()
+
+# Held by a local fetch_cycle; the retry job skips its turn instead of patching mid-cycle
+_cycle_lock = threading.Lock()
+
+# Tickers that came back without a price or with missing factors (see retry_failed)
+_retry_queue = RetryQueue(
+    base_seconds=settings.retry_base_seconds,
+    max_seconds=settings.retry_max_seconds,
+    max_attempts=settings.retry_max_attempts,
+)
+
+
+def _load_domain_groups(session: Session) -> dict[str, list[str]]:
+    domain_rows = (
+        session.execute(select(Domain).options(selectinload(Domain.stocks)).order_by(Domain.name))
+        .scalars()
+        .all()
+    )
+    return {d.name: sorted(s.ticker for s in d.stocks) for d in domain_rows}
+
+
+def _persist_rankings(
+    session: Session,
+    domain_name: str,
+    results: dict[str, StockScore],
+    long_term: dict[str, float | None],
+    computed_at: datetime,
+    keyframe: bool = False,
+) -> int:
+    """Add *domain_name*'s rows for this run; returns how many RANKING_STORAGE keeps.
+
+    keyframe=True stores every row whatever RANKING_STORAGE says.
+    """
+    rows = []
+    for ticker, score in results.items():
+        logger.info(
+            "Domain=%s ticker=%s score=%.1f rank=%d",
+            domain_name,
+            ticker,
+            score.composite_score,
+            score.rank,
+        )
+        fs = score.factor_scores
+        rows.append(
+            RankingResult(
+                ticker=ticker,
+                domain=domain_name,
+                composite_score=score.composite_score,
+                rank=score.rank,
+                momentum=fs["momentum"].raw if "momentum" in fs else None,
+                volume_change=fs["volume_change"].raw if "volume_change" in fs else None,
+                volatility=fs["volatility"].raw if "volatility" in fs else None,
+                relative_strength=fs["relative_strength"].raw
+                if "relative_strength" in fs
+                else None,
+                financial_ratio=fs["financial_ratio"].raw if "financial_ratio" in fs else None,
+                long_term_score=long_term.get(ticker),
+                computed_at=computed_at,
+            )
+        )
+    if not rows:
+        # An emptied domain: without this its previous rows would stay its latest state
+        rows = [tombstone(domain_name, computed_at)]
+    if not keyframe:
+        rows = rows_to_store(session, domain_name, rows)
+    session.add_all(rows)
+    mark_touched(session, computed_at, domain_name)
+    return len(rows)
+
+
+@dataclass
+class _DomainWork:
+    """One domain travelling through the fetch_cycle pipeline."""
+
+    name: str
+    tickers: list[str]
+    history: pd.DataFrame  # the download chunk this domain came from
+    latest: dict[str, dict] = field(default_factory=dict)
+    factors: dict[str, dict] = field(default_factory=dict)
+    fingerprint: str = ""
+    changed: bool = True
+    results: dict[str, StockScore] = field(default_factory=dict)
+    long_term: dict[str, float | None] = field(default_factory=dict)
+
+
+def _download_stage(
+    chunk: dict[str, list[str]], run: RunStats
+) -> list[tuple[dict[str, list[str]], pd.DataFrame, dict[str, dict]]]:
+    tickers = [t for group in chunk.values() for t in group]
+    raw = get_provider().history(tickers)
+    run.add(bytes_downloaded=frame_bytes(raw))
+    # Latest bars come from the full-precision frame; only the slim panel moves on
+    return [(chunk, slim_panel(raw, tickers), extract_latest(raw, tickers))]
+
+
+def _chunk_factors(
+    chunk: dict[str, list[str]], history: pd.DataFrame
+) -> dict[str, dict[str, dict]]:
+    """{domain: {ticker: factors}}: one compute-backend call for the price factors."""
+    price_factors = get_backend().price_factors(history, chunk)
+    return {
+        name: {
+            t: {**price_factors[name][t], "financial_ratio": fetch_financial_ratio(t)}
+            for t in group
+        }
+        for name, group in chunk.items()
+    }
+
+
+def _domain_fingerprint(
+    name: str,
+    group: list[str],
+    history: pd.DataFrame,
+    latest: dict[str, dict],
+    factors: dict[str, dict],
+) -> str:
+    """fingerprint_inputs() of one domain; cycles, queue shards and retries share it."""
+    return fingerprint_inputs(
+        history.loc[:, history.columns.get_level_values(1).isin(group)],
+        {t: latest[t] for t in group if t in latest},
+        {t: factors.get(t, {}).get("financial_ratio") for t in group},
+        {name: group},
+    )
+
+
+def _factor_stage(
+    item: tuple[dict[str, list[str]], pd.DataFrame, dict[str, dict]],
+    previous: dict[str, str],
+    run: RunStats,
+) -> list[_DomainWork]:
+    """Factor a whole chunk in one compute-backend call, then fan out per domain."""
+    chunk, history, latest = item
+    factors = _chunk_factors(chunk, history)
+    works = []
+    for name, group in chunk.items():
+        work = _DomainWork(
+            name=name,
+            tickers=group,
+            history=history,
+            latest={t: latest[t] for t in group if t in latest},
+            factors=factors[name],
+        )
+        work.fingerprint = _domain_fingerprint(name, group, history, latest, work.factors)
+        work.changed = previous.get(name) != work.fingerprint
+        cache_lookup("fingerprint", not work.changed)
+        for t in group:
+            missing = _missing_inputs(t, work.latest, work.factors[t])
+            if missing:
+                _retry_queue.record(t, name, missing)
+            else:
+                _retry_queue.resolve(t)
+                run.add(tickers_succeeded=1)
+        works.append(work)
+    return works
+
+
+def _missing_inputs(ticker: str, latest: dict[str, dict], factors: dict) -> set[str]:
+    missing = {name for name, value in factors.items() if value is None}
+    if ticker not in latest:
+        missing.add("price")
+    return missing
+
+
+def _long_term_scores(tickers: list[str], run: RunStats) -> dict[str, float | None]:
+    """compute_long_term_score() for many tickers: one 1y download, math on the backend."""
+    with (
+        STAGE_SECONDS.time("long_term"),
+        run.stage("long_term"),
+        tracer.start_as_current_span("long_term", attributes={"tickers": len(tickers)}),
+    ):
+        try:
+            raw = get_provider().history(tickers, period="1y")
+            run.add(bytes_downloaded=frame_bytes(raw))
+            hist = slim_panel(raw, tickers, dtype=np.float64)
+            closes = hist["Close"].reindex(columns=tickers)
+        except Exception as exc:
+            logger.warning("long-term history download failed for %s: %s", tickers, exc)
+            return {t: None for t in tickers}
+        return get_backend().long_term_scores(closes)
+
+
+def _rank_stage(work: _DomainWork) -> list[_DomainWork]:
+    # Unchanged domains are still fed to the ranker: cheap, and it primes a fresh process
+    with tracer.start_as_current_span(
+        "ranker.update", attributes={"domain": work.name, "tickers": len(work.factors)}
+    ):
+        work.results = _ranker.update(work.name, work.factors)
+    return [work]
+
+
+def _persist_stage(work: _DomainWork, computed_at: datetime, run: RunStats) -> list[_DomainWork]:
+    if not work.changed:
+        return [work]
+    work.long_term = _long_term_scores(work.tickers, run)
+    with Session(_sync_engine) as session:
+        for ticker, values in work.latest.items():
+            session.add(
+                ScoreSnapshot(
+                    ticker=ticker,
+                    close_price=values["close_price"],
+                    volume=values["volume"],
+                    fetched_at=computed_at,
+                )
+            )
+        if work.latest:
+            session.execute(
+                update(Stock).where(Stock.ticker.in_(work.latest)).values(last_updated=computed_at)
+            )
+        stored = _persist_rankings(session, work.name, work.results, work.long_term, computed_at)
+        session.commit()
+    run.add(rows_inserted=len(work.latest) + stored)
+    return [work]
+
+
+def _combined_fingerprint(domain_fingerprints: dict[str, str]) -> str:
+    return hashlib.sha256(json.dumps(domain_fingerprints, sort_keys=True).encode()).hexdigest()
 
 
 def fetch_cycle() -> None:
     """Called by APScheduler every N minutes. Fetches data and persists to DB.
-    On yfinance failure, returns without modifying DB — last-known-good data is retained."""
+    On yfinance failure, returns without modifying DB — last-known-good data is retained.
+
+    Runs as a staged pipeline (download → factors → rank → persist) over chunks of
+    whole domains, so one domain is persisted while the next chunk is still being
+    factored and the one after it is still downloading. Price-factor and long-term
+    math go through the compute backend (COMPUTE_BACKEND, see compute_pool.py).
+    Each domain's inputs are fingerprinted; a domain whose fingerprint matches the
+    previous run is ranked in memory only and writes nothing. When no domain
+    changed, only the previous run's last_verified_at is bumped.
+
+    With FETCH_MODE=queue the cycle only enqueues a sharded run for the workers."""
+    if settings.fetch_mode == "queue":
+        enqueue_fetch_run()
+        return
+    with _cycle_lock, CYCLE_SECONDS.time():
+        _run_local_cycle()
+
+
+def _run_local_cycle() -> None:
+    with (
+        tracer.start_as_current_span("fetch_cycle"),
+        recorded_run(_sync_engine, "fetch_cycle") as run,
+        profiled("fetch_cycle"),
+    ):
+        _local_cycle(run)
+
+
+def _local_cycle(run: RunStats) -> None:
     logger.info("fetch_cycle: starting data fetch")
-    data = fetch_all_stocks(SEED_TICKERS)
-    if not data:
+
+    with run.stage("load"), Session(_sync_engine) as session:
+        domain_groups = _load_domain_groups(session)
+        previous = session.execute(
+            select(RankingRun).order_by(RankingRun.computed_at.desc()).limit(1)
+        ).scalar_one_or_none()
+        previous_id = previous.id if previous is not None else None
+        previous_computed_at = previous.computed_at if previous is not None else None
+        previous_fps = dict(previous.domain_fingerprints or {}) if previous is not None else {}
+
+    if not domain_groups:
+        logger.warning("fetch_cycle: no domains found in DB, skipping ranking")
+        run.status = "skipped"
+        return
+    run.add(tickers_attempted=sum(len(group) for group in domain_groups.values()))
+    for stale_domain in set(_ranker.domains()) - set(domain_groups):
+        _ranker.drop(stale_domain)
+    _retry_queue.retain({t for group in domain_groups.values() for t in group})
+
+    computed_at = datetime.now(timezone.utc)
+    report = run_pipeline(
+        plan_shards(domain_groups, settings.pipeline_chunk_size),
+        [
+            Stage(
+                "download",
+                lambda c: _download_stage(c, run),
+                settings.pipeline_download_workers,
+            ),
+            Stage(
+                "factors",
+                lambda w: _factor_stage(w, previous_fps, run),
+                settings.pipeline_factor_workers,
+            ),
+            Stage("rank", _rank_stage, settings.pipeline_rank_workers),
+            Stage(
+                "persist",
+                lambda w: _persist_stage(w, computed_at, run),
+                settings.pipeline_persist_workers,
+            ),
+        ],
+        queue_size=settings.pipeline_queue_size,
+    )
+    logger.info("fetch_cycle: %s", report.format())
+    for timing in report.stages:
+        run.add_stage(timing.name, timing.wall_seconds)
+    health_state.record_stages(report.stages)
+    works: list[_DomainWork] = report.results
+    if not works:
         logger.warning(
             "fetch_cycle: no data returned, skipping DB write (last-known-good retained)"
         )
+        run.status = "failed"
         return
 
+    # Domains that failed this cycle keep their previous fingerprint (and rankings)
+    domain_fps = {name: fp for name, fp in previous_fps.items() if name in domain_groups}
+    domain_fps.update({w.name: w.fingerprint for w in works})
+    changed = [w for w in works if w.changed]
     now = datetime.now(timezone.utc)
-    with Session(_sync_engine) as session:
-        for ticker, values in data.items():
-            snapshot = ScoreSnapshot(
-                ticker=ticker,
-                close_price=values["close_price"],
-                volume=values["volume"],
-                fetched_at=now,
+    with run.stage("finalize"), Session(_sync_engine) as session:
+        if changed or previous_id is None:
+            run.add(rows_inserted=1)
+            ranking_run = RankingRun(
+                computed_at=computed_at,
+                fingerprint=_combined_fingerprint(domain_fps),
+                last_verified_at=now,
+                ticker_count=sum(len(w.tickers) for w in works),
+                domain_fingerprints=domain_fps,
             )
-            session.add(snapshot)
-            # Update last_updated on the Stock row
-            stock = session.execute(
-                select(Stock).where(Stock.ticker == ticker)
-            ).scalar_one_or_none()
-            if stock:
-                stock.last_updated = now
+            session.add(ranking_run)
+            session.flush()
+            published = (ranking_run.id, computed_at)
+        else:
+            session.execute(
+                update(RankingRun).where(RankingRun.id == previous_id).values(last_verified_at=now)
+            )
+            published = (previous_id, previous_computed_at)
         session.commit()
-    logger.info("fetch_cycle: persisted %d tickers at %s", len(data), now.isoformat())
+    health_state.record_cycle(*published, now)
+    health_state.set_stale([entry.ticker for entry in _retry_queue.pending()])
 
-    # --- Factor computation and ranking ---
-    # Load domain groupings from DB
-    with Session(_sync_engine) as session:
-        domain_rows = (
-            session.execute(select(Domain).options(selectinload(Domain.stocks))).scalars().all()
+    histories = {id(w.history): w.history for w in works}
+    with _cycle_cache.lock:
+        _cycle_cache.history = pd.concat(histories.values(), axis=1)
+        _cycle_cache.latest = {t: bar for w in works for t, bar in w.latest.items()}
+        _cycle_cache.factors = {t: f for w in works for t, f in w.factors.items()}
+        for w in changed:
+            _cycle_cache.long_term.update(w.long_term)
+    if changed:
+        logger.info(
+            "fetch_cycle: persisted %d of %d domains (%d ranking results)",
+            len(changed),
+            len(works),
+            sum(len(w.results) for w in changed),
+        )
+    else:
+        logger.info(
+            "fetch_cycle: inputs unchanged since run %d, skipped ranking inserts", previous_id
         )
-        domain_groups = {d.name: [s.ticker for s in d.stocks] for d in domain_rows}
 
-    if not domain_groups:
-        logger.warning("fetch_cycle: no domains found in DB, skipping ranking")
-        return
 
-    # Download 30d history for factor computation (single batch call)
+def enqueue_fetch_run() -> None:
+    """Queue-mode cycle: split the domains into shards for the fetch workers."""
+    with Session(_sync_engine) as session:
+        domain_groups = _load_domain_groups(session)
+        if not domain_groups:
+            logger.warning("enqueue_fetch_run: no domains found in DB, skipping")
+            return
+        enqueue_run(session, domain_groups)
+
+
+def refresh_membership() -> None:
+    """Re-rank only the domains whose membership changed since they were last ranked.
+
+    Compares stocks.domain_id in the DB with the ticker sets held by the ranker, so
+    it picks up changes from any source: seed_db, admin calls, migrations or manual
+    SQL. Affected domains are re-ranked from the last cycle's cached history and
+    factors (relative_strength is re-derived for the new peer set) and published as
+    a partial run; tickers new to the cache get a small targeted download. A domain
+    left with no tickers is published as empty.
+
+    Skips its turn while a fetch_cycle or retry holds _cycle_lock: the cycle
+    reloads membership itself, and the next poll catches anything it missed.
+    """
+    if not _cycle_lock.acquire(blocking=False):
+        return
     try:
-        all_tickers = [t for group in domain_groups.values() for t in group]
-        history = yf.download(
-            all_tickers,
-            period="30d",
-            interval="1d",
-            auto_adjust=True,
-            progress=False,
-            threads=True,
-        )
-    except Exception as exc:
-        logger.error("Factor history download failed: %s", exc)
+        _refresh_membership()
+    finally:
+        _cycle_lock.release()
+
+
+def _refresh_membership() -> None:
+    ranked = _ranker.domains()
+    if not ranked:
+        return  # no cycle has run yet — the first fetch_cycle ranks everything
+
+    with Session(_sync_engine) as session:
+        domain_groups = _load_domain_groups(session)
+
+    for removed in set(ranked) - set(domain_groups):
+        _ranker.drop(removed)
+    affected = {
+        name: tickers
+        for name, tickers in domain_groups.items()
+        if set(tickers) != set(ranked.get(name, []))
+    }
+    if not affected:
+        return
+
+    with _cycle_cache.lock:
+        history = _cycle_cache.history
+        cached_factors = dict(_cycle_cache.factors)
+        long_term = dict(_cycle_cache.long_term)
+    if history is None:
         return
 
-    now_computed = datetime.now(timezone.utc)
+    affected_tickers = [t for tickers in affected.values() for t in tickers]
+    missing = [t for t in affected_tickers if t not in cached_factors]
+    if missing:
+        try:
+            extra = get_provider().history(missing)
+            extra = slim_panel(extra, missing)
+            stale = history.drop(columns=missing, level=1, errors="ignore")
+            history = pd.concat([stale, extra], axis=1)
+        except Exception as exc:
+            logger.error("refresh_membership: download for %s failed: %s", missing, exc)
+            return
+
+    computed_at = datetime.now(timezone.utc)
     ranking_count = 0
     with Session(_sync_engine) as session:
-        for domain_name, tickers in domain_groups.items():
+        for domain_name, tickers in affected.items():
             stocks_data: dict[str, dict] = {}
             for ticker in tickers:
-                factors = compute_factors_for_ticker(
-                    ticker=ticker,
-                    history=history,
-                    all_histories=history,
-                    domain_tickers=tickers,
-                )
+                cache_lookup("cycle_cache", ticker in cached_factors)
+                if ticker in cached_factors:
+                    factors = dict(cached_factors[ticker])
+                    factors["relative_strength"] = compute_relative_strength(
+                        ticker, history, tickers
+                    )
+                else:
+                    factors = compute_factors_for_ticker(
+                        ticker=ticker,
+                        history=history,
+                        all_histories=history,
+                        domain_tickers=tickers,
+                    )
+                if ticker not in long_term:
+                    long_term[ticker] = compute_long_term_score(ticker)
                 stocks_data[ticker] = factors
+                cached_factors[ticker] = factors
+
+            results = _ranker.update(domain_name, stocks_data)
+            ranking_count += _persist_rankings(
+                session, domain_name, results, long_term, computed_at
+            )
+        session.commit()
+
+    with _cycle_cache.lock:
+        _cycle_cache.history = history
+        _cycle_cache.factors.update(cached_factors)
+        _cycle_cache.long_term.update(long_term)
+    logger.info(
+        "refresh_membership: re-ranked %s (%d rows)", ", ".join(sorted(affected)), ranking_count
+    )
+
+
+def retry_failed() -> None:
+    """Re-fetch only the tickers whose retry backoff has elapsed and patch the current run.
+
+    Recovered prices and factors are merged into the cached cycle inputs and the
+    affected domains are re-ranked incrementally. Each is written as a keyframe of
+    the current run: replacing the domain's rows in place when that run (or a later
+    membership re-rank) wrote it, added to the run when an older run holds its
+    latest state, which keeps its rows. The run's fingerprints are updated to the
+    patched inputs, so the next cycle skips domains whose inputs then match.
+    Readers see a complete run without waiting for the next full cycle.
+    """
+    entries = _retry_queue.due()
+    if not entries or get_gateway().breaker.is_open:
+        return  # nothing due, or the provider is down and a retry would only burn an attempt
+    if not _cycle_lock.acquire(blocking=False):
+        return  # a full cycle is running and will re-record what is still missing
+    try:
+        with tracer.start_as_current_span("retry_failed", attributes={"tickers": len(entries)}):
+            _retry_entries(entries)
+        health_state.set_stale([entry.ticker for entry in _retry_queue.pending()])
+    finally:
+        _cycle_lock.release()
+
+
+def _retry_entries(entries: list[RetryEntry]) -> None:
+    ranked = _ranker.domains()
+    with _cycle_cache.lock:
+        history = _cycle_cache.history
+        cached_latest = dict(_cycle_cache.latest)
+        cached_factors = dict(_cycle_cache.factors)
+        long_term = dict(_cycle_cache.long_term)
+    entries = [e for e in entries if e.ticker in ranked.get(e.domain, ())]
+    if history is None or not entries:
+        return
 
-            results = rank_domain(stocks_data)
-            for ticker, score in results.items():
-                logger.info(
-                    "Domain=%s ticker=%s score=%.1f rank=%d",
-                    domain_name,
-                    ticker,
-                    score.composite_score,
-                    score.rank,
+    tickers = [e.ticker for e in entries]
+    try:
+        raw = get_provider().history(tickers)
+        latest = extract_latest(raw, tickers)
+        fresh = slim_panel(raw, tickers)
+    except Exception as exc:
+        logger.warning("retry_failed: download for %d tickers failed: %s", len(tickers), exc)
+        for entry in entries:
+            _retry_queue.failed(entry.ticker, entry.missing)
+        return
+    history = pd.concat([history.drop(columns=tickers, level=1, errors="ignore"), fresh], axis=1)
+    for ticker in tickers:
+        cached_latest.pop(ticker, None)
+    cached_latest.update(latest)
+
+    patched: set[str] = set()
+    recovered: list[str] = []
+    for entry in entries:
+        peers = ranked[entry.domain]
+        factors = compute_price_factors(entry.ticker, history, history, peers)
+        previous_ratio = cached_factors.get(entry.ticker, {}).get("financial_ratio")
+        factors["financial_ratio"] = (
+            fetch_financial_ratio(entry.ticker)
+            if "financial_ratio" in entry.missing or previous_ratio is None
+            else previous_ratio
+        )
+        missing = _missing_inputs(entry.ticker, latest, factors)
+        if missing:
+            _retry_queue.failed(entry.ticker, missing)
+        else:
+            _retry_queue.resolve(entry.ticker)
+            recovered.append(entry.ticker)
+        if factors != cached_factors.get(entry.ticker):
+            cached_factors[entry.ticker] = factors
+            patched.add(entry.domain)
+
+    if not patched:
+        logger.info("retry_failed: 0 of %d tickers improved", len(entries))
+        return
+
+    now = datetime.now(timezone.utc)
+    with Session(_sync_engine) as session:
+        current = session.execute(
+            select(RankingRun).order_by(RankingRun.computed_at.desc()).limit(1)
+        ).scalar_one_or_none()
+        domain_fps = dict(current.domain_fingerprints or {}) if current is not None else {}
+        for domain_name in patched:
+            peers = ranked[domain_name]
+            stocks_data = {}
+            for ticker in peers:
+                factors = dict(cached_factors.get(ticker) or {})
+                # A recovered peer moves the domain median, so re-derive it for everyone
+                factors["relative_strength"] = compute_relative_strength(ticker, history, peers)
+                stocks_data[ticker] = factors
+                cached_factors[ticker] = factors
+            results = _ranker.update(domain_name, stocks_data)
+            _, _, latest_at = session.execute(run_bounds(domain=domain_name)).one()
+            run_at = max(
+                (t for t in (latest_at, current and current.computed_at) if t is not None),
+                default=now,
+            )
+            session.execute(
+                delete(RankingResult).where(
+                    RankingResult.domain == domain_name, RankingResult.computed_at == run_at
                 )
-                fs = score.factor_scores
+            )
+            # Whole, since under delta storage the replaced rows may be just the changes
+            _persist_rankings(session, domain_name, results, long_term, run_at, keyframe=True)
+            domain_fps[domain_name] = _domain_fingerprint(
+                domain_name, peers, history, cached_latest, cached_factors
+            )
+        if current is not None:
+            current.domain_fingerprints = domain_fps
+            current.fingerprint = _combined_fingerprint(domain_fps)
+            current.last_verified_at = now
+        for ticker in recovered:
+            if ticker in latest:
                 session.add(
-                    RankingResult(
+                    ScoreSnapshot(
                         ticker=ticker,
-                        domain=domain_name,
-                        composite_score=score.composite_score,
-                        rank=score.rank,
-                        momentum=fs["momentum"].raw if "momentum" in fs else None,
-                        volume_change=fs["volume_change"].raw if "volume_change" in fs else None,
-                        volatility=fs["volatility"].raw if "volatility" in fs else None,
-                        relative_strength=fs["relative_strength"].raw
-                        if "relative_strength" in fs
-                        else None,
-                        financial_ratio=fs["financial_ratio"].raw
-                        if "financial_ratio" in fs
-                        else None,
-                        long_term_score=compute_long_term_score(ticker),
-                        computed_at=now_computed,
+                        close_price=latest[ticker]["close_price"],
+                        volume=latest[ticker]["volume"],
+                        fetched_at=now,
                     )
                 )
-                ranking_count += 1
+        if recovered:
+            session.execute(
+                update(Stock).where(Stock.ticker.in_(recovered)).values(last_updated=now)
+            )
         session.commit()
-    logger.info("fetch_cycle: persisted %d ranking results", ranking_count)
+
+    with _cycle_cache.lock:
+        _cycle_cache.history = history
+        _cycle_cache.latest = cached_latest
+        _cycle_cache.factors.update(cached_factors)
+    logger.info(
+        "retry_failed: recovered %d of %d tickers, patched %s",
+        len(recovered),
+        len(entries),
+        ", ".join(sorted(patched)),
+    )
+
+
+def notify_membership_change() -> None:
+    """Run refresh_membership() now instead of waiting for its next poll.
+
+    Safe to call from any thread; a no-op when no scheduler runs in this process
+    (the polling job of the process that does will pick the change up).
+    """
+    scheduler = _active_scheduler
+    if scheduler is None or not scheduler.running:
+        return
+    job = scheduler.get_job("membership_refresh")
+    if job is not None:
+        job.modify(next_run_time=datetime.now(timezone.utc))
+
+
+def _market_misfire_grace() -> timedelta:
+    return timedelta(minutes=settings.market_sparse_minutes)
+
+
+def market_fetch_cycle() -> None:
+    """fetch_cycle for the market-calendar schedule.
+
+    The trigger's last fire of a trading day is the post-close end. A run that
+    starts within the misfire grace after it can only be that fire (earlier fires
+    are discarded once past their own grace), so the EOD snapshot follows
+    immediately, dated to the session rather than to the UTC day. The startup
+    prime is a separate plain fetch_cycle job, so an evening restart does not
+    snapshot again.
+    """
+    started = datetime.now(timezone.utc)
+    fetch_cycle()
+    session_day = completed_session(started)
+    if (
+        session_day is not None
+        and started < final_fetch_time(session_day) + _market_misfire_grace()
+    ):
+        snapshot_job(snap_date=session_day)
 
 
 def create_scheduler() -> BackgroundScheduler:
     """Creates and configures the APScheduler instance. Caller must call .start()."""
+    global _active_scheduler
     scheduler = BackgroundScheduler(timezone="UTC")
+    if settings.schedule_mode == "market":
+        # Snapshot is chained to the final post-close cycle, so no separate snapshot job
+        scheduler.add_job(
+            market_fetch_cycle,
+            MarketCalendarTrigger(
+                dense_minutes=settings.fetch_interval_minutes,
+                sparse_minutes=settings.market_sparse_minutes,
+            ),
+            id="data_fetch",
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True,
+            misfire_grace_time=int(_market_misfire_grace().total_seconds()),
+        )
+        # Prime rankings even if the market is shut; never chains a snapshot
+        scheduler.add_job(fetch_cycle, id="data_fetch_prime", replace_existing=True)
+    else:
+        scheduler.add_job(
+            fetch_cycle,
+            IntervalTrigger(minutes=settings.fetch_interval_minutes),
+            id="data_fetch",
+            replace_existing=True,
+            max_instances=1,  # Prevents overlapping runs if a fetch takes longer than the interval
+            next_run_time=datetime.now(timezone.utc),  # Fire immediately on startup
+        )
+        scheduler.add_job(
+            snapshot_job,
+            CronTrigger(hour=21, minute=0, timezone="UTC"),
+            id="snapshot_job",
+            replace_existing=True,
+            max_instances=1,
+        )
+    scheduler.add_job(
+        retry_failed,
+        IntervalTrigger(seconds=settings.retry_poll_seconds),
+        id="retry_failed",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
     scheduler.add_job(
-        fetch_cycle,
-        IntervalTrigger(minutes=settings.fetch_interval_minutes),
-        id="data_fetch",
+        partition_maintenance,
+        CronTrigger(hour=0, minute=5, timezone="UTC"),
+        id="partition_maintenance",
         replace_existing=True,
-        max_instances=1,  # Prevents overlapping runs if a fetch takes longer than the interval
-        next_run_time=datetime.now(timezone.utc),  # Fire immediately on startup
+        max_instances=1,
+        coalesce=True,
+        next_run_time=datetime.now(timezone.utc),  # Partitions must exist before the first write
     )
     scheduler.add_job(
-        snapshot_job,
-        CronTrigger(hour=21, minute=0, timezone="UTC"),
-        id="snapshot_job",
+        refresh_membership,
+        IntervalTrigger(seconds=settings.membership_poll_seconds),
+        id="membership_refresh",
         replace_existing=True,
         max_instances=1,
+        coalesce=True,
     )
+    _active_scheduler = scheduler
     return scheduler
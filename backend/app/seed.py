@@ -4,6 +4,7 @@ from sqlalchemy import select
 
 from .database import async_session_maker
 from .models.stock import Domain, Stock
+from .scheduler import notify_membership_change
 
 logger = logging.getLogger(__name__)
 
@@ -85,6 +86,7 @@ SEED_DATA = {
 
 
 async def seed_db():
+    added: list[str] = []
     async with async_session_maker() as session:
         for domain_name, stocks in SEED_DATA.items():
             result = await session.execute(select(Domain).where(Domain.name == domain_name))
@@ -98,5 +100,9 @@ async def seed_db():
                 stock = result.scalar_one_or_none()
                 if not stock:
                     session.add(Stock(ticker=ticker, name=name, domain_id=domain.id))
+                    added.append(ticker)
         await session.commit()
     logger.info("seed_db: seed complete")
+    if added:
+        logger.info("seed_db: new tickers %s", ", ".join(added))
+        notify_membership_change()
@@ -0,0 +1,318 @@
+"""
+backtest.py — Evaluate the ranking model against stored factor history.
+
+Every fetch_cycle run leaves one RankingResult row per ticker with the raw
+factor values and computed_at (under RANKING_STORAGE=delta, only the changed
+ones between keyframes; unchanged tickers are carried forward from their
+stored row when the history is pivoted). The backtest loads that history per domain into
+a (time x ticker x factor) array, re-ranks every timestamp in one vectorized
+pass through rank_domain_batch(), and joins forward returns from the
+ScoreSnapshot price store.
+
+Per domain it reports:
+  hit_rate  — share of timestamps where the top-ranked ticker's forward return
+              beat the domain median forward return
+  rank_ic   — mean Spearman correlation between composite score and forward
+              return across timestamps (ties get average ranks)
+
+Run from the backend directory:
+  python -m app.services.backtest --horizon-hours 24
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.ranking_result import RankingResult
+from app.models.score_snapshot import ScoreSnapshot
+from app.services.ranking_engine import FACTOR_NAMES, rank_domain_batch
+from app.services.ranking_store import TOMBSTONE, run_bounds
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FactorHistory:
+    """Stored factors for one domain, aligned on (time, ticker, factor)."""
+
+    domain: str
+    times: np.ndarray  # (T,) datetime64[ns] in UTC, sorted ascending
+    tickers: list[str]  # (N,)
+    raw: np.ndarray  # (T, N, F) float, NaN = missing factor
+    present: np.ndarray  # (T, N) bool, True where the ticker was ranked
+
+
+@dataclass
+class DomainBacktest:
+    """Backtest summary for a single domain."""
+
+    domain: str
+    periods: int  # timestamps with enough forward returns to evaluate
+    hit_rate: float | None
+    rank_ic: float | None
+    rank_ic_std: float | None
+
+
+# ---------------------------------------------------------------------------
+# Loading
+# ---------------------------------------------------------------------------
+
+
+def build_factor_history(rows: pd.DataFrame) -> dict[str, FactorHistory]:
+    """Pivot flat ranking rows into one FactorHistory per domain.
+
+    *rows* needs columns domain, ticker, computed_at and one column per factor. With
+    a keyframe column (delta storage), a ticker absent at a timestamp keeps its last
+    stored factors as long as no keyframe came between.
+    """
+    histories: dict[str, FactorHistory] = {}
+    for domain, group in rows.groupby("domain", sort=True):
+        time_idx, times = pd.factorize(group["computed_at"], sort=True)
+        ticker_idx, tickers = pd.factorize(group["ticker"], sort=True)
+        raw = np.full((len(times), len(tickers), len(FACTOR_NAMES)), np.nan)
+        present = np.zeros((len(times), len(tickers)), dtype=bool)
+        raw[time_idx, ticker_idx, :] = group[list(FACTOR_NAMES)].to_numpy(dtype=float)
+        present[time_idx, ticker_idx] = True
+        if "keyframe" in group:
+            raw, present = _carry_forward(raw, present, time_idx[group["keyframe"].to_numpy()])
+        # An emptied domain's tombstone ends the carry-forward but is not a ticker
+        keep = [i for i, ticker in enumerate(tickers) if ticker != TOMBSTONE]
+        raw, present, tickers = raw[:, keep], present[:, keep], tickers[keep]
+        histories[str(domain)] = FactorHistory(
+            domain=str(domain),
+            times=np.asarray(times, dtype="datetime64[ns]"),
+            tickers=[str(t) for t in tickers],
+            raw=raw,
+            present=present,
+        )
+    return histories
+
+
+def _carry_forward(
+    raw: np.ndarray, present: np.ndarray, keyframe_times: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Fill each ticker's gaps with its latest stored row since the last keyframe."""
+    steps = np.arange(len(present))
+    is_keyframe = np.zeros(len(present), dtype=bool)
+    is_keyframe[keyframe_times] = True
+    # Rows before the first keyframe in the window carry from the window start
+    segment_start = np.maximum.accumulate(np.where(is_keyframe, steps, 0))
+    last = np.maximum.accumulate(np.where(present, steps[:, None], -1), axis=0)
+    carried = last >= segment_start[:, None]
+    filled = raw[np.where(carried, last, 0), np.arange(present.shape[1])[None, :]]
+    filled[~carried] = np.nan
+    return filled, carried
+
+
+def load_factor_history(
+    session: Session, since: datetime | None = None
+) -> dict[str, FactorHistory]:
+    """Read raw factors from ranking_results into per-domain arrays.
+
+    With *since*, each domain is read from its latest keyframe at or before *since*
+    so delta-stored tickers carry their factors into the window, then trimmed.
+    """
+    columns = (
+        [RankingResult.domain, RankingResult.ticker, RankingResult.computed_at]
+        + [getattr(RankingResult, name) for name in FACTOR_NAMES]
+        + [RankingResult.keyframe]
+    )
+    stmt = select(*columns)
+    if since is not None:
+        starts = [
+            and_(RankingResult.domain == domain, RankingResult.computed_at >= keyframe_at)
+            for domain, keyframe_at, _ in session.execute(run_bounds(at=since))
+            if keyframe_at is not None
+        ]
+        stmt = stmt.where(or_(RankingResult.computed_at >= since, *starts))
+    rows = pd.DataFrame(
+        session.execute(stmt).all(),
+        columns=["domain", "ticker", "computed_at", *FACTOR_NAMES, "keyframe"],
+    )
+    if rows.empty:
+        return {}
+    rows["computed_at"] = pd.to_datetime(rows["computed_at"], utc=True).dt.tz_localize(None)
+    histories = build_factor_history(rows)
+    if since is None:
+        return histories
+    start = pd.Timestamp(since)
+    start = (start.tz_convert("UTC") if start.tzinfo else start).tz_localize(None)
+    trimmed = (_trim(history, start.to_datetime64()) for history in histories.values())
+    return {history.domain: history for history in trimmed if len(history.times)}
+
+
+def _trim(history: FactorHistory, start: np.datetime64) -> FactorHistory:
+    """*history* from *start* on, without tickers that have no row left."""
+    rows = history.times >= start
+    cols = history.present[rows].any(axis=0)
+    return FactorHistory(
+        domain=history.domain,
+        times=history.times[rows],
+        tickers=[t for t, keep in zip(history.tickers, cols) if keep],
+        raw=history.raw[rows][:, cols],
+        present=history.present[rows][:, cols],
+    )
+
+
+def load_prices(session: Session, since: datetime | None = None) -> pd.DataFrame:
+    """Read (ticker, fetched_at, close_price) from score_snapshots, sorted by time."""
+    stmt = select(ScoreSnapshot.ticker, ScoreSnapshot.fetched_at, ScoreSnapshot.close_price)
+    if since is not None:
+        stmt = stmt.where(ScoreSnapshot.fetched_at >= since)
+    prices = pd.DataFrame(
+        session.execute(stmt).all(), columns=["ticker", "fetched_at", "close_price"]
+    )
+    if not prices.empty:
+        prices["fetched_at"] = pd.to_datetime(prices["fetched_at"], utc=True).dt.tz_localize(None)
+    return prices.sort_values("fetched_at", kind="stable")
+
+
+# ---------------------------------------------------------------------------
+# Forward returns and metrics
+# ---------------------------------------------------------------------------
+
+
+def forward_returns(
+    times: np.ndarray,
+    tickers: list[str],
+    prices: pd.DataFrame,
+    horizon: timedelta,
+) -> np.ndarray:
+    """Return a (T, N) array of close-to-close returns over *horizon*.
+
+    The entry price is the last close fetched at or before each timestamp, the exit
+    price the last close at or before timestamp + horizon. NaN when either side is
+    missing or the horizon runs past the newest stored price for that ticker.
+    """
+    times = np.asarray(times, dtype="datetime64[ns]")
+    exit_times = times + np.timedelta64(horizon)
+    out = np.full((len(times), len(tickers)), np.nan)
+    by_ticker = dict(tuple(prices.groupby("ticker", sort=False)))
+    for j, ticker in enumerate(tickers):
+        series = by_ticker.get(ticker)
+        if series is None or series.empty:
+            continue
+        stamps = series["fetched_at"].to_numpy(dtype="datetime64[ns]")
+        closes = series["close_price"].to_numpy(dtype=float)
+        entry = np.searchsorted(stamps, times, side="right") - 1
+        exit_ = np.searchsorted(stamps, exit_times, side="right") - 1
+        ok = (entry >= 0) & (exit_times <= stamps[-1])
+        entry_px = closes[np.clip(entry, 0, None)]
+        exit_px = closes[np.clip(exit_, 0, None)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[:, j] = np.where(ok & (entry_px > 0), exit_px / entry_px - 1.0, np.nan)
+    return out
+
+
+def _row_pearson(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Row-wise Pearson correlation over non-NaN pairs; NaN when undefined."""
+    mask = ~np.isnan(a) & ~np.isnan(b)
+    n = mask.sum(axis=1)
+    safe_n = np.maximum(n, 1)
+    a0 = np.where(mask, a, 0.0)
+    b0 = np.where(mask, b, 0.0)
+    da = np.where(mask, a0 - (a0.sum(axis=1) / safe_n)[:, None], 0.0)
+    db = np.where(mask, b0 - (b0.sum(axis=1) / safe_n)[:, None], 0.0)
+    denom = np.sqrt((da**2).sum(axis=1) * (db**2).sum(axis=1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = (da * db).sum(axis=1) / denom
+    return np.where((n >= 2) & (denom > 0), corr, np.nan)
+
+
+def evaluate_domain(
+    domain: str,
+    scores: np.ndarray,
+    ranks: np.ndarray,
+    fwd: np.ndarray,
+) -> DomainBacktest:
+    """Compute hit rate and rank IC from (T, N) scores, ranks and forward returns."""
+    usable = ~np.isnan(scores) & ~np.isnan(fwd)
+    scores = np.where(usable, scores, np.nan)
+    fwd = np.where(usable, fwd, np.nan)
+    evaluable = usable.sum(axis=1) >= 2
+
+    # Hit rate: did the rank-1 ticker beat its peer median?
+    top = (ranks == 1) & usable
+    has_top = top.any(axis=1) & evaluable
+    top_ret = np.where(top, fwd, 0.0).sum(axis=1)[has_top]
+    hits = top_ret > np.nanmedian(fwd[has_top], axis=1)
+    hit_rate = float(hits.mean()) if hits.size else None
+
+    # Rank IC: Spearman = Pearson on average ranks within each timestamp
+    score_ranks = pd.DataFrame(scores).rank(axis=1, method="average").to_numpy()
+    fwd_ranks = pd.DataFrame(fwd).rank(axis=1, method="average").to_numpy()
+    ic = _row_pearson(score_ranks, fwd_ranks)[evaluable]
+    ic = ic[~np.isnan(ic)]
+
+    return DomainBacktest(
+        domain=domain,
+        periods=int(evaluable.sum()),
+        hit_rate=hit_rate,
+        rank_ic=float(ic.mean()) if ic.size else None,
+        rank_ic_std=float(ic.std(ddof=0)) if ic.size else None,
+    )
+
+
+def backtest_histories(
+    histories: dict[str, FactorHistory],
+    prices: pd.DataFrame,
+    horizon: timedelta,
+) -> list[DomainBacktest]:
+    """Re-rank every stored timestamp and score it against forward returns."""
+    report: list[DomainBacktest] = []
+    for domain, history in histories.items():
+        scores, ranks = rank_domain_batch(history.raw, history.present)
+        fwd = forward_returns(history.times, history.tickers, prices, horizon)
+        report.append(evaluate_domain(domain, scores, ranks, fwd))
+    return report
+
+
+def run_backtest(
+    session: Session,
+    horizon: timedelta = timedelta(days=1),
+    since: datetime | None = None,
+) -> list[DomainBacktest]:
+    """Load stored factors and prices, then backtest every domain."""
+    histories = load_factor_history(session, since=since)
+    if not histories:
+        logger.warning("run_backtest: no ranking_results rows found")
+        return []
+    prices = load_prices(session, since=since)
+    return backtest_histories(histories, prices, horizon)
+
+
+def main() -> None:
+    from app.scheduler import _sync_engine  # avoid creating the engine on import
+
+    parser = argparse.ArgumentParser(description="Backtest stored ranking factors.")
+    parser.add_argument("--horizon-hours", type=float, default=24.0)
+    parser.add_argument("--days", type=int, default=None, help="only use the last N days")
+    args = parser.parse_args()
+
+    since = None
+    if args.days is not None:
+        since = datetime.now().astimezone() - timedelta(days=args.days)
+    with Session(_sync_engine) as session:
+        report = run_backtest(session, timedelta(hours=args.horizon_hours), since=since)
+
+    def _fmt(val: float | None) -> str:
+        return "—" if val is None else f"{val:.3f}"
+
+    print(f"{'domain':<20} {'periods':>8} {'hit_rate':>9} {'rank_ic':>8} {'ic_std':>8}")
+    for row in report:
+        print(
+            f"{row.domain:<20} {row.periods:>8} {_fmt(row.hit_rate):>9} "
+            f"{_fmt(row.rank_ic):>8} {_fmt(row.rank_ic_std):>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
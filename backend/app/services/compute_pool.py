@@ -0,0 +1,284 @@
+"""
+compute_pool.py — Run CPU-bound factor, long-term and trend math off the GIL.
+
+COMPUTE_BACKEND=thread (default) calls the pure functions inline. With
+COMPUTE_BACKEND=process a ProcessPoolExecutor runs them on COMPUTE_WORKERS
+cores. The price panel is not pickled per task: the parent copies the Close
+and Volume matrices once into a shared-memory block and every task receives
+only the block name, the shape, the index and its own slice of tickers.
+Workers map the block as NumPy arrays, rebuild lightweight frames around
+them and call the same functions the inline path uses, so both backends give
+identical results.
+
+Small batches (< COMPUTE_MIN_TICKERS) always run inline; spinning up tasks
+for a few dozen tickers costs more than it saves.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing as mp
+import os
+import sys
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from app.services.data_fetcher import compute_price_factors, long_term_score_from_close
+from app.services.snapshot_service import compute_trend
+
+logger = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Shared-memory transport
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class _SharedMatrix:
+    """Picklable handle to a (T, K) float block; K = fields x tickers."""
+
+    name: str
+    shape: tuple[int, int]
+    dtype: str  # the frames' own dtype, so both backends compute at the same precision
+    index: np.ndarray  # (T,) datetime64[ns] or int64
+    fields: tuple[str, ...]
+    tickers: tuple[str, ...]
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Spawned workers share the parent's resource tracker, so registering the
+    # block again here is a no-op and the parent's unlink() unregisters it once
+    return shared_memory.SharedMemory(name=name)
+
+
+class _SharedPanel:
+    """Parent-side owner of a shared block holding one matrix per field."""
+
+    def __init__(self, frames: dict[str, pd.DataFrame]) -> None:
+        fields = tuple(frames)
+        first = frames[fields[0]]
+        tickers = tuple(str(c) for c in first.columns)
+        rows, cols = len(first.index), len(tickers) * len(fields)
+        dtype = np.result_type(*(np.result_type(*f.dtypes) for f in frames.values()))
+        size = max(rows * cols * dtype.itemsize, 1)
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        block = np.ndarray((rows, cols), dtype=dtype, buffer=self._shm.buf)
+        for i, name in enumerate(fields):
+            block[:, i * len(tickers) : (i + 1) * len(tickers)] = (
+                frames[name].reindex(columns=list(tickers)).to_numpy(dtype=dtype)
+            )
+        self.handle = _SharedMatrix(
+            name=self._shm.name,
+            shape=(rows, cols),
+            dtype=dtype.str,
+            index=np.asarray(first.index),
+            fields=fields,
+            tickers=tickers,
+        )
+
+    def close(self) -> None:
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self) -> _SharedPanel:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _frames_from_shared(handle: _SharedMatrix, shm: shared_memory.SharedMemory):
+    block = np.ndarray(handle.shape, dtype=handle.dtype, buffer=shm.buf)
+    n = len(handle.tickers)
+    index = pd.Index(handle.index)
+    return {
+        name: pd.DataFrame(
+            block[:, i * n : (i + 1) * n], index=index, columns=list(handle.tickers), copy=False
+        )
+        for i, name in enumerate(handle.fields)
+    }
+
+
+# ---------------------------------------------------------------------------
+# Worker tasks (module level so they pickle by reference)
+# ---------------------------------------------------------------------------
+
+
+def _price_factor_task(
+    handle: _SharedMatrix, domains: list[tuple[str, list[str]]]
+) -> dict[str, dict[str, dict]]:
+    shm = _attach(handle.name)
+    try:
+        frames = _frames_from_shared(handle, shm)
+        out = {
+            domain: {
+                ticker: compute_price_factors(ticker, frames, frames, tickers) for ticker in tickers
+            }
+            for domain, tickers in domains
+        }
+        del frames  # release views before closing the mapping
+        return out
+    finally:
+        shm.close()
+
+
+def _long_term_task(handle: _SharedMatrix, tickers: list[str]) -> dict[str, float | None]:
+    shm = _attach(handle.name)
+    try:
+        close = _frames_from_shared(handle, shm)["Close"]
+        out = {t: long_term_score_from_close(close[t]) for t in tickers}
+        del close
+        return out
+    finally:
+        shm.close()
+
+
+def _trend_task(handle: _SharedMatrix, columns: list[int]) -> list[float]:
+    shm = _attach(handle.name)
+    try:
+        block = np.ndarray(handle.shape, dtype=handle.dtype, buffer=shm.buf)
+        out = []
+        for j in columns:
+            col = block[:, j]
+            out.append(compute_trend(col[~np.isnan(col)].tolist()))
+        del block, col
+        return out
+    finally:
+        shm.close()
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+
+def _split(items: list, parts: int) -> list[list]:
+    parts = max(1, min(parts, len(items)))
+    return [items[i::parts] for i in range(parts)]
+
+
+def _split_by_weight(
+    domains: dict[str, list[str]], parts: int
+) -> list[list[tuple[str, list[str]]]]:
+    """Greedy largest-first packing of whole domains into *parts* balanced tasks."""
+    buckets: list[list[tuple[str, list[str]]]] = [[] for _ in range(max(1, parts))]
+    loads = [0] * len(buckets)
+    for name, tickers in sorted(domains.items(), key=lambda kv: -len(kv[1])):
+        i = loads.index(min(loads))
+        buckets[i].append((name, tickers))
+        loads[i] += len(tickers)
+    return [b for b in buckets if b]
+
+
+class ComputeBackend:
+    """Inline backend; also the interface of ProcessComputeBackend."""
+
+    def price_factors(
+        self, history: pd.DataFrame, domains: dict[str, list[str]]
+    ) -> dict[str, dict[str, dict]]:
+        """{domain: {ticker: momentum/volume_change/volatility/relative_strength}}."""
+        return {
+            domain: {t: compute_price_factors(t, history, history, tickers) for t in tickers}
+            for domain, tickers in domains.items()
+        }
+
+    def long_term_scores(self, closes: pd.DataFrame) -> dict[str, float | None]:
+        """Long-term score per column of a (date x ticker) 1-year close panel."""
+        return {str(t): long_term_score_from_close(closes[t]) for t in closes.columns}
+
+    def trends(self, series: list[list[float]]) -> list[float]:
+        return [compute_trend(s) for s in series]
+
+    def shutdown(self) -> None:
+        pass
+
+
+class ProcessComputeBackend(ComputeBackend):
+    def __init__(self, workers: int, min_tickers: int) -> None:
+        self.workers = workers
+        self.min_tickers = min_tickers
+        # spawn: the scheduler process is multi-threaded, forking it is unsafe
+        self._executor: Executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=mp.get_context("spawn")
+        )
+
+    def price_factors(self, history, domains):
+        n = sum(len(t) for t in domains.values())
+        if n < self.min_tickers:
+            return super().price_factors(history, domains)
+        tickers = sorted({t for group in domains.values() for t in group})
+        frames = {name: history[name].reindex(columns=tickers) for name in ("Close", "Volume")}
+        merged: dict[str, dict[str, dict]] = {}
+        with _SharedPanel(frames) as panel:
+            futures = [
+                self._executor.submit(_price_factor_task, panel.handle, chunk)
+                for chunk in _split_by_weight(domains, self.workers * 2)
+            ]
+            for future in futures:
+                merged.update(future.result())
+        return {domain: merged[domain] for domain in domains}
+
+    def long_term_scores(self, closes):
+        if closes.shape[1] < self.min_tickers:
+            return super().long_term_scores(closes)
+        closes = closes.copy()
+        closes.columns = [str(c) for c in closes.columns]
+        out: dict[str, float | None] = {}
+        with _SharedPanel({"Close": closes}) as panel:
+            futures = [
+                self._executor.submit(_long_term_task, panel.handle, chunk)
+                for chunk in _split(list(closes.columns), self.workers * 2)
+            ]
+            for future in futures:
+                out.update(future.result())
+        return out
+
+    def trends(self, series):
+        if len(series) < self.min_tickers:
+            return super().trends(series)
+        width = max((len(s) for s in series), default=0)
+        padded = np.full((width, len(series)), np.nan)
+        for j, s in enumerate(series):
+            padded[: len(s), j] = s
+        frame = pd.DataFrame(padded, columns=[str(j) for j in range(len(series))])
+        chunks = _split(list(range(len(series))), self.workers * 2)
+        out = [0.0] * len(series)
+        with _SharedPanel({"score": frame}) as panel:
+            futures = [
+                (chunk, self._executor.submit(_trend_task, panel.handle, chunk)) for chunk in chunks
+            ]
+            for chunk, future in futures:
+                for j, slope in zip(chunk, future.result()):
+                    out[j] = slope
+        return out
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_backend: ComputeBackend | None = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> ComputeBackend:
+    """Process-wide backend chosen by COMPUTE_BACKEND (created on first use)."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            from app.config import settings
+
+            if settings.compute_backend == "process":
+                workers = settings.compute_workers or os.cpu_count() or 1
+                _backend = ProcessComputeBackend(workers, settings.compute_min_tickers)
+                logger.info("compute_pool: process backend with %d workers", workers)
+            else:
+                _backend = ComputeBackend()
+        return _backend
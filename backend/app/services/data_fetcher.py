@@ -1,23 +1,46 @@
 """
-data_fetcher.py — yfinance batch data fetcher, validation, and factor computation.
+data_fetcher.py — Market data fetching, validation, and factor computation.
 
 Fetches the most recent close price and volume for a list of tickers
-using a single yf.download() batch call. Falls back to an empty dict
-on any yfinance error (never raises to the caller).
+using a single batch history call. Falls back to an empty dict
+on any provider error (never raises to the caller).
 
 compute_factors_for_ticker() extracts all 5 raw factor values from a
 30-day history DataFrame. Each factor is independently wrapped in
 try/except so one failure does not block others.
+
+Large universes are downloaded in chunks with bounded concurrency
+(download_chunks) and trimmed to float32 Close/Volume panels (slim_panel).
+
+Prices and fundamentals come from the configured MarketDataProvider
+(services/market_data.py). YFinanceProvider, the default, lives here and sends
+every yfinance request through the shared provider gateway
+(services/provider_gateway.py) via download_batch() and ticker_info().
+
+fingerprint_inputs() hashes everything a ranking cycle depends on so an
+unchanged cycle (after close, weekends) can be detected and skipped.
 """
 
+import hashlib
+import json
 import logging
 import math
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
 
 import numpy as np
+import pandas as pd
 import yfinance as yf
 
+from app.services.market_data import get_provider
+from app.services.provider_gateway import ProviderUnavailable, get_gateway
+
 logger = logging.getLogger(__name__)
 
+# Price fields the factors read; everything else in a download is dropped
+PANEL_FIELDS = ("Close", "Volume")
+
 SEED_TICKERS = [
     "AAPL",
     "MSFT",
@@ -80,55 +103,174 @@ def validate_ticker_data(ticker: str, close: float, volume: float) -> bool:
     return True
 
 
-def fetch_all_stocks(tickers: list[str] | None = None) -> dict[str, dict]:
-    """Batch-download the most recent day's close/volume for *tickers*.
+def fetch_all_stocks(
+    tickers: list[str] | None = None,
+    chunk_size: int = 200,
+    max_workers: int = 4,
+) -> dict[str, dict]:
+    """Download the most recent day's close/volume for *tickers*, in batches.
 
     Parameters
     ----------
     tickers:
         List of ticker symbols. Defaults to SEED_TICKERS. An empty list
         returns {} immediately without calling yfinance.
+    chunk_size, max_workers:
+        Tickers per yf.download() call and calls in flight (see download_chunks).
+        A universe up to chunk_size is a single batch call.
 
     Returns
     -------
     dict mapping ticker -> {"close_price": float, "volume": float}
     for every ticker that passes validate_ticker_data().
-    Returns {} on any yfinance error (never raises).
+    A failed chunk is logged and left out; never raises.
     """
     if tickers is None:
         tickers = SEED_TICKERS
     if not tickers:
         return {}
 
-    try:
-        raw = yf.download(
+    result: dict[str, dict] = {}
+    for chunk, raw in download_chunks(tickers, chunk_size, max_workers):
+        if raw is None:
+            continue
+        result.update(extract_latest(raw, chunk))
+    return result
+
+
+def download_chunks(
+    tickers: list[str],
+    chunk_size: int,
+    max_workers: int,
+    period: str = "30d",
+) -> Iterator[tuple[list[str], pd.DataFrame | None]]:
+    """Batch-download *tickers* in chunks, yielding (chunk, raw_frame) as each finishes.
+
+    At most *max_workers* downloads are in flight and a finished chunk is only
+    fetched ahead of the consumer by that many, so memory stays bounded by the
+    chunk size rather than the universe. A failed chunk yields (chunk, None).
+    """
+    chunks = [tickers[i : i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+
+    def _one(chunk: list[str]) -> pd.DataFrame | None:
+        try:
+            return get_provider().history(chunk, period=period)
+        except Exception as exc:
+            logger.error("batch download failed for %d tickers: %s", len(chunk), exc)
+            return None
+
+    if len(chunks) == 1:
+        yield chunks[0], _one(chunks[0])
+        return
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = {}
+        queued = iter(chunks)
+        for chunk in islice(queued, max_workers):
+            pending[pool.submit(_one, chunk)] = chunk
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = pending.pop(future)
+                nxt = next(queued, None)
+                if nxt is not None:
+                    pending[pool.submit(_one, nxt)] = nxt
+                yield chunk, future.result()
+
+
+def download_batch(tickers: list[str] | str, period: str = "30d") -> pd.DataFrame:
+    """Daily, auto-adjusted yf.download() for *tickers*, through the provider gateway.
+
+    Costs one gateway token per ticker (yfinance sends one request each). yfinance
+    swallows per-ticker errors, 429s included, so a batch without a single close
+    counts as a provider failure. Raises ProviderUnavailable while the circuit is open.
+    """
+    cost = 1 if isinstance(tickers, str) else len(tickers)
+    return get_gateway().call(
+        f"download:{period}",  # 30d and 1y batches have different latency baselines
+        lambda: yf.download(
             tickers,
-            period="30d",
+            period=period,
             interval="1d",
             auto_adjust=True,
             progress=False,
             threads=True,
-        )
-        result: dict[str, dict] = {}
-        for ticker in tickers:
-            try:
-                close = float(raw["Close"][ticker].iloc[-1])
-                volume = float(raw["Volume"][ticker].iloc[-1])
-                if validate_ticker_data(ticker, close, volume):
-                    result[ticker] = {"close_price": close, "volume": volume}
-                else:
-                    logger.warning(
-                        "Ticker %s failed validation (close=%s, volume=%s)",
-                        ticker,
-                        close,
-                        volume,
-                    )
-            except Exception as exc:
-                logger.warning("Could not extract data for %s: %s", ticker, exc)
-        return result
-    except Exception as exc:
-        logger.error("yfinance batch download failed: %s", exc)
-        return {}
+        ),
+        cost=cost,
+        is_failure=_no_closes,
+        attributes={"tickers": cost},
+    )
+
+
+def _no_closes(raw: pd.DataFrame | None) -> bool:
+    if raw is None:
+        return True
+    if not isinstance(raw, pd.DataFrame):
+        return False
+    if raw.empty:
+        return True
+    try:
+        return bool(np.isnan(raw["Close"].to_numpy(dtype=float)).all())
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+def ticker_info(symbol: str) -> dict:
+    """yf.Ticker(symbol).info through the provider gateway."""
+    return get_gateway().call("info", lambda: yf.Ticker(symbol).info, attributes={"ticker": symbol})
+
+
+class YFinanceProvider:
+    """MarketDataProvider backed by Yahoo Finance via yfinance."""
+
+    def history(self, tickers: list[str], period: str = "30d") -> pd.DataFrame:
+        return download_batch(tickers, period=period)
+
+    def latest(self, tickers: list[str]) -> dict[str, dict]:
+        return extract_latest(download_batch(tickers, period="5d"), tickers)
+
+    def fundamentals(self, ticker: str) -> dict:
+        info = ticker_info(ticker)
+        return {
+            "name": info.get("shortName") or info.get("longName"),
+            "trailing_pe": info.get("trailingPE"),  # .get() — NEVER dict-style access
+        }
+
+    def lookup(self, symbol: str) -> str | None:
+        return self.fundamentals(symbol)["name"]
+
+
+def slim_panel(raw: pd.DataFrame, tickers: list[str], dtype=np.float32) -> pd.DataFrame:
+    """Reduce a yf.download() frame to the (field, ticker) Close/Volume columns as float32.
+
+    The factors only read Close and Volume; dropping OHLC and halving the width
+    keeps a large universe's panel small. Older yfinance returns flat columns
+    for a single ticker; those are lifted into the batch layout.
+    """
+    if not isinstance(raw.columns, pd.MultiIndex):
+        raw = raw.copy()
+        raw.columns = pd.MultiIndex.from_product([raw.columns, tickers])
+    return raw.loc[:, list(PANEL_FIELDS)].astype(dtype)
+
+
+def extract_latest(raw: pd.DataFrame, tickers: list[str]) -> dict[str, dict]:
+    """Latest valid close/volume per ticker from a batch yf.download() panel."""
+    result: dict[str, dict] = {}
+    for ticker in tickers:
+        try:
+            close = float(raw["Close"][ticker].iloc[-1])
+            volume = float(raw["Volume"][ticker].iloc[-1])
+            if validate_ticker_data(ticker, close, volume):
+                result[ticker] = {"close_price": close, "volume": volume}
+            else:
+                logger.warning(
+                    "Ticker %s failed validation (close=%s, volume=%s)",
+                    ticker,
+                    close,
+                    volume,
+                )
+        except Exception as exc:
+            logger.warning("Could not extract data for %s: %s", ticker, exc)
+    return result
 
 
 def compute_long_term_score(ticker: str) -> float | None:
@@ -142,45 +284,74 @@ def compute_long_term_score(ticker: str) -> float | None:
     Returns None on any failure so the caller can store NULL gracefully.
     """
     try:
-        hist = yf.download(
-            ticker,
-            period="1y",
-            interval="1d",
-            auto_adjust=True,
-            progress=False,
-        )
-        if hist.empty or len(hist) < 20:
-            return None
+        hist = get_provider().history([ticker], period="1y")
+        return long_term_score_from_close(hist["Close"].squeeze())
+    except Exception as exc:
+        logger.warning("compute_long_term_score failed for %s: %s", ticker, exc)
+        return None
 
-        close = hist["Close"].squeeze().dropna()
-        if len(close) < 20:
-            return None
 
-        # --- 1yr return (clamped to [-1, 3] before scoring) ---
-        total_return = float((close.iloc[-1] - close.iloc[0]) / close.iloc[0])
-        return_score = (min(max(total_return, -1.0), 3.0) + 1.0) / 4.0 * 100.0
+def long_term_score_from_close(close: "pd.Series") -> float | None:
+    """CPU half of compute_long_term_score(): score a 1-year daily close series.
+
+    Kept free of I/O so it can run in a worker process (see compute_pool.py).
+    """
+    close = close.dropna()
+    if len(close) < 20:
+        return None
+
+    # --- 1yr return (clamped to [-1, 3] before scoring) ---
+    total_return = float((close.iloc[-1] - close.iloc[0]) / close.iloc[0])
+    return_score = (min(max(total_return, -1.0), 3.0) + 1.0) / 4.0 * 100.0
+
+    # --- Max drawdown (rolling peak-to-trough) ---
+    rolling_max = close.cummax()
+    drawdowns = (close - rolling_max) / rolling_max
+    max_dd = float(drawdowns.min())  # most negative value
+    # map [-1, 0] -> [0, 100]; less drawdown = higher score
+    drawdown_score = (1.0 + max(max_dd, -1.0)) * 100.0
 
-        # --- Max drawdown (rolling peak-to-trough) ---
-        rolling_max = close.cummax()
-        drawdowns = (close - rolling_max) / rolling_max
-        max_dd = float(drawdowns.min())  # most negative value
-        # map [-1, 0] -> [0, 100]; less drawdown = higher score
-        drawdown_score = (1.0 + max(max_dd, -1.0)) * 100.0
+    # --- Monthly consistency (% of months with positive return) ---
+    monthly = close.resample("ME").last().pct_change().dropna()
+    if len(monthly) == 0:
+        consistency_score = 50.0
+    else:
+        pct_positive = float((monthly > 0).sum()) / len(monthly)
+        consistency_score = pct_positive * 100.0
 
-        # --- Monthly consistency (% of months with positive return) ---
-        monthly = close.resample("ME").last().pct_change().dropna()
-        if len(monthly) == 0:
-            consistency_score = 50.0
-        else:
-            pct_positive = float((monthly > 0).sum()) / len(monthly)
-            consistency_score = pct_positive * 100.0
+    score = (return_score + drawdown_score + consistency_score) / 3.0
+    return round(min(max(score, 0.0), 100.0), 2)
 
-        score = (return_score + drawdown_score + consistency_score) / 3.0
-        return round(min(max(score, 0.0), 100.0), 2)
 
+def compute_relative_strength(
+    ticker: str,
+    all_histories: "pd.DataFrame",  # noqa: F821
+    domain_tickers: list[str],
+) -> float | None:
+    """5-day return of *ticker* minus the median 5-day return of its domain peers.
+
+    Split out of compute_factors_for_ticker() because it is the only factor that
+    depends on domain membership — a membership change re-derives it from the
+    cached history without refetching anything else.
+    """
+    try:
+        stock_return_val = float(all_histories["Close"][ticker].pct_change(5).iloc[-1])
+        if math.isnan(stock_return_val):
+            return None
+        peer_returns = []
+        for peer in domain_tickers:
+            try:
+                r = float(all_histories["Close"][peer].pct_change(5).iloc[-1])
+                if not math.isnan(r):
+                    peer_returns.append(r)
+            except Exception:
+                pass
+        if peer_returns:
+            median_return = float(np.median(peer_returns))
+            return stock_return_val - median_return
     except Exception as exc:
-        logger.warning("compute_long_term_score failed for %s: %s", ticker, exc)
-        return None
+        logger.warning("relative_strength computation failed for %s: %s", ticker, exc)
+    return None
 
 
 def compute_factors_for_ticker(
@@ -201,74 +372,9 @@ def compute_factors_for_ticker(
     Values are float or None when the factor cannot be computed.
     """
     try:
-        # --- Factor 1: momentum (5-day price return) ---
-        momentum: float | None = None
-        try:
-            close_series = history["Close"][ticker].dropna()
-            if len(close_series) >= 6:
-                val = float(close_series.pct_change(5).iloc[-1])
-                momentum = None if math.isnan(val) else val
-        except Exception as exc:
-            logger.warning("momentum computation failed for %s: %s", ticker, exc)
-
-        # --- Factor 2: volume_change (5-day % change) ---
-        volume_change: float | None = None
-        try:
-            vol_series = history["Volume"][ticker].dropna()
-            if len(vol_series) >= 6:
-                val = float(vol_series.pct_change(5).iloc[-1])
-                volume_change = None if math.isnan(val) else val
-        except Exception as exc:
-            logger.warning("volume_change computation failed for %s: %s", ticker, exc)
-
-        # --- Factor 3: volatility (21-day rolling std — INVERTED before returning) ---
-        volatility: float | None = None
-        try:
-            close_series = history["Close"][ticker].dropna()
-            if len(close_series) >= 22:
-                log_returns = np.log(close_series / close_series.shift(1)).dropna()
-                vol_raw = float(log_returns.rolling(21).std(ddof=0).iloc[-1])
-                if not math.isnan(vol_raw):
-                    volatility = -1.0 * vol_raw  # INVERT: lower std = less risky = higher score
-        except Exception as exc:
-            logger.warning("volatility computation failed for %s: %s", ticker, exc)
-
-        # --- Factor 4: relative_strength (ticker return minus median of domain peers) ---
-        relative_strength: float | None = None
-        try:
-            stock_return_val = float(all_histories["Close"][ticker].pct_change(5).iloc[-1])
-            if not math.isnan(stock_return_val):
-                peer_returns = []
-                for peer in domain_tickers:
-                    try:
-                        r = float(all_histories["Close"][peer].pct_change(5).iloc[-1])
-                        if not math.isnan(r):
-                            peer_returns.append(r)
-                    except Exception:
-                        pass
-                if peer_returns:
-                    median_return = float(np.median(peer_returns))
-                    relative_strength = stock_return_val - median_return
-        except Exception as exc:
-            logger.warning("relative_strength computation failed for %s: %s", ticker, exc)
-
-        # --- Factor 5: financial_ratio (trailingPE — INVERTED before returning) ---
-        financial_ratio: float | None = None
-        try:
-            info = yf.Ticker(ticker).info
-            pe = info.get("trailingPE")  # .get() — NEVER dict-style access
-            if pe is not None:
-                financial_ratio = -1.0 * float(pe)  # INVERT: lower PE = cheaper = higher score
-        except Exception as exc:
-            logger.warning("financial_ratio computation failed for %s: %s", ticker, exc)
-
-        return {
-            "momentum": momentum,
-            "volume_change": volume_change,
-            "volatility": volatility,
-            "relative_strength": relative_strength,
-            "financial_ratio": financial_ratio,
-        }
+        factors = compute_price_factors(ticker, history, all_histories, domain_tickers)
+        factors["financial_ratio"] = fetch_financial_ratio(ticker)
+        return factors
 
     except Exception as exc:
         logger.warning("compute_factors_for_ticker failed entirely for %s: %s", ticker, exc)
@@ -279,3 +385,99 @@ def compute_factors_for_ticker(
             "relative_strength": None,
             "financial_ratio": None,
         }
+
+
+def compute_price_factors(
+    ticker: str,
+    history: "pd.DataFrame",  # noqa: F821
+    all_histories: "pd.DataFrame",  # noqa: F821
+    domain_tickers: list[str],
+) -> dict[str, float | None]:
+    """The four price-derived factors of compute_factors_for_ticker() — pure CPU, no I/O.
+
+    *history* only needs to support history["Close"][ticker] and
+    history["Volume"][ticker], so worker processes can pass plain dicts of frames.
+    """
+    # --- Factor 1: momentum (5-day price return) ---
+    momentum: float | None = None
+    try:
+        close_series = history["Close"][ticker].dropna()
+        if len(close_series) >= 6:
+            val = float(close_series.pct_change(5).iloc[-1])
+            momentum = None if math.isnan(val) else val
+    except Exception as exc:
+        logger.warning("momentum computation failed for %s: %s", ticker, exc)
+
+    # --- Factor 2: volume_change (5-day % change) ---
+    volume_change: float | None = None
+    try:
+        vol_series = history["Volume"][ticker].dropna()
+        if len(vol_series) >= 6:
+            val = float(vol_series.pct_change(5).iloc[-1])
+            volume_change = None if math.isnan(val) else val
+    except Exception as exc:
+        logger.warning("volume_change computation failed for %s: %s", ticker, exc)
+
+    # --- Factor 3: volatility (21-day rolling std — INVERTED before returning) ---
+    volatility: float | None = None
+    try:
+        close_series = history["Close"][ticker].dropna()
+        if len(close_series) >= 22:
+            log_returns = np.log(close_series / close_series.shift(1)).dropna()
+            vol_raw = float(log_returns.rolling(21).std(ddof=0).iloc[-1])
+            if not math.isnan(vol_raw):
+                volatility = -1.0 * vol_raw  # INVERT: lower std = less risky = higher score
+    except Exception as exc:
+        logger.warning("volatility computation failed for %s: %s", ticker, exc)
+
+    # --- Factor 4: relative_strength (ticker return minus median of domain peers) ---
+    relative_strength = compute_relative_strength(ticker, all_histories, domain_tickers)
+
+    return {
+        "momentum": momentum,
+        "volume_change": volume_change,
+        "volatility": volatility,
+        "relative_strength": relative_strength,
+    }
+
+
+def fetch_financial_ratio(ticker: str) -> float | None:
+    """Factor 5: financial_ratio (trailingPE — INVERTED before returning). Network-bound."""
+    try:
+        pe = get_provider().fundamentals(ticker).get("trailing_pe")
+        if pe is not None:
+            return -1.0 * float(pe)  # INVERT: lower PE = cheaper = higher score
+    except ProviderUnavailable:
+        pass  # circuit open: the retry queue picks the ticker up once it closes
+    except Exception as exc:
+        logger.warning("financial_ratio computation failed for %s: %s", ticker, exc)
+    return None
+
+
+def fingerprint_inputs(
+    history: "pd.DataFrame",
+    latest: dict[str, dict],
+    fundamentals: dict[str, float | None],
+    domain_groups: dict[str, list[str]],
+) -> str:
+    """SHA-256 over a cycle's inputs: price panel, latest bars, fundamentals, membership.
+
+    Two cycles with the same fingerprint produce identical rankings, so the second
+    one can skip ranking and every insert.
+    """
+    digest = hashlib.sha256()
+    history = history.sort_index(axis=1)  # column order depends on request order
+    digest.update(pd.util.hash_pandas_object(history, index=True).to_numpy().tobytes())
+    digest.update(json.dumps([str(c) for c in history.columns]).encode())
+    digest.update(
+        json.dumps(
+            {
+                "latest": latest,
+                "fundamentals": fundamentals,
+                "domains": {name: sorted(tickers) for name, tickers in domain_groups.items()},
+            },
+            sort_keys=True,
+            default=str,
+        ).encode()
+    )
+    return digest.hexdigest()
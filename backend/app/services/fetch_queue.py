@@ -0,0 +1,424 @@
+"""
+fetch_queue.py — Sharded fetch runs over a Postgres SKIP LOCKED work queue.
+
+With FETCH_MODE=queue the scheduler leader no longer fetches anything itself.
+Each cycle it enqueues a FetchRun split into FetchShards of whole domains
+(relative_strength compares a ticker with its domain peers, so a domain never
+spans shards). Any number of `python -m app.worker` processes, on any node,
+claim shards with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers
+never wait on each other or take the same shard. A worker downloads its
+shard's history, computes factors, long-term scores and per-domain input
+fingerprints with the local cycle's helpers and stores them, with the latest
+bars, on the shard row. Each shard is a "fetch_shard" run in the run ledger.
+
+Whoever completes a run's last shard ranks it: completion takes a row lock on
+the FetchRun, so exactly one finalizer sees "no shards outstanding" and ranks
+every domain from the stored shard results. Like a local cycle (and recorded
+in the ledger as a "fetch_cycle" run), it writes rankings and price snapshots
+only for domains whose fingerprint changed, all under one computed_at, and
+nothing but last_verified_at when none did. A claim older than
+QUEUE_CLAIM_TIMEOUT_SECONDS is treated as abandoned (worker crashed) and can
+be claimed again; a shard that fails or is abandoned QUEUE_MAX_ATTEMPTS times
+is given up and its domains keep their previous rankings.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import socket
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Engine, and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.fetch_queue import FetchRun, FetchShard
+from app.models.ranking_run import RankingRun
+from app.models.score_snapshot import ScoreSnapshot
+from app.models.stock import Stock
+from app.services.data_fetcher import extract_latest, slim_panel
+from app.services.health import health_state
+from app.services.market_data import get_provider
+from app.services.ranking_engine import rank_domain
+from app.services.run_ledger import RunStats, frame_bytes, recorded_run
+
+logger = logging.getLogger(__name__)
+
+_OUTSTANDING = ("pending", "claimed")
+
+
+@dataclass(frozen=True)
+class ClaimedShard:
+    id: int
+    run_id: int
+    domains: dict[str, list[str]]
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def plan_shards(domain_groups: dict[str, list[str]], shard_size: int) -> list[dict[str, list[str]]]:
+    """Pack whole domains, in order, into shards of up to *shard_size* tickers.
+
+    A domain larger than shard_size becomes a shard of its own.
+    """
+    shards: list[dict[str, list[str]]] = []
+    current: dict[str, list[str]] = {}
+    size = 0
+    for name, tickers in domain_groups.items():
+        if not tickers:
+            continue
+        if current and size + len(tickers) > shard_size:
+            shards.append(current)
+            current, size = {}, 0
+        current[name] = list(tickers)
+        size += len(tickers)
+    if current:
+        shards.append(current)
+    return shards
+
+
+# ---------------------------------------------------------------------------
+# Leader side
+# ---------------------------------------------------------------------------
+
+
+def enqueue_run(
+    session: Session,
+    domain_groups: dict[str, list[str]],
+    shard_size: int | None = None,
+) -> FetchRun | None:
+    """Create a FetchRun and its shards. Returns None while a recent run is still open."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.queue_claim_timeout_seconds)
+    open_run = session.execute(
+        select(FetchRun.id).where(FetchRun.status == "pending", FetchRun.created_at >= cutoff)
+    ).first()
+    if open_run is not None:
+        logger.warning("enqueue_run: run %d still in progress, not enqueuing", open_run.id)
+        return None
+
+    shards = plan_shards(domain_groups, shard_size or settings.queue_shard_size)
+    if not shards:
+        return None
+    run = FetchRun(status="pending", shard_count=len(shards))
+    session.add(run)
+    session.flush()
+    session.add_all(FetchShard(run_id=run.id, domains=domains) for domains in shards)
+    session.commit()
+    logger.info("enqueue_run: run %d with %d shards", run.id, len(shards))
+    return run
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+
+def claim_shard(session: Session, worker_id: str) -> ClaimedShard | None:
+    """Claim the oldest available shard without blocking on other workers' claims.
+
+    An abandoned claim on a shard that has used its QUEUE_MAX_ATTEMPTS (it most
+    likely kills its worker: OOM, crash, node loss) fails the shard instead, so
+    its run can still finalize.
+    """
+    while True:
+        now = datetime.now(timezone.utc)
+        stale = now - timedelta(seconds=settings.queue_claim_timeout_seconds)
+        shard = session.execute(
+            select(FetchShard)
+            .where(
+                or_(
+                    FetchShard.status == "pending",
+                    and_(FetchShard.status == "claimed", FetchShard.claimed_at < stale),
+                )
+            )
+            .order_by(FetchShard.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar_one_or_none()
+        if shard is None:
+            session.rollback()
+            return None
+        if shard.status != "claimed":
+            break
+        if shard.attempts < settings.queue_max_attempts:
+            logger.warning("claim_shard: reclaiming shard %d from %s", shard.id, shard.claimed_by)
+            break
+        logger.error(
+            "claim_shard: giving up on shard %d, abandoned after %d attempts",
+            shard.id,
+            shard.attempts,
+        )
+        shard.status = "failed"
+        shard.claimed_by = None
+        shard.claimed_at = None
+        shard.finished_at = now
+        _maybe_finalize(session, shard.run_id)
+        session.commit()
+    shard.status = "claimed"
+    shard.claimed_by = worker_id
+    shard.claimed_at = now
+    shard.attempts += 1
+    claimed = ClaimedShard(id=shard.id, run_id=shard.run_id, domains=dict(shard.domains))
+    session.commit()
+    return claimed
+
+
+def _finite_or_none(value):
+    if value is None:
+        return None
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+def compute_shard(domains: dict[str, list[str]], run: RunStats) -> dict:
+    """Download, factor, fingerprint and long-term-score one shard like a local cycle.
+
+    Raises on download failure.
+    """
+    # avoid circular import at module level
+    from app.scheduler import (
+        _chunk_factors,
+        _domain_fingerprint,
+        _long_term_scores,
+        _missing_inputs,
+    )
+
+    tickers = [t for group in domains.values() for t in group]
+    run.add(tickers_attempted=len(tickers))
+    with run.stage("download"):
+        raw = get_provider().history(tickers)
+        run.add(bytes_downloaded=frame_bytes(raw))
+        history = slim_panel(raw, tickers)
+        latest = extract_latest(raw, tickers)
+    with run.stage("factors"):
+        factors = _chunk_factors(domains, history)
+        fingerprints = {
+            name: _domain_fingerprint(name, group, history, latest, factors[name])
+            for name, group in domains.items()
+        }
+    run.add(
+        tickers_succeeded=sum(
+            not _missing_inputs(t, latest, factors[name][t])
+            for name, group in domains.items()
+            for t in group
+        )
+    )
+    long_term = _long_term_scores(tickers, run)
+    return {
+        "latest": latest,
+        "factors": {
+            name: {
+                t: {k: _finite_or_none(v) for k, v in values.items()}
+                for t, values in domain_factors.items()
+            }
+            for name, domain_factors in factors.items()
+        },
+        "long_term": {t: _finite_or_none(long_term.get(t)) for t in tickers},
+        "fingerprints": fingerprints,
+    }
+
+
+def complete_shard(session: Session, shard: ClaimedShard, worker_id: str, result: dict) -> bool:
+    """Store a shard's output and finalize the run if it was the last one.
+
+    Returns False (writing nothing) when the claim was lost to another worker.
+    Snapshots are left to finalize_run, which skips them for unchanged inputs.
+    """
+    now = datetime.now(timezone.utc)
+    owned = session.execute(
+        update(FetchShard)
+        .where(
+            FetchShard.id == shard.id,
+            FetchShard.status == "claimed",
+            FetchShard.claimed_by == worker_id,
+        )
+        .values(status="done", result=result, finished_at=now)
+    ).rowcount
+    if not owned:
+        session.rollback()
+        logger.warning("complete_shard: shard %d was reclaimed, dropping result", shard.id)
+        return False
+    _maybe_finalize(session, shard.run_id)
+    session.commit()
+    return True
+
+
+def fail_shard(session: Session, shard: ClaimedShard, worker_id: str) -> None:
+    """Release a shard for retry, or give up after QUEUE_MAX_ATTEMPTS."""
+    attempts = session.execute(
+        select(FetchShard.attempts).where(FetchShard.id == shard.id)
+    ).scalar_one()
+    give_up = attempts >= settings.queue_max_attempts
+    session.execute(
+        update(FetchShard)
+        .where(FetchShard.id == shard.id, FetchShard.claimed_by == worker_id)
+        .values(
+            status="failed" if give_up else "pending",
+            claimed_by=None,
+            claimed_at=None,
+            finished_at=datetime.now(timezone.utc) if give_up else None,
+        )
+    )
+    if give_up:
+        _maybe_finalize(session, shard.run_id)
+    session.commit()
+
+
+def _maybe_finalize(session: Session, run_id: int) -> None:
+    """Rank the run if no shard is outstanding. Caller commits.
+
+    The FOR UPDATE on the run row serializes concurrent completions, so only one
+    of them can observe the run as pending with nothing outstanding.
+    """
+    run = session.execute(
+        select(FetchRun).where(FetchRun.id == run_id).with_for_update()
+    ).scalar_one()
+    if run.status != "pending":
+        return
+    outstanding = session.execute(
+        select(func.count())
+        .select_from(FetchShard)
+        .where(FetchShard.run_id == run_id, FetchShard.status.in_(_OUTSTANDING))
+    ).scalar_one()
+    if outstanding:
+        return
+    finalize_run(session, run)
+
+
+def finalize_run(session: Session, run: FetchRun) -> None:
+    """Rank the changed domains of *run* from its completed shards and publish them."""
+    with recorded_run(session.get_bind(), "fetch_cycle") as stats, stats.stage("finalize"):
+        _finalize(session, run, stats)
+
+
+def _finalize(session: Session, run: FetchRun, stats: RunStats) -> None:
+    # avoid circular import at module level
+    from app.scheduler import _combined_fingerprint, _persist_rankings
+
+    shards = session.execute(
+        select(FetchShard.domains, FetchShard.result).where(FetchShard.run_id == run.id)
+    ).all()
+    stats.add(tickers_attempted=sum(len(g) for s in shards for g in s.domains.values()))
+    results = [s.result for s in shards if s.result is not None]
+    now = datetime.now(timezone.utc)
+    run.finished_at = now
+    if not results:
+        logger.warning("finalize_run: run %d has no completed shards", run.id)
+        run.status = stats.status = "failed"
+        return
+
+    previous = session.execute(
+        select(RankingRun).order_by(RankingRun.computed_at.desc()).limit(1)
+    ).scalar_one_or_none()
+    previous_fps = dict(previous.domain_fingerprints or {}) if previous is not None else {}
+    # Domains of failed shards keep their previous fingerprint (and rankings)
+    run_domains = {name for s in shards for name in s.domains}
+    domain_fps = {name: fp for name, fp in previous_fps.items() if name in run_domains}
+    changed: list[tuple[str, dict]] = []
+    ticker_count = 0
+    for result in results:
+        stats.add(tickers_succeeded=sum(len(f) for f in result["factors"].values()))
+        ticker_count += sum(len(f) for f in result["factors"].values())
+        for name, fingerprint in result["fingerprints"].items():
+            domain_fps[name] = fingerprint
+            if previous_fps.get(name) != fingerprint:
+                changed.append((name, result))
+
+    if not changed and previous is not None:
+        previous.last_verified_at = now
+        run.status = "skipped"
+        health_state.record_cycle(previous.id, previous.computed_at, now)
+        logger.info("finalize_run: run %d inputs unchanged since run %d", run.id, previous.id)
+        return
+
+    ranking_count = 0
+    for name, result in changed:
+        stocks_data = result["factors"][name]
+        latest = {t: result["latest"][t] for t in stocks_data if t in result["latest"]}
+        for ticker, values in latest.items():
+            session.add(
+                ScoreSnapshot(
+                    ticker=ticker,
+                    close_price=values["close_price"],
+                    volume=values["volume"],
+                    fetched_at=now,
+                )
+            )
+        if latest:
+            session.execute(update(Stock).where(Stock.ticker.in_(latest)).values(last_updated=now))
+        ranked = rank_domain(stocks_data)
+        stored = _persist_rankings(session, name, ranked, result["long_term"], now)
+        stats.add(rows_inserted=len(latest) + stored)
+        ranking_count += stored
+    ranking_run = RankingRun(
+        computed_at=now,
+        fingerprint=_combined_fingerprint(domain_fps),
+        last_verified_at=now,
+        ticker_count=ticker_count,
+        domain_fingerprints=domain_fps,
+    )
+    session.add(ranking_run)
+    session.flush()
+    stats.add(rows_inserted=1)
+    run.status = "done"
+    health_state.record_cycle(ranking_run.id, now, now)
+    logger.info(
+        "finalize_run: run %d ranked %d of %d domains (%d rows) from %d shards",
+        run.id,
+        len(changed),
+        len(domain_fps),
+        ranking_count,
+        len(results),
+    )
+
+
+def consume(
+    engine: Engine,
+    worker_id: str | None = None,
+    *,
+    compute: Callable[[dict[str, list[str]], RunStats], dict] = compute_shard,
+    poll_seconds: float | None = None,
+    stop: Callable[[], bool] = lambda: False,
+    exit_when_idle: bool = False,
+) -> int:
+    """Claim and process shards until *stop()* (or, with exit_when_idle, the queue is empty).
+
+    Returns the number of shards this worker completed.
+    """
+    worker_id = worker_id or default_worker_id()
+    poll = settings.queue_poll_seconds if poll_seconds is None else poll_seconds
+    completed = 0
+    while not stop():
+        with Session(engine) as session:
+            shard = claim_shard(session, worker_id)
+        if shard is None:
+            if exit_when_idle:
+                break
+            time.sleep(poll)
+            continue
+        started = time.perf_counter()
+        try:
+            with recorded_run(engine, "fetch_shard") as stats:
+                result = compute(shard.domains, stats)
+        except Exception as exc:
+            logger.error("consume: shard %d failed: %s", shard.id, exc)
+            with Session(engine) as session:
+                fail_shard(session, shard, worker_id)
+            continue
+        with Session(engine) as session:
+            if complete_shard(session, shard, worker_id, result):
+                completed += 1
+        logger.info(
+            "consume: shard %d (%d domains) done in %.2fs",
+            shard.id,
+            len(shard.domains),
+            time.perf_counter() - started,
+        )
+    return completed
@@ -0,0 +1,113 @@
+"""
+health.py — Pipeline health kept in memory by the process that runs the jobs.
+
+The scheduler updates health_state as it goes (every recorded run, each fetch
+cycle's pipeline stages, the retry queue), so GET /api/health/live answers from
+memory without touching the database. Processes that run no jobs (API replicas
+behind RUN_SCHEDULER=false, queue-mode workers, followers of the scheduler
+lock) have nothing here and report the cached readiness probe instead; see
+routers/health.py. A leader that steps down clears its state, so it does not
+keep reporting the freshness it had when it stopped running the jobs.
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import datetime, timezone
+
+# Stale tickers listed by name in the health payload; the count is always complete
+STALE_SAMPLE = 20
+
+
+class HealthState:
+    """Last run of each job, the latest cycle's stages and the stale tickers."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.jobs: dict[str, dict] = {}
+        self.stages: dict[str, dict] = {}
+        self.last_run_id: int | None = None
+        self.last_success_at: datetime | None = None
+        self.last_fetched: datetime | None = None
+        self.last_verified: datetime | None = None
+        self.stale_tickers: list[str] = []
+
+    def record_run(self, job: str, status: str, finished_at: datetime, seconds: float) -> None:
+        """One fetch_cycle / snapshot_job run finished (called by the run ledger)."""
+        with self._lock:
+            previous = self.jobs.get(job, {})
+            self.jobs[job] = {
+                "status": status,
+                "finished_at": finished_at,
+                "seconds": round(seconds, 3),
+                "last_ok_at": finished_at if status == "ok" else previous.get("last_ok_at"),
+            }
+
+    def record_stages(self, timings) -> None:
+        """Per-stage outcome of the latest fetch_cycle pipeline (StageTiming list)."""
+        with self._lock:
+            self.stages = {
+                t.name: {
+                    "status": "ok" if t.errors == 0 else "errors",
+                    "items": t.items_out,
+                    "errors": t.errors,
+                    "seconds": round(t.wall_seconds, 3),
+                }
+                for t in timings
+            }
+
+    def record_cycle(self, run_id: int, fetched_at: datetime, verified_at: datetime) -> None:
+        """A fetch_cycle published or re-confirmed ranking run *run_id*."""
+        with self._lock:
+            self.last_run_id = run_id
+            self.last_success_at = verified_at
+            self.last_fetched = fetched_at
+            self.last_verified = verified_at
+
+    def set_stale(self, tickers: list[str]) -> None:
+        with self._lock:
+            self.stale_tickers = sorted(tickers)
+
+    def clear(self) -> None:
+        """Forget everything; called when this process stops running the jobs."""
+        with self._lock:
+            self.jobs, self.stages = {}, {}
+            self.last_run_id = self.last_success_at = None
+            self.last_fetched = self.last_verified = None
+            self.stale_tickers = []
+
+    def freshness(self) -> tuple[datetime | None, datetime | None]:
+        """(last_fetched, last_verified); both None until this process completes a cycle."""
+        with self._lock:
+            return self.last_fetched, self.last_verified
+
+    def snapshot(self) -> dict:
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            return {
+                "last_run_id": self.last_run_id,
+                "last_success_at": _iso(self.last_success_at),
+                "lag_seconds": (
+                    round((now - self.last_verified).total_seconds(), 1)
+                    if self.last_verified
+                    else None
+                ),
+                "jobs": {
+                    job: {
+                        **run,
+                        "finished_at": _iso(run["finished_at"]),
+                        "last_ok_at": _iso(run["last_ok_at"]),
+                    }
+                    for job, run in self.jobs.items()
+                },
+                "stages": dict(self.stages),
+                "stale_tickers": len(self.stale_tickers),
+                "stale_sample": self.stale_tickers[:STALE_SAMPLE],
+            }
+
+
+def _iso(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+health_state = HealthState()
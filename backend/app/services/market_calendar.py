@@ -0,0 +1,224 @@
+"""
+market_calendar.py — Offline NYSE calendar and market-aware fetch schedule.
+
+Holidays and early closes are derived from the exchange's published rules,
+so no network or third-party calendar is needed. All session times are
+computed in America/New_York and returned as aware datetimes, which keeps
+the schedule correct across DST changes.
+
+Each trading day has three fetch phases:
+  pre-market   04:00 → open            every `sparse`
+  regular      open → close            every `dense` (close included)
+  post-market  close → close + 4h      every `sparse` (last fetch at close + 4h)
+Closed days (weekends, holidays) have no fetches at all.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from apscheduler.triggers.base import BaseTrigger
+
+NY = ZoneInfo("America/New_York")
+
+PRE_MARKET_OPEN = time(4, 0)
+REGULAR_OPEN = time(9, 30)
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+POST_MARKET_HOURS = 4  # extended session ends 4h after the close (20:00, or 17:00 on early closes)
+
+# One-off closures that no rule predicts (national days of mourning)
+SPECIAL_CLOSURES: dict[date, str] = {
+    date(2018, 12, 5): "National Day of Mourning (George H.W. Bush)",
+    date(2025, 1, 9): "National Day of Mourning (Jimmy Carter)",
+}
+
+
+@dataclass(frozen=True)
+class TradingSession:
+    """Session boundaries for one trading day, as aware datetimes in America/New_York."""
+
+    day: date
+    pre_open: datetime
+    open: datetime
+    close: datetime
+    post_close: datetime
+
+    @property
+    def early_close(self) -> bool:
+        return self.close.time() != REGULAR_CLOSE
+
+
+# ---------------------------------------------------------------------------
+# Holiday rules
+# ---------------------------------------------------------------------------
+
+
+def _easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    ell = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * ell) // 451
+    month, day = divmod(h + ell - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th (1-based) given weekday of a month; n = -1 for the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day: date) -> date:
+    """Saturday holidays are observed Friday, Sunday holidays Monday."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def nyse_holidays(year: int) -> dict[date, str]:
+    """Full-day NYSE closures in *year*."""
+    holidays: dict[date, str] = {}
+
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:  # Saturday New Year's Day is not observed on Dec 31
+        holidays[_observed(new_year)] = "New Year's Day"
+    holidays[_nth_weekday(year, 1, 0, 3)] = "Martin Luther King Jr. Day"
+    holidays[_nth_weekday(year, 2, 0, 3)] = "Washington's Birthday"
+    holidays[_easter(year) - timedelta(days=2)] = "Good Friday"
+    holidays[_nth_weekday(year, 5, 0, -1)] = "Memorial Day"
+    if year >= 2022:
+        holidays[_observed(date(year, 6, 19))] = "Juneteenth"
+    holidays[_observed(date(year, 7, 4))] = "Independence Day"
+    holidays[_nth_weekday(year, 9, 0, 1)] = "Labor Day"
+    holidays[_nth_weekday(year, 11, 3, 4)] = "Thanksgiving Day"
+    holidays[_observed(date(year, 12, 25))] = "Christmas Day"
+
+    holidays.update({d: name for d, name in SPECIAL_CLOSURES.items() if d.year == year})
+    return holidays
+
+
+def early_closes(year: int) -> set[date]:
+    """13:00 closes: July 3 (when July 4 falls Tue–Fri), day after Thanksgiving, Christmas Eve."""
+    closes = {_nth_weekday(year, 11, 3, 4) + timedelta(days=1)}
+    july_3 = date(year, 7, 3)
+    if july_3.weekday() < 4:
+        closes.add(july_3)
+    christmas_eve = date(year, 12, 24)
+    if christmas_eve.weekday() < 4:
+        closes.add(christmas_eve)
+    return closes
+
+
+def trading_session(day: date) -> TradingSession | None:
+    """Session for *day*, or None when the exchange is closed."""
+    if day.weekday() >= 5 or day in nyse_holidays(day.year):
+        return None
+    close = EARLY_CLOSE if day in early_closes(day.year) else REGULAR_CLOSE
+    close_at = datetime.combine(day, close, NY)
+    return TradingSession(
+        day=day,
+        pre_open=datetime.combine(day, PRE_MARKET_OPEN, NY),
+        open=datetime.combine(day, REGULAR_OPEN, NY),
+        close=close_at,
+        post_close=close_at + timedelta(hours=POST_MARKET_HOURS),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Fetch schedule
+# ---------------------------------------------------------------------------
+
+
+def fetch_times(session: TradingSession, dense: timedelta, sparse: timedelta) -> list[datetime]:
+    """All fetch times for one trading day, ascending. The last one is the post-close end."""
+    times: list[datetime] = []
+
+    t = session.pre_open
+    while t < session.open:
+        times.append(t)
+        t += sparse
+    t = session.open
+    while t <= session.close:
+        times.append(t)
+        t += dense
+    if times[-1] != session.close:
+        times.append(session.close)
+    t = session.close + sparse
+    while t < session.post_close:
+        times.append(t)
+        t += sparse
+    times.append(session.post_close)
+    return times
+
+
+def next_fetch_time(
+    after: datetime,
+    dense: timedelta,
+    sparse: timedelta,
+    max_days: int = 14,
+) -> datetime | None:
+    """First fetch time strictly after *after* (an aware datetime), skipping closed days."""
+    day = after.astimezone(NY).date()
+    for _ in range(max_days):
+        session = trading_session(day)
+        if session is not None and session.post_close > after:
+            for t in fetch_times(session, dense, sparse):
+                if t > after:
+                    return t
+        day += timedelta(days=1)
+    return None
+
+
+def final_fetch_time(day: date) -> datetime | None:
+    """The post-close fetch that ends *day*'s schedule, or None on closed days."""
+    session = trading_session(day)
+    return session.post_close if session else None
+
+
+def completed_session(at: datetime) -> date | None:
+    """Trading day whose schedule has ended by *at* (same New York date), else None.
+
+    Used right after a scheduled fetch: a non-None result means that fetch was the
+    day's final post-close cycle and the EOD snapshot is due.
+    """
+    local = at.astimezone(NY)
+    session = trading_session(local.date())
+    if session is None or local < session.post_close:
+        return None
+    return session.day
+
+
+class MarketCalendarTrigger(BaseTrigger):
+    """APScheduler trigger that fires on the NYSE fetch schedule (see module docstring)."""
+
+    __slots__ = ("dense", "sparse")
+
+    def __init__(self, dense_minutes: int, sparse_minutes: int) -> None:
+        self.dense = timedelta(minutes=dense_minutes)
+        self.sparse = timedelta(minutes=sparse_minutes)
+
+    def get_next_fire_time(self, previous_fire_time, now):
+        if previous_fire_time is None:
+            # First run: allow "exactly now" so a start on a boundary is not skipped
+            return next_fetch_time(now - timedelta(microseconds=1), self.dense, self.sparse)
+        return next_fetch_time(previous_fire_time, self.dense, self.sparse)
+
+    def __str__(self) -> str:
+        return f"market[dense={self.dense}, sparse={self.sparse}]"
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} (dense={self.dense!r}, sparse={self.sparse!r})>"
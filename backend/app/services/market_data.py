@@ -0,0 +1,264 @@
+"""
+market_data.py — Market-data provider interface and the offline replay provider.
+
+Everything that needs prices or fundamentals asks get_provider() instead of
+calling yfinance directly. MARKET_DATA_PROVIDER picks the implementation:
+
+  - "yfinance" (default): data_fetcher.YFinanceProvider, live Yahoo data
+    through the provider gateway.
+  - "replay": ReplayProvider, recorded panels from REPLAY_PATH. No network,
+    so benchmarks, load tests and CI can run a full fetch_cycle offline.
+
+A replay directory holds `prices.{parquet,csv}` in long format (date, ticker,
+close, volume) and optionally `fundamentals.{parquet,csv}` (ticker, name,
+trailing_pe) and `universe.csv` (ticker, name, domain; see app/replay.py).
+Parquet files need pyarrow. write_synthetic() generates such a directory for
+any number of tickers; synthetic_market() builds the same data in memory.
+
+The replay clock: with REPLAY_SPEED = 0 every call sees the recording up to
+its last bar. With REPLAY_SPEED = n the replay starts one year into the
+recording and advances n bars per wall-clock second, stopping at the end.
+REPLAY_LATENCY_MS adds a fixed delay to every call to mimic the upstream.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections.abc import Callable
+from datetime import date
+from pathlib import Path
+from typing import Protocol
+
+import numpy as np
+import pandas as pd
+
+_PERIOD = re.compile(r"^(\d+)(d|wk|mo|y)$")
+_PERIOD_DAYS = {"d": 1, "wk": 7, "mo": 30, "y": 365}
+
+
+class MarketDataProvider(Protocol):
+    def history(self, tickers: list[str], period: str = "30d") -> pd.DataFrame:
+        """Daily bars as a yf.download()-style frame: (field, ticker) columns, date index.
+
+        Unknown tickers come back as all-NaN columns, not as an error.
+        """
+        ...
+
+    def latest(self, tickers: list[str]) -> dict[str, dict]:
+        """ticker -> {"close_price", "volume"} of the latest valid bar."""
+        ...
+
+    def fundamentals(self, ticker: str) -> dict:
+        """{"name": str | None, "trailing_pe": float | None}."""
+        ...
+
+    def lookup(self, symbol: str) -> str | None:
+        """Display name if *symbol* is a known ticker, else None."""
+        ...
+
+
+def _period_days(period: str) -> int:
+    match = _PERIOD.match(period)
+    if match is None:
+        raise ValueError(f"unsupported period {period!r}")
+    return int(match.group(1)) * _PERIOD_DAYS[match.group(2)]
+
+
+def _read_table(path: Path, stem: str) -> pd.DataFrame | None:
+    if (path / f"{stem}.parquet").exists():
+        return pd.read_parquet(path / f"{stem}.parquet")
+    if (path / f"{stem}.csv").exists():
+        return pd.read_csv(path / f"{stem}.csv")
+    return None
+
+
+class ReplayProvider:
+    """Serves recorded daily panels; see the module docstring for the layout and clock."""
+
+    def __init__(
+        self,
+        panel: pd.DataFrame,
+        fundamentals: pd.DataFrame | None = None,
+        speed: float = 0.0,
+        latency_ms: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """*panel*: (field, ticker) columns over a date index.
+
+        *fundamentals*: a table as on disk.
+        """
+        self._frame = panel.sort_index().astype(np.float64)
+        self._dates = self._frame.index
+        self._tickers = set(self._frame.columns.get_level_values(1))
+
+        self._fundamentals: dict[str, dict] = {}
+        if fundamentals is not None:
+            for row in fundamentals.itertuples(index=False):
+                pe = None if pd.isna(row.trailing_pe) else float(row.trailing_pe)
+                self._fundamentals[row.ticker] = {"name": row.name, "trailing_pe": pe}
+
+        self.speed = speed
+        self.latency = latency_ms / 1000
+        self._clock = clock
+        self._started = clock()
+        year_in = self._dates.searchsorted(self._dates[0] + pd.Timedelta(days=365))
+        self._start_bar = min(int(year_in), len(self._dates) - 1)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_path(cls, path: str | Path, **kwargs) -> ReplayProvider:
+        """Load a replay directory (see the module docstring for the layout)."""
+        path = Path(path)
+        prices = _read_table(path, "prices")
+        if prices is None:
+            raise FileNotFoundError(f"no prices.parquet or prices.csv in {path}")
+        prices["date"] = pd.to_datetime(prices["date"])
+        wide = prices.pivot(index="date", columns="ticker", values=["close", "volume"])
+        wide = wide.rename(columns={"close": "Close", "volume": "Volume"}, level=0)
+        return cls(wide, _read_table(path, "fundamentals"), **kwargs)
+
+    def _cursor(self) -> int:
+        """Index of the replay's current bar."""
+        if self.speed <= 0:
+            return len(self._dates) - 1
+        advanced = int((self._clock() - self._started) * self.speed)
+        return min(self._start_bar + advanced, len(self._dates) - 1)
+
+    def _delay(self) -> None:
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def history(self, tickers: list[str], period: str = "30d") -> pd.DataFrame:
+        self._delay()
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        now = self._dates[self._cursor()]
+        start = now - pd.Timedelta(days=_period_days(period))
+        rows = (self._dates > start) & (self._dates <= now)
+        columns = pd.MultiIndex.from_product([["Close", "Volume"], list(tickers)])
+        with self._lock:  # pandas indexing caches are not thread-safe
+            return self._frame.loc[rows].reindex(columns=columns)
+
+    def latest(self, tickers: list[str]) -> dict[str, dict]:
+        history = self.history(tickers, "5d")
+        result: dict[str, dict] = {}
+        for ticker in tickers:
+            close = history["Close"][ticker].dropna()
+            if close.empty:
+                continue
+            result[ticker] = {
+                "close_price": float(close.iloc[-1]),
+                "volume": float(history["Volume"][ticker].loc[close.index[-1]]),
+            }
+        return result
+
+    def fundamentals(self, ticker: str) -> dict:
+        self._delay()
+        return dict(self._fundamentals.get(ticker, {"name": None, "trailing_pe": None}))
+
+    def lookup(self, symbol: str) -> str | None:
+        if symbol not in self._tickers:
+            return None
+        return self._fundamentals.get(symbol, {}).get("name") or symbol
+
+
+def synthetic_market(
+    tickers: int = 5000,
+    days: int = 300,
+    domain_size: int = 25,
+    seed: int = 0,
+    end: date = date(2025, 12, 31),
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Reproducible synthetic market: (price panel, fundamentals table, universe table).
+
+    Each ticker is a geometric random walk with its own drift and volatility,
+    volumes are log-normal, about 5% of tickers have no trailing P/E. Tickers
+    are SYN00000.., grouped *domain_size* at a time into "Synthetic 000".. domains.
+    The panel has the yf.download() layout and feeds ReplayProvider directly.
+    """
+    rng = np.random.default_rng(seed)
+    symbols = [f"SYN{i:05d}" for i in range(tickers)]
+    dates = pd.bdate_range(end=end, periods=days)
+
+    drift = rng.normal(0.0003, 0.0008, tickers)
+    vol = rng.uniform(0.008, 0.04, tickers)
+    returns = rng.normal(drift, vol, (days, tickers))
+    close = (rng.uniform(5, 500, tickers) * np.exp(np.cumsum(returns, axis=0))).round(4)
+    volume = np.exp(rng.normal(rng.uniform(12, 17, tickers), 0.3, (days, tickers))).round()
+    panel = pd.concat(
+        {
+            "Close": pd.DataFrame(close, index=dates, columns=symbols),
+            "Volume": pd.DataFrame(volume, index=dates, columns=symbols),
+        },
+        axis=1,
+    )
+
+    pe = rng.uniform(5, 60, tickers).round(2)
+    pe[rng.random(tickers) < 0.05] = np.nan
+    names = [f"Synthetic {s[3:]}" for s in symbols]
+    fundamentals = pd.DataFrame({"ticker": symbols, "name": names, "trailing_pe": pe})
+    universe = pd.DataFrame(
+        {
+            "ticker": symbols,
+            "name": names,
+            "domain": [f"Synthetic {i // domain_size:03d}" for i in range(tickers)],
+        }
+    )
+    return panel, fundamentals, universe
+
+
+def write_synthetic(
+    path: str | Path,
+    tickers: int = 5000,
+    days: int = 300,
+    domain_size: int = 25,
+    seed: int = 0,
+    fmt: str = "csv",
+) -> Path:
+    """Write synthetic_market() as a replay directory: prices, fundamentals, universe."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    panel, fundamentals, universe = synthetic_market(tickers, days, domain_size, seed)
+    symbols = list(panel["Close"].columns)
+    prices = pd.DataFrame(
+        {
+            "date": np.repeat(panel.index.date, len(symbols)),
+            "ticker": np.tile(symbols, len(panel)),
+            "close": panel["Close"].to_numpy().ravel(),
+            "volume": panel["Volume"].to_numpy().ravel(),
+        }
+    )
+    if fmt == "parquet":
+        prices.to_parquet(path / "prices.parquet", index=False)
+        fundamentals.to_parquet(path / "fundamentals.parquet", index=False)
+    else:
+        prices.to_csv(path / "prices.csv", index=False)
+        fundamentals.to_csv(path / "fundamentals.csv", index=False)
+    universe.to_csv(path / "universe.csv", index=False)
+    return path
+
+
+_provider: MarketDataProvider | None = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> MarketDataProvider:
+    """Process-wide provider chosen by MARKET_DATA_PROVIDER (created on first use)."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            from app.config import settings
+
+            if settings.market_data_provider == "replay":
+                _provider = ReplayProvider.from_path(
+                    settings.replay_path,
+                    speed=settings.replay_speed,
+                    latency_ms=settings.replay_latency_ms,
+                )
+            else:
+                from app.services.data_fetcher import YFinanceProvider
+
+                _provider = YFinanceProvider()
+        return _provider
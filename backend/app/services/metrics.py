@@ -0,0 +1,329 @@
+"""
+metrics.py — In-process counters and histograms rendered for Prometheus.
+
+Served as text exposition format 0.0.4 by GET /metrics (routers/metrics.py).
+No client library: each metric keeps one cell per thread, so the hot path is a
+thread-local dict update with no lock. Scrapes sum the cells; a cell whose
+thread has exited is folded into a retired total, so the short-lived pipeline
+threads of every fetch_cycle don't pile up.
+
+  REQUEST_SECONDS          HTTP latency by route template, method and status
+  CYCLE_SECONDS            fetch_cycle duration
+  STAGE_SECONDS            per-item time of each pipeline stage (fetch_cycle: download,
+                           factors, rank, persist, and long_term inside persist)
+  PROVIDER_CALL_SECONDS    market-data latency by call site (gateway kind) and
+  PROVIDER_CALLS           outcome (ok / client / throttled / failed / error / rejected)
+  POOL_CHECKOUT_SECONDS    time to get a connection from each engine's pool (waits for a
+                           free connection included)
+  POOL_TIMEOUTS            checkouts that gave up after DB_POOL_TIMEOUT
+  REPLICA_FALLBACKS        read-only requests served by the primary while the replica
+                           was unreachable
+  ROWS_WRITTEN             rows inserted / updated / deleted per table
+  CACHE_REQUESTS           hit / miss per cache; hit ratio = hit / (hit + miss)
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from collections.abc import Sequence
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class _Metric:
+    """Label-keyed values, one cell per writing thread."""
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._cells: list[tuple[threading.Thread, dict]] = []
+        self._retired: dict = {}
+        self._lock = threading.Lock()  # cell registration and scrapes only
+        REGISTRY.append(self)
+
+    def _cell(self) -> dict:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = self._local.cell = {}
+            with self._lock:
+                self._cells.append((threading.current_thread(), cell))
+            return cell
+
+    def _key(self, labels: Sequence[str]) -> tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {labels}")
+        return tuple(str(v) for v in labels)
+
+    def _merge(self, into: dict, cell: dict) -> None:
+        raise NotImplementedError
+
+    def collect(self) -> dict:
+        """{label values: value} summed over every thread."""
+        with self._lock:
+            live = []
+            for thread, cell in self._cells:
+                if thread.is_alive():
+                    live.append((thread, cell))
+                else:  # its owner is gone, so nothing writes it any more
+                    self._merge(self._retired, cell)
+            self._cells = live
+            total: dict = {}
+            self._merge(total, self._retired)
+            for _, cell in live:
+                self._merge(total, cell.copy())  # dict.copy() is atomic under the GIL
+        return total
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self.collect().items()):
+            lines.extend(self._samples(key, value))
+        return lines
+
+    def _labels(self, key: tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _samples(self, key: tuple[str, ...], value) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        cell = self._cell()
+        key = self._key(labels)
+        cell[key] = cell.get(key, 0) + amount
+
+    def _merge(self, into: dict, cell: dict) -> None:
+        for key, value in cell.items():
+            into[key] = into.get(key, 0) + value
+
+    def _samples(self, key: tuple[str, ...], value) -> list[str]:
+        return [f"{self.name}_total{self._labels(key)} {_number(value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = _LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        cell = self._cell()
+        key = self._key(labels)
+        # Per-bucket counts (non-cumulative), then +Inf, sum, count
+        slots = cell.get(key)
+        if slots is None:
+            slots = cell[key] = [0] * (len(self.buckets) + 3)
+        slots[bisect.bisect_left(self.buckets, value)] += 1
+        slots[-2] += value
+        slots[-1] += 1
+
+    def time(self, *labels: str) -> _Timer:
+        """Context manager observing the block's wall time."""
+        return _Timer(self, labels)
+
+    def _merge(self, into: dict, cell: dict) -> None:
+        for key, slots in cell.items():
+            merged = into.get(key)
+            if merged is None:
+                into[key] = list(slots)
+            else:
+                for i, v in enumerate(slots):
+                    merged[i] += v
+
+    def _samples(self, key: tuple[str, ...], slots: list) -> list[str]:
+        lines, running = [], 0
+        for bound, count in zip((*self.buckets, float("inf")), slots):
+            running += count
+            le = "+Inf" if bound == float("inf") else _number(bound)
+            labels = self._labels(key, 'le="' + le + '"')
+            lines.append(f"{self.name}_bucket{labels} {running}")
+        lines.append(f"{self.name}_sum{self._labels(key)} {_number(slots[-2])}")
+        lines.append(f"{self.name}_count{self._labels(key)} {slots[-1]}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Sequence[str]) -> None:
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> _Timer:
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY: list[_Metric] = []
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template, method and status.",
+    ("route", "method", "status"),
+)
+CYCLE_SECONDS = Histogram(
+    "fetch_cycle_duration_seconds",
+    "Wall time of a local fetch_cycle.",
+    buckets=_STAGE_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "pipeline_stage_duration_seconds",
+    "Time one item spent in a pipeline stage.",
+    ("stage",),
+    buckets=_STAGE_BUCKETS,
+)
+PROVIDER_CALL_SECONDS = Histogram(
+    "provider_call_duration_seconds",
+    "Market-data call latency by call site, excluding gateway waits.",
+    ("kind",),
+    buckets=_STAGE_BUCKETS,
+)
+PROVIDER_CALLS = Counter(
+    "provider_calls",
+    "Market-data calls by call site and outcome.",
+    ("kind", "outcome"),
+)
+POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time to obtain a connection from the engine's pool, connecting included.",
+    ("engine",),
+)
+POOL_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts",
+    "Pool checkouts that gave up after DB_POOL_TIMEOUT seconds.",
+    ("engine",),
+)
+REPLICA_FALLBACKS = Counter(
+    "db_replica_fallbacks",
+    "Read-only requests served by the primary because the replica was unreachable.",
+)
+ROWS_WRITTEN = Counter(
+    "db_rows_written",
+    "Rows inserted, updated or deleted per table.",
+    ("table", "operation"),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests",
+    "Cache lookups by cache and result (hit or miss).",
+    ("cache", "result"),
+)
+
+
+def cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def render() -> str:
+    """Every registered metric in Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def _count_rows(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is None or context.compiled is None:
+        return
+    if context.isinsert:
+        operation = "insert"
+    elif context.isupdate:
+        operation = "update"
+    elif context.isdelete:
+        operation = "delete"
+    else:
+        return
+    table = getattr(context.compiled.statement, "table", None)
+    rows = cursor.rowcount
+    if rows is None or rows < 0:  # some drivers don't report executemany counts
+        rows = len(parameters) if executemany else 0
+    if table is not None and rows:
+        ROWS_WRITTEN.inc(table.name, operation, amount=rows)
+
+
+def _time_checkouts(engine: Engine, name: str) -> None:
+    pool = engine.pool
+    connect = pool.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.inc(name)
+            raise
+        finally:
+            POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - start, name)
+
+    pool.connect = timed_connect
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Count *engine*'s written rows and time its pool checkouts as engine=*name*.
+
+    Pass a sync Engine (AsyncEngine.sync_engine for async ones).
+    """
+    event.listen(engine, "after_cursor_execute", _count_rows)
+    _time_checkouts(engine, name)
+    # dispose() swaps in a fresh pool
+    event.listen(engine, "engine_disposed", lambda e: _time_checkouts(e, name))
+
+
+class MetricsMiddleware:
+    """ASGI middleware observing REQUEST_SECONDS per route template."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            # The router stores the matched route in scope; templates keep cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start, route, scope["method"], str(status)
+            )
@@ -0,0 +1,193 @@
+"""
+partitions.py — Range partitions and retention for ranking_results and score_snapshots.
+
+Both tables are partitioned by their time column (PARTITION_INTERVAL: one
+partition per UTC day or month) with a DEFAULT partition catching rows no
+partition covers yet. partition_maintenance(), scheduled daily and at
+scheduler start:
+
+  - creates partitions up to PARTITION_PREMAKE intervals ahead, and for any
+    rows that landed in the default partition (moved out in the same
+    transaction, so a fresh database created by create_all converges too)
+  - applies retention: partitions entirely older than RANKING_RETENTION_DAYS /
+    SNAPSHOT_RETENTION_DAYS (0 = keep forever) are detached (kept as plain
+    tables for archiving) or dropped, per PARTITION_RETENTION_MODE — a
+    metadata change instead of a DELETE. A ranking_results partition still
+    holding some domain's latest rankings (an unchanged domain writes no new
+    rows) is always kept.
+
+Time columns carry BRIN indexes; equality and range filters on them prune
+partitions at plan time, and the latest-run lookups (ORDER BY computed_at DESC
+LIMIT 1 per domain) read partitions newest first and stop at the first hit.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Partitioned table -> partition key column
+PARTITIONED = {"ranking_results": "computed_at", "score_snapshots": "fetched_at"}
+
+_BOUND = re.compile(r"FOR VALUES FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+@dataclass
+class Partition:
+    name: str
+    start: datetime
+    end: datetime
+
+
+def period_start(ts: datetime, interval: str) -> datetime:
+    ts = ts.astimezone(timezone.utc)
+    if interval == "month":
+        return datetime(ts.year, ts.month, 1, tzinfo=timezone.utc)
+    return datetime(ts.year, ts.month, ts.day, tzinfo=timezone.utc)
+
+
+def period_end(start: datetime, interval: str) -> datetime:
+    if interval == "month":
+        return datetime(
+            start.year + start.month // 12, start.month % 12 + 1, 1, tzinfo=timezone.utc
+        )
+    return start + timedelta(days=1)
+
+
+def partition_name(table: str, start: datetime, interval: str) -> str:
+    return f"{table}_p{start:%Y%m}" if interval == "month" else f"{table}_p{start:%Y%m%d}"
+
+
+def list_partitions(conn: Connection, table: str) -> list[Partition]:
+    """The range partitions of *table* (not the default), oldest first."""
+    rows = conn.execute(
+        text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = CAST(:t AS regclass)"
+        ),
+        {"t": table},
+    ).all()
+    partitions = []
+    for name, bound in rows:
+        match = _BOUND.search(bound)
+        if match:  # the default partition's bound is just DEFAULT
+            start, end = (datetime.fromisoformat(v) for v in match.groups())
+            partitions.append(Partition(name, start, end))
+    return sorted(partitions, key=lambda p: p.start)
+
+
+def create_partitions(
+    conn: Connection, table: str, start: datetime, end: datetime, interval: str
+) -> list[str]:
+    """Create the partitions of *table* covering [start, end) that do not exist yet.
+
+    Rows of those ranges sitting in the default partition are moved into the new
+    partition before it is attached. Periods overlapping an existing partition
+    (say, after PARTITION_INTERVAL changed) are left alone.
+    """
+    column = PARTITIONED[table]
+    existing = list_partitions(conn, table)
+    created = []
+    lo = period_start(start, interval)
+    while lo < end:
+        hi = period_end(lo, interval)
+        if not any(p.start < hi and lo < p.end for p in existing):
+            name = partition_name(table, lo, interval)
+            bounds = {"lo": lo, "hi": hi}
+            conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"))
+            conn.execute(
+                text(
+                    f"WITH moved AS (DELETE FROM {table}_default "
+                    f"WHERE {column} >= :lo AND {column} < :hi RETURNING *) "
+                    f"INSERT INTO {name} SELECT * FROM moved"
+                ),
+                bounds,
+            )
+            conn.execute(
+                text(
+                    f"ALTER TABLE {table} ATTACH PARTITION {name} "
+                    f"FOR VALUES FROM ('{lo.isoformat()}') TO ('{hi.isoformat()}')"
+                )
+            )
+            created.append(name)
+        lo = hi
+    return created
+
+
+def ensure_partitions(conn: Connection, now: datetime | None = None) -> list[str]:
+    """Partitions through PARTITION_PREMAKE intervals ahead, plus any the default needs."""
+    now = now or datetime.now(timezone.utc)
+    interval = settings.partition_interval
+    end = period_start(now, interval)
+    for _ in range(settings.partition_premake + 1):
+        end = period_end(end, interval)
+    created = []
+    for table, column in PARTITIONED.items():
+        oldest = conn.execute(text(f"SELECT min({column}) FROM {table}_default")).scalar()
+        start = min(oldest, now) if oldest is not None else now
+        created += create_partitions(conn, table, start, end, interval)
+    return created
+
+
+def _protected_since(conn: Connection) -> datetime | None:
+    """The oldest per-domain latest keyframe; partitions from there on are kept.
+
+    Every row is a keyframe under full storage; under delta storage a domain's
+    current state is rebuilt from its latest keyframe on (services/ranking_store.py).
+    """
+    return conn.execute(
+        text(
+            "SELECT min(latest) FROM (SELECT (SELECT max(r.computed_at) FROM ranking_results r "
+            "WHERE r.domain = d.name AND r.keyframe) AS latest FROM domains d) per_domain"
+        )
+    ).scalar()
+
+
+def apply_retention(conn: Connection, now: datetime | None = None) -> list[str]:
+    """Detach or drop partitions wholly past their table's retention window."""
+    now = now or datetime.now(timezone.utc)
+    retention = {
+        "ranking_results": settings.ranking_retention_days,
+        "score_snapshots": settings.snapshot_retention_days,
+    }
+    removed = []
+    for table, days in retention.items():
+        if days <= 0:
+            continue
+        cutoff = now - timedelta(days=days)
+        keep_from = _protected_since(conn) if table == "ranking_results" else None
+        for partition in list_partitions(conn, table):
+            if partition.end > cutoff or (keep_from is not None and partition.end > keep_from):
+                continue
+            if settings.partition_retention_mode == "drop":
+                conn.execute(text(f"DROP TABLE {partition.name}"))
+            else:
+                conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition.name}"))
+            removed.append(partition.name)
+    return removed
+
+
+def partition_maintenance() -> None:
+    """Scheduled job: create upcoming partitions, then apply retention."""
+    from app.scheduler import _sync_engine  # avoid circular import at module level
+
+    with _sync_engine.begin() as conn:
+        created = ensure_partitions(conn)
+        removed = apply_retention(conn)
+    if created or removed:
+        verb = "dropped" if settings.partition_retention_mode == "drop" else "detached"
+        logger.info(
+            "partition_maintenance: created %s; %s %s",
+            ", ".join(created) or "none",
+            verb,
+            ", ".join(removed) or "none",
+        )
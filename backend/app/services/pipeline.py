@@ -0,0 +1,162 @@
+"""
+pipeline.py — Minimal threaded stage pipeline with bounded queues.
+
+A pipeline is a source iterable followed by a list of Stages. Each stage runs
+`workers` threads that take items from the queue in front of it, call
+`fn(item)` and put every returned item on the queue behind it. Queues hold at
+most `queue_size` items, so a fast stage blocks instead of buffering the whole
+run in memory, while a slow downstream stage no longer holds up the ones
+before it.
+
+A failing item is logged and dropped; the rest of the run continues. Every
+stage reports how many items it handled, how long its workers were busy and
+how long they sat blocked on a full downstream queue.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from opentelemetry import trace
+
+from .metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[Any], Iterable[Any] | None]  # returns the items for the next stage
+    workers: int = 1
+
+
+@dataclass
+class StageTiming:
+    name: str
+    workers: int
+    items_in: int = 0
+    items_out: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0  # summed over workers
+    blocked_seconds: float = 0.0  # waiting for room downstream
+    started: float | None = None
+    finished: float | None = None
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def wall_seconds(self) -> float:
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+@dataclass
+class PipelineReport:
+    stages: list[StageTiming]
+    wall_seconds: float
+    results: list[Any]
+
+    def format(self) -> str:
+        lines = [f"pipeline wall={self.wall_seconds:.2f}s"]
+        for t in self.stages:
+            lines.append(
+                f"  {t.name:<10} workers={t.workers} in={t.items_in} out={t.items_out} "
+                f"err={t.errors} wall={t.wall_seconds:.2f}s busy={t.busy_seconds:.2f}s "
+                f"blocked={t.blocked_seconds:.2f}s"
+            )
+        return "\n".join(lines)
+
+
+def _put(q: queue.Queue | None, item: Any, sink: list[Any], sink_lock: threading.Lock) -> float:
+    """Hand *item* downstream; returns the seconds spent blocked on a full queue."""
+    if q is None:
+        with sink_lock:
+            sink.append(item)
+        return 0.0
+    start = time.perf_counter()
+    q.put(item)
+    return time.perf_counter() - start
+
+
+def run_pipeline(source: Iterable[Any], stages: list[Stage], queue_size: int = 4) -> PipelineReport:
+    """Run *source* through *stages*; outputs of the last stage are collected in the report."""
+    queues: list[queue.Queue] = [queue.Queue(maxsize=queue_size) for _ in stages]
+    timings = [StageTiming(name=s.name, workers=s.workers) for s in stages]
+    results: list[Any] = []
+    results_lock = threading.Lock()
+    remaining = [s.workers for s in stages]
+    remaining_lock = threading.Lock()
+
+    def worker(idx: int) -> None:
+        stage, timing = stages[idx], timings[idx]
+        inbox = queues[idx]
+        outbox = queues[idx + 1] if idx + 1 < len(stages) else None
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            start = time.perf_counter()
+            with timing.lock:
+                if timing.started is None:
+                    timing.started = start
+            try:
+                with tracer.start_as_current_span(f"pipeline.{stage.name}"):
+                    outputs = list(stage.fn(item) or ())
+                error = False
+            except Exception:
+                logger.exception("pipeline: stage %s failed on an item", stage.name)
+                outputs, error = [], True
+            busy = time.perf_counter() - start
+            STAGE_SECONDS.observe(busy, stage.name)
+            blocked = sum(_put(outbox, out, results, results_lock) for out in outputs)
+            with timing.lock:
+                timing.items_in += 1
+                timing.items_out += len(outputs)
+                timing.errors += error
+                timing.busy_seconds += busy
+                timing.blocked_seconds += blocked
+                timing.finished = time.perf_counter()
+        # Last worker of this stage out closes the next stage's input
+        with remaining_lock:
+            remaining[idx] -= 1
+            last = remaining[idx] == 0
+        if last and outbox is not None:
+            for _ in range(stages[idx + 1].workers):
+                outbox.put(_DONE)
+
+    started = time.perf_counter()
+    # Workers run in a copy of the caller's context, so their spans join its trace
+    threads = [
+        threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(worker, i),
+            name=f"pipeline-{s.name}-{w}",
+            daemon=True,
+        )
+        for i, s in enumerate(stages)
+        for w in range(s.workers)
+    ]
+    for t in threads:
+        t.start()
+    try:
+        for item in source:
+            queues[0].put(item)
+    finally:
+        for _ in range(stages[0].workers):
+            queues[0].put(_DONE)
+        for t in threads:
+            t.join()
+    return PipelineReport(
+        stages=timings, wall_seconds=time.perf_counter() - started, results=results
+    )
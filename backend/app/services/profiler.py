@@ -0,0 +1,352 @@
+"""
+profiler.py — On-demand sampling profiler and tracemalloc, armed from the admin API.
+
+Nothing runs until a profile is armed (POST /api/admin/profiles):
+
+  - fetch_cycle / snapshot_job: the next run of the job, in whichever process
+    runs it, is profiled. Arming drops an `armed-<job>` marker in PROFILE_DIR,
+    which the job claims when it starts — one failed open() per run otherwise.
+  - route: the next N requests to a route template (e.g. /api/rankings/{domain})
+    served by this API process. ProfilerMiddleware only checks a dict per request
+    until then.
+
+While a profile runs, a thread samples the stacks of the profiled threads every
+PROFILE_INTERVAL_MS (the job's thread and the threads it starts; for requests,
+the event-loop thread and the threadpool while an armed request is in flight)
+and tracemalloc traces allocations. When it finishes, PROFILE_DIR/<id>/ holds:
+
+  meta.json           target, status, timings, sample count
+  stacks.collapsed    folded stacks ("thread;outer;...;inner count"), the input
+                      of flamegraph.pl, speedscope and inferno
+  allocations.txt     top allocation sites by size still live at the end, and
+                      the traced peak
+
+PROFILE_DIR must be shared by the API and worker processes for job profiles
+to be downloadable from the API. One profile runs per process at a time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import tracemalloc
+import uuid
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+JOBS = ("fetch_cycle", "snapshot_job")
+ARTIFACTS = ("stacks.collapsed", "allocations.txt")
+# Allocation sites listed in allocations.txt
+TOP_ALLOCATIONS = 50
+
+_HANDLE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ProfileError(Exception):
+    pass
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    if "site-packages/" in filename:
+        filename = filename.rsplit("site-packages/", 1)[1]
+    elif filename.startswith(os.getcwd() + os.sep):
+        filename = os.path.relpath(filename)
+    # The def line, not the current line, so samples of one function fold together
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """Folds the stacks of the threads *include(ident, name)* accepts, every *interval* s."""
+
+    def __init__(self, interval: float, include: Callable[[int, str], bool]) -> None:
+        super().__init__(name="stack-sampler", daemon=True)
+        self.interval = interval
+        self.include = include
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, str(ident))
+                if ident == me or not self.include(ident, name):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(name)
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+class Profile:
+    """One armed profile and its directory under PROFILE_DIR."""
+
+    def __init__(self, meta: dict) -> None:
+        self.meta = meta
+        self.dir = Path(settings.profile_dir) / meta["id"]
+        self._sampler: StackSampler | None = None
+        self._started_tracemalloc = False
+
+    def save(self) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.dir / "meta.json.tmp"
+        tmp.write_text(json.dumps(self.meta, indent=2))
+        tmp.replace(self.dir / "meta.json")
+
+    def start(self, include: Callable[[int, str], bool]) -> None:
+        self.meta.update(
+            status="running", started_at=_now(), pid=os.getpid(), host=os.uname().nodename
+        )
+        self.save()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._sampler = StackSampler(settings.profile_interval_ms / 1000, include)
+        self._sampler.start()
+
+    def finish(self, error: str | None = None) -> None:
+        sampler = self._sampler
+        sampler.stop()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        )
+        current, peak = tracemalloc.get_traced_memory()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+
+        with open(self.dir / "stacks.collapsed", "w") as fh:
+            for stack, count in sampler.stacks.most_common():
+                fh.write(f"{stack} {count}\n")
+        with open(self.dir / "allocations.txt", "w") as fh:
+            fh.write(f"traced memory: current {current / 2**20:.1f} MiB, ")
+            fh.write(f"peak {peak / 2**20:.1f} MiB\n\n")
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                fh.write(f"{stat}\n")
+        self.meta.update(
+            status="failed" if error else "done",
+            finished_at=_now(),
+            samples=sampler.samples,
+            error=error,
+        )
+        self.save()
+        logger.info("profiler: %s profile %s written to %s", self.target, self.id, self.dir)
+
+    @property
+    def id(self) -> str:
+        return self.meta["id"]
+
+    @property
+    def target(self) -> str:
+        return self.meta["target"]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# The profile running in this process, if any (sampler and tracemalloc are per process)
+_active: Profile | None = None
+# route template -> armed request profile; empty unless a route profile is pending
+_routes: dict[str, _RouteProfile] = {}
+_lock = threading.Lock()
+
+
+def _marker(job: str) -> Path:
+    return Path(settings.profile_dir) / f"armed-{job}"
+
+
+def arm_job(job: str) -> dict:
+    """Profile the next run of *job*; an earlier unclaimed arming of it is replaced."""
+    if job not in JOBS:
+        raise ProfileError(f"unknown job {job!r}")
+    profile = Profile(_new_meta(job))
+    profile.save()
+    try:
+        replaced = Profile(read_meta(_marker(job).read_text().strip()))
+    except (FileNotFoundError, ProfileError):
+        replaced = None
+    tmp = _marker(job).with_suffix(".tmp")
+    tmp.write_text(profile.id)
+    tmp.replace(_marker(job))
+    if replaced is not None and replaced.meta["status"] == "armed":
+        replaced.meta.update(status="replaced", error=f"re-armed as {profile.id}")
+        replaced.save()
+    return profile.meta
+
+
+def _claim_job(job: str) -> Profile | None:
+    try:
+        handle = _marker(job).read_text().strip()
+    except FileNotFoundError:
+        return None
+    with _lock:
+        global _active
+        if _active is not None:
+            return None  # left armed for the next run
+        try:
+            _marker(job).unlink()  # whoever unlinks first owns the run
+        except FileNotFoundError:
+            return None
+        try:
+            _active = Profile(read_meta(handle))
+        except ProfileError:
+            return None
+        return _active
+
+
+@contextmanager
+def profiled(job: str) -> Iterator[None]:
+    """Profile the block when *job* is armed; otherwise just run it."""
+    global _active
+    profile = _claim_job(job)
+    if profile is None:
+        yield
+        return
+    existing = {t.ident for t in threading.enumerate()}
+    caller = threading.get_ident()
+    # The job's own thread and whatever it starts (pipeline stage workers)
+    profile.start(lambda ident, name: ident == caller or ident not in existing)
+    error = None
+    try:
+        yield
+    except BaseException as exc:
+        error = repr(exc)
+        raise
+    finally:
+        try:
+            profile.finish(error)
+        except Exception:
+            logger.exception("profiler: could not write profile %s", profile.id)
+        with _lock:
+            _active = None
+
+
+class _RouteProfile:
+    def __init__(self, profile: Profile, pattern: re.Pattern, requests: int) -> None:
+        self.profile = profile
+        self.pattern = pattern
+        self.remaining = requests
+        self.in_flight = 0
+        self.loop_thread: int | None = None
+
+    def include(self, ident: int, name: str) -> bool:
+        # Only while an armed request runs; other requests share these threads meanwhile
+        return self.in_flight > 0 and (
+            ident == self.loop_thread or name.startswith("AnyIO worker thread")
+        )
+
+
+def arm_route(route: str, pattern: re.Pattern, requests: int) -> dict:
+    """Profile the next *requests* requests whose path matches *pattern* in this process."""
+    with _lock:
+        if _active is not None or _routes:
+            raise ProfileError("a profile is already running or armed in this process")
+        profile = Profile(_new_meta("route", route=route, requests=requests))
+        profile.save()
+        _routes[route] = _RouteProfile(profile, pattern, requests)
+    return profile.meta
+
+
+def _claim_request(path: str) -> _RouteProfile | None:
+    global _active
+    with _lock:
+        for route in _routes.values():
+            if route.remaining > 0 and route.pattern.match(path):
+                if route.loop_thread is None:
+                    route.loop_thread = threading.get_ident()
+                    _active = route.profile
+                    route.profile.start(route.include)
+                route.remaining -= 1
+                route.in_flight += 1
+                return route
+    return None
+
+
+def _release_request(route: _RouteProfile) -> None:
+    global _active
+    with _lock:
+        route.in_flight -= 1
+        if route.remaining or route.in_flight:
+            return
+        _routes.pop(route.profile.meta["route"], None)
+    try:
+        route.profile.finish()
+    except Exception:
+        logger.exception("profiler: could not write profile %s", route.profile.id)
+    finally:
+        with _lock:
+            _active = None
+
+
+class ProfilerMiddleware:
+    """ASGI middleware running armed route profiles; a dict check per request otherwise."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if not _routes or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = _claim_request(scope["path"])
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if route is not None:
+                # The last one writes the artifacts; keep that off the event loop
+                await asyncio.to_thread(_release_request, route)
+
+
+def _new_meta(target: str, **extra) -> dict:
+    return {
+        "id": uuid.uuid4().hex,
+        "target": target,
+        **extra,
+        "status": "armed",
+        "armed_at": _now(),
+        "started_at": None,
+        "finished_at": None,
+        "samples": 0,
+        "error": None,
+    }
+
+
+def read_meta(handle: str) -> dict:
+    if not _HANDLE.match(handle):
+        raise ProfileError(f"no profile {handle}")
+    try:
+        return json.loads((Path(settings.profile_dir) / handle / "meta.json").read_text())
+    except FileNotFoundError:
+        raise ProfileError(f"no profile {handle}") from None
+
+
+def artifact_path(handle: str, name: str) -> Path:
+    """Path of a finished profile's artifact; ProfileError when it does not exist (yet)."""
+    meta = read_meta(handle)
+    path = Path(settings.profile_dir) / handle / name
+    if name not in ARTIFACTS or not path.exists():
+        raise ProfileError(f"profile {handle} has no {name} (status {meta['status']})")
+    return path
@@ -0,0 +1,327 @@
+"""
+provider_gateway.py — One coordinated entry point for every market-data call.
+
+All yfinance traffic (batch downloads, `.info` lookups, custom-domain ticker
+validation) goes through a single process-wide ProviderGateway:
+
+  - TokenBucket: shared request budget. A download costs one token per
+    ticker (yfinance issues one request each); `.info` costs one. A 429
+    halves the refill rate, successes restore it gradually.
+  - AdaptiveLimiter: calls in flight. Additive increase while latency stays
+    near the per-kind baseline, multiplicative decrease when it balloons or
+    the provider throttles us.
+  - CircuitBreaker: after `threshold` consecutive provider failures every
+    call fails fast with ProviderUnavailable for `reset_seconds`, then one
+    probe call decides whether to close again.
+
+Callers pass the yfinance call as a thunk (see data_fetcher.download_batch and
+ticker_info); calls that swallow their own errors can flag a returned value
+as a provider failure with *is_failure*.
+
+metrics() is a plain-dict snapshot for the admin endpoint.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from opentelemetry import trace
+from opentelemetry.trace import SpanKind
+from yfinance.exceptions import YFRateLimitError
+
+from .metrics import PROVIDER_CALL_SECONDS, PROVIDER_CALLS
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
+
+# Call outcomes; only THROTTLED and FAILED count against the breaker
+OK, CLIENT, THROTTLED, FAILED, ERROR = "ok", "client", "throttled", "failed", "error"
+
+# Latency swings smaller than this never count as overload (millisecond calls are noisy)
+_JITTER_SECONDS = 0.05
+
+
+class ProviderUnavailable(Exception):
+    """The circuit is open: the provider failed repeatedly and is not being called."""
+
+
+def _classify(exc: BaseException) -> str:
+    if isinstance(exc, YFRateLimitError):
+        return THROTTLED
+    # urllib errors carry .code, requests/curl_cffi ones .response.status_code; curl's own
+    # errors also use .code for libcurl codes (6 = DNS), hence the HTTP range check
+    statuses = (
+        getattr(exc, "code", None),
+        getattr(getattr(exc, "response", None), "status_code", None),
+    )
+    status = next((s for s in statuses if isinstance(s, int) and 400 <= s < 600), None)
+    if status == 429 or "Too Many Requests" in str(exc):
+        return THROTTLED
+    if status is not None:
+        return FAILED if status >= 500 else CLIENT
+    if isinstance(exc, OSError):  # timeouts, refused/reset connections, curl errors
+        return FAILED
+    return ERROR
+
+
+class TokenBucket:
+    """Blocking token bucket whose refill rate can be lowered and restored."""
+
+    def __init__(
+        self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = burst
+        self._stamp = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def acquire(self, cost: float = 1.0) -> float:
+        """Take *cost* tokens (capped at burst), sleeping as needed. Returns seconds waited."""
+        cost = min(cost, self.burst)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= cost:
+                    self._tokens -= cost
+                    return waited
+                delay = (cost - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def throttled(self) -> None:
+        with self._lock:
+            self._refill()
+            self.rate = max(self.rate / 2, self.max_rate / 16)
+
+    def succeeded(self) -> None:
+        with self._lock:
+            if self.rate < self.max_rate:
+                self._refill()
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class AdaptiveLimiter:
+    """AIMD limit on concurrent calls, driven by latency against a per-kind baseline."""
+
+    def __init__(self, initial: int, minimum: int, maximum: int, tolerance: float) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.tolerance = tolerance
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self._baseline: dict[str, float] = {}
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, kind: str, latency: float, outcome: str) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if outcome in (THROTTLED, FAILED):
+                self.limit = max(self.minimum, self.limit / 2)
+            elif outcome == OK:
+                baseline = self._baseline.get(kind, latency)
+                if latency > max(baseline * self.tolerance, baseline + _JITTER_SECONDS):
+                    self.limit = max(self.minimum, self.limit * 0.75)
+                else:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                # Slow-moving baseline: a lasting shift is accepted, a spike is not
+                self._baseline[kind] = baseline * 0.95 + latency * 0.05
+            self._cond.notify_all()
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self, threshold: int, reset_seconds: float, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """May a call go out now? In half-open state only one probe at a time."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_seconds:
+                    return False
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self._probing = False
+            if outcome in (OK, CLIENT):
+                self.state, self.failures = self.CLOSED, 0
+            elif outcome in (THROTTLED, FAILED):
+                self.failures += 1
+                if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                    if self.state != self.OPEN:
+                        logger.warning(
+                            "provider_gateway: circuit open after %d failures", self.failures
+                        )
+                    self.state = self.OPEN
+                    self._opened_at = self._clock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == self.OPEN and self._clock() - self._opened_at < self.reset_seconds
+
+
+class ProviderGateway:
+    def __init__(
+        self,
+        rate_per_second: float,
+        burst: float,
+        max_concurrency: int,
+        latency_tolerance: float,
+        breaker_threshold: int,
+        breaker_reset_seconds: float,
+        min_concurrency: int = 1,
+    ) -> None:
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.limiter = AdaptiveLimiter(
+            max(min_concurrency, max_concurrency // 2),
+            min_concurrency,
+            max_concurrency,
+            latency_tolerance,
+        )
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset_seconds)
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys((OK, CLIENT, THROTTLED, FAILED, ERROR, "rejected"), 0)
+        self._latency_ms: dict[str, float] = {}
+        self._wait_seconds = 0.0
+
+    def call(
+        self,
+        kind: str,
+        fn: Callable[[], Any],
+        cost: float = 1.0,
+        is_failure: Callable[[Any], bool] | None = None,
+        attributes: dict[str, Any] | None = None,
+    ) -> Any:
+        """Run *fn* under the shared budget. Raises ProviderUnavailable while the circuit is open.
+
+        *is_failure* flags a returned value as a provider failure (for calls that
+        swallow their own errors); the value is still returned to the caller.
+        *attributes* (say, the ticker) are added to the call's trace span.
+        """
+        with tracer.start_as_current_span(
+            f"provider.{kind}",
+            kind=SpanKind.CLIENT,
+            attributes={"provider.kind": kind, "provider.cost": cost, **(attributes or {})},
+        ) as span:
+            return self._call(kind, fn, cost, is_failure, span)
+
+    def _call(
+        self,
+        kind: str,
+        fn: Callable[[], Any],
+        cost: float,
+        is_failure: Callable[[Any], bool] | None,
+        span: trace.Span,
+    ) -> Any:
+        if not self.breaker.allow():
+            PROVIDER_CALLS.inc(kind, "rejected")
+            with self._lock:
+                self._counts["rejected"] += 1
+            raise ProviderUnavailable(f"market-data provider circuit open ({kind})")
+        waited = self.bucket.acquire(cost)
+        start = time.perf_counter()
+        self.limiter.acquire()
+        waited += time.perf_counter() - start
+        start = time.perf_counter()
+        outcome = ERROR
+        try:
+            result = fn()
+            outcome = FAILED if is_failure is not None and is_failure(result) else OK
+            return result
+        except Exception as exc:
+            outcome = _classify(exc)
+            raise
+        finally:
+            latency = time.perf_counter() - start
+            PROVIDER_CALL_SECONDS.observe(latency, kind)
+            PROVIDER_CALLS.inc(kind, outcome)
+            span.set_attributes(
+                {"provider.outcome": outcome, "provider.wait_ms": round(waited * 1000, 3)}
+            )
+            self.limiter.release(kind, latency, outcome)
+            self.breaker.record(outcome)
+            if outcome == THROTTLED:
+                self.bucket.throttled()
+            elif outcome == OK:
+                self.bucket.succeeded()
+            with self._lock:
+                self._counts[outcome] += 1
+                self._wait_seconds += waited
+                prev = self._latency_ms.get(kind)
+                ms = latency * 1000
+                self._latency_ms[kind] = ms if prev is None else prev * 0.8 + ms * 0.2
+
+    def metrics(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+            latency = {k: round(v, 1) for k, v in self._latency_ms.items()}
+            waited = self._wait_seconds
+        return {
+            "calls": sum(v for k, v in counts.items() if k != "rejected"),
+            **counts,
+            "latency_ms": latency,
+            "wait_seconds": round(waited, 3),
+            "concurrency_limit": int(self.limiter.limit),
+            "in_flight": self.limiter.in_flight,
+            "rate_per_second": round(self.bucket.rate, 2),
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+        }
+
+
+_gateway: ProviderGateway | None = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> ProviderGateway:
+    """Process-wide gateway configured from PROVIDER_* settings (created on first use)."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            from app.config import settings
+
+            _gateway = ProviderGateway(
+                rate_per_second=settings.provider_rate_per_second,
+                burst=settings.provider_burst,
+                max_concurrency=settings.provider_max_concurrency,
+                latency_tolerance=settings.provider_latency_tolerance,
+                breaker_threshold=settings.provider_breaker_threshold,
+                breaker_reset_seconds=settings.provider_breaker_reset_seconds,
+            )
+        return _gateway
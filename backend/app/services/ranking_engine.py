@@ -8,6 +8,12 @@ Only stdlib + numpy are permitted here.
 Pipeline:
   raw values -> normalize_factor() -> compute_composite() -> scale_to_0_100() -> rank_domain()
 
+rank_domain_batch() runs the same pipeline over a (time x ticker x factor) array
+in one vectorized pass — used by the backtest to re-rank stored factor history.
+
+IncrementalRanker keeps per-domain running sums so a cycle where only a few
+tickers changed updates the statistics in O(changed) and skips untouched domains.
+
 Factor weights (sum to 1.0):
   momentum          0.30  — strongest short-term price signal
   volume_change     0.20  — confirms momentum with liquidity evidence
@@ -18,11 +24,15 @@ Factor weights (sum to 1.0):
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+import math
+import threading
+from dataclasses import dataclass, field
 from typing import Optional
 
 import numpy as np
 
+from .metrics import cache_lookup
+
 # ---------------------------------------------------------------------------
 # Named weight constants — MUST sum to 1.0
 # ---------------------------------------------------------------------------
@@ -41,6 +51,8 @@ _FACTOR_WEIGHTS: dict[str, float] = {
     "financial_ratio": WEIGHT_FINANCIAL_RATIO,
 }
 
+FACTOR_NAMES: tuple[str, ...] = tuple(_FACTOR_WEIGHTS)
+
 # ---------------------------------------------------------------------------
 # Data structures
 # ---------------------------------------------------------------------------
@@ -96,6 +108,13 @@ def normalize_factor(values: list[Optional[float]]) -> list[Optional[float]]:
 
     mean = float(np.mean(non_none_vals))
     std = float(np.std(non_none_vals, ddof=0))  # population std
+    return _zscore_capped(values, mean, std)
+
+
+def _zscore_capped(values: list[Optional[float]], mean: float, std: float) -> list[Optional[float]]:
+    """Cap at mean ± 3*std, then Z-score the non-None entries of *values*."""
+    non_none_indices = [i for i, v in enumerate(values) if v is not None]
+    non_none_vals = np.array([values[i] for i in non_none_indices], dtype=float)
 
     # std == 0 guard — all values identical, Z-score is 0 for all.
     # Use epsilon tolerance because floating-point std of identical values is
@@ -259,6 +278,17 @@ def rank_domain(
         raw_values = [stocks_data[t].get(fname) for t in tickers]
         normalized_by_factor[fname] = normalize_factor(raw_values)
 
+    return _score_domain(stocks_data, tickers, normalized_by_factor)
+
+
+def _score_domain(
+    stocks_data: dict[str, dict[str, Optional[float]]],
+    tickers: list[str],
+    normalized_by_factor: dict[str, list[Optional[float]]],
+) -> dict[str, StockScore]:
+    """Steps 2–5 of rank_domain(): composite, 0–100 scaling, ranks and breakdown."""
+    factor_names = list(_FACTOR_WEIGHTS.keys())
+
     # Step 2: Compute composite score per ticker
     composite_scores: dict[str, float] = {}
     per_ticker_normalized: dict[str, dict[str, Optional[float]]] = {}
@@ -284,7 +314,7 @@ def rank_domain(
     for ticker in tickers:
         effective_weights = per_ticker_effective_weights[ticker]
         norm_dict = per_ticker_normalized[ticker]
-        factor_scores = {}
+        factor_scores: dict[str, FactorScore] = {}
 
         for fname in factor_names:
             raw = stocks_data[ticker].get(fname)
@@ -311,3 +341,274 @@ def rank_domain(
         )
 
     return results
+
+
+# ---------------------------------------------------------------------------
+# rank_domain_batch
+# ---------------------------------------------------------------------------
+
+
+def rank_domain_batch(
+    raw: np.ndarray,
+    present: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized rank_domain() over many timestamps of a single domain.
+
+    Parameters
+    ----------
+    raw:
+        float array of shape (T, N, F) — raw factor values per timestamp, ticker and
+        factor. Factor order follows FACTOR_NAMES; NaN marks a missing factor value.
+    present:
+        bool array of shape (T, N) — True where the ticker took part in the run at
+        that timestamp. Absent tickers are ignored by every step.
+
+    Returns
+    -------
+    (scores, ranks):
+        scores — float (T, N) composite scores 0–100, NaN where not present.
+        ranks  — int (T, N) ranks (1 = best), 0 where not present.
+    Matches rank_domain() for every row, including the single-stock (50.0 / rank 1)
+    and std == 0 cases. Ties keep ticker order, as the stable sort in rank_domain() does.
+    """
+    raw = np.asarray(raw, dtype=float)
+    present = np.asarray(present, dtype=bool)
+    n_times, n_tickers, n_factors = raw.shape
+    if n_factors != len(FACTOR_NAMES):
+        raise ValueError(f"expected {len(FACTOR_NAMES)} factors, got {n_factors}")
+
+    valid = present[:, :, None] & ~np.isnan(raw)
+    x = np.where(valid, raw, 0.0)
+
+    # Step 1: population mean/std per (timestamp, factor) over valid values
+    count = valid.sum(axis=1)
+    safe_count = np.maximum(count, 1)
+    mean = x.sum(axis=1) / safe_count
+    dev = np.where(valid, raw - mean[:, None, :], 0.0)
+    std = np.sqrt((dev**2).sum(axis=1) / safe_count)
+
+    normalizable = (count >= 2)[:, None, :] & valid
+    flat = (std < 1e-12)[:, None, :]
+    safe_std = np.where(std < 1e-12, 1.0, std)[:, None, :]
+    lower = (mean - 3.0 * std)[:, None, :]
+    upper = (mean + 3.0 * std)[:, None, :]
+    z = (np.clip(x, lower, upper) - mean[:, None, :]) / safe_std
+    z = np.where(flat, 0.0, z)
+    z = np.where(normalizable, z, 0.0)
+
+    # Step 2: composite with proportional reweighting over the factors present
+    weights = np.array([_FACTOR_WEIGHTS[f] for f in FACTOR_NAMES])
+    used = np.where(normalizable, weights, 0.0)
+    total_weight = used.sum(axis=2)
+    composite = np.where(
+        total_weight > 0.0,
+        (z * used).sum(axis=2) / np.where(total_weight > 0.0, total_weight, 1.0),
+        0.0,
+    )
+
+    # Step 3: min-max scale to 0–100 within each timestamp's peer group
+    lo = np.where(present, composite, np.inf).min(axis=1, initial=np.inf)[:, None]
+    hi = np.where(present, composite, -np.inf).max(axis=1, initial=-np.inf)[:, None]
+    span = hi - lo
+    scores = np.where(span > 0.0, (composite - lo) / np.where(span > 0.0, span, 1.0) * 100.0, 50.0)
+    scores = np.where(present, scores, np.nan)
+
+    # Step 4: ranks (1 = highest); absent tickers sort last and get rank 0
+    order = np.argsort(np.where(present, -scores, np.inf), axis=1, kind="stable")
+    ranks = np.empty((n_times, n_tickers), dtype=int)
+    np.put_along_axis(ranks, order, np.arange(1, n_tickers + 1)[None, :], axis=1)
+    ranks = np.where(present, ranks, 0)
+
+    return scores, ranks
+
+
+# ---------------------------------------------------------------------------
+# IncrementalRanker
+# ---------------------------------------------------------------------------
+
+
+# Rebuild a factor's sums once the shift sits more than 100σ from the mean: past that
+# the cancellation in total_sq/n - offset² eats into the 1e-6 verify tolerance
+_SHIFT_DRIFT = 1e4
+
+
+@dataclass
+class _DomainState:
+    """Running sufficient statistics for one domain.
+
+    Sums are kept over (value - shift) with a per-factor shift taken from a held
+    value. Identical values therefore accumulate exactly 0.0, which keeps the
+    std == 0 guard in agreement with normalize_factor(). Once churn leaves the
+    shift far from the values still held (relative to their spread), the one-pass
+    variance loses precision, so mean_std() rebuilds that factor's sums around the
+    held value nearest the mean.
+    """
+
+    raw: dict[str, dict[str, Optional[float]]] = field(default_factory=dict)
+    shift: dict[str, float] = field(default_factory=dict)
+    count: dict[str, int] = field(default_factory=lambda: dict.fromkeys(_FACTOR_WEIGHTS, 0))
+    total: dict[str, float] = field(default_factory=lambda: dict.fromkeys(_FACTOR_WEIGHTS, 0.0))
+    total_sq: dict[str, float] = field(default_factory=lambda: dict.fromkeys(_FACTOR_WEIGHTS, 0.0))
+    results: dict[str, StockScore] = field(default_factory=dict)
+
+    def add(self, factors: dict[str, Optional[float]], sign: int) -> None:
+        for fname in _FACTOR_WEIGHTS:
+            value = factors.get(fname)
+            if value is None:
+                continue
+            shift = self.shift.setdefault(fname, value)
+            delta = value - shift
+            self.count[fname] += sign
+            self.total[fname] += sign * delta
+            self.total_sq[fname] += sign * delta * delta
+            if self.count[fname] == 0:
+                # Reset so rounding drift never outlives the values that caused it
+                self.total[fname] = 0.0
+                self.total_sq[fname] = 0.0
+                del self.shift[fname]
+
+    def rebuild(self, fname: str) -> None:
+        """Recompute *fname*'s sums from the held values around a fresh shift."""
+        values = [f[fname] for f in self.raw.values() if f[fname] is not None]
+        mean = math.fsum(values) / len(values)
+        shift = min(values, key=lambda v: abs(v - mean))
+        deltas = [v - shift for v in values]
+        self.shift[fname] = shift
+        self.count[fname] = len(values)
+        self.total[fname] = math.fsum(deltas)
+        self.total_sq[fname] = math.fsum(d * d for d in deltas)
+
+    def mean_std(self, fname: str) -> tuple[float, float]:
+        n = self.count[fname]
+        offset = self.total[fname] / n
+        variance = self.total_sq[fname] / n - offset * offset
+        if offset * offset > _SHIFT_DRIFT * max(variance, 0.0):
+            self.rebuild(fname)
+            offset = self.total[fname] / n
+            variance = self.total_sq[fname] / n - offset * offset
+        return self.shift[fname] + offset, math.sqrt(max(variance, 0.0))
+
+
+class IncrementalRanker:
+    """Stateful rank_domain() that only touches what changed since the last call.
+
+    Each domain keeps the raw factors it was last ranked on plus count / sum /
+    sum-of-squares per factor. update() diffs the new input against that state:
+    an identical domain returns its cached StockScores untouched, otherwise only
+    the changed tickers' contributions are swapped in the running sums before the
+    domain is re-scored.
+
+    With verify=True every re-score is checked against a full rank_domain() and
+    an AssertionError is raised on any mismatch.
+    """
+
+    def __init__(self, verify: bool = False, tolerance: float = 1e-6) -> None:
+        self.verify = verify
+        self.tolerance = tolerance
+        self._domains: dict[str, _DomainState] = {}
+        self._lock = threading.Lock()
+
+    def domains(self) -> dict[str, list[str]]:
+        """{domain: tickers} for every domain currently held."""
+        with self._lock:
+            return {name: list(state.raw) for name, state in self._domains.items()}
+
+    def results(self, domain: str) -> dict[str, StockScore]:
+        """Last ranking computed for *domain* ({} if unknown)."""
+        with self._lock:
+            state = self._domains.get(domain)
+            return dict(state.results) if state else {}
+
+    def drop(self, domain: str) -> None:
+        with self._lock:
+            self._domains.pop(domain, None)
+
+    def update(
+        self,
+        domain: str,
+        stocks_data: dict[str, dict[str, Optional[float]]],
+    ) -> dict[str, StockScore]:
+        """Rank *domain* given its complete current input, reusing unchanged work.
+
+        Tickers absent from *stocks_data* are removed from the domain.
+        """
+        with self._lock:
+            state = self._domains.get(domain)
+            if state is None:
+                state = self._domains[domain] = _DomainState()
+                changes: dict[str, Optional[dict[str, Optional[float]]]] = dict(stocks_data)
+            else:
+                changes = {t: None for t in state.raw if t not in stocks_data}
+                for ticker, factors in stocks_data.items():
+                    factors = {fname: factors.get(fname) for fname in _FACTOR_WEIGHTS}
+                    if state.raw.get(ticker) != factors:
+                        changes[ticker] = factors
+                cache_lookup("ranker", not changes)
+                if not changes:
+                    return dict(state.results)
+            return self._apply(domain, state, changes)
+
+    def apply_changes(
+        self,
+        domain: str,
+        changes: dict[str, Optional[dict[str, Optional[float]]]],
+    ) -> dict[str, StockScore]:
+        """Patch only *changes* into *domain*: {ticker: new factors, or None to remove}."""
+        with self._lock:
+            state = self._domains.setdefault(domain, _DomainState())
+            return self._apply(domain, state, changes)
+
+    def _apply(
+        self,
+        domain: str,
+        state: _DomainState,
+        changes: dict[str, Optional[dict[str, Optional[float]]]],
+    ) -> dict[str, StockScore]:
+        for ticker, factors in changes.items():
+            old = state.raw.pop(ticker, None) if factors is None else state.raw.get(ticker)
+            if old is not None:
+                state.add(old, -1)
+            if factors is not None:
+                factors = {fname: factors.get(fname) for fname in _FACTOR_WEIGHTS}
+                state.raw[ticker] = factors
+                state.add(factors, +1)
+
+        state.results = self._score(state)
+        if self.verify:
+            self._verify(domain, state)
+        return dict(state.results)
+
+    @staticmethod
+    def _score(state: _DomainState) -> dict[str, StockScore]:
+        tickers = list(state.raw)
+        if len(tickers) < 2:
+            return rank_domain(state.raw)
+
+        normalized_by_factor: dict[str, list[Optional[float]]] = {}
+        for fname in _FACTOR_WEIGHTS:
+            values = [state.raw[t][fname] for t in tickers]
+            if state.count[fname] < 2:
+                normalized_by_factor[fname] = [None] * len(values)
+                continue
+            mean, std = state.mean_std(fname)
+            normalized_by_factor[fname] = _zscore_capped(values, mean, std)
+        return _score_domain(state.raw, tickers, normalized_by_factor)
+
+    def _verify(self, domain: str, state: _DomainState) -> None:
+        expected = rank_domain(state.raw)
+        got = state.results
+        if expected.keys() != got.keys():
+            raise AssertionError(f"IncrementalRanker[{domain}]: ticker set mismatch")
+        scores = [s.composite_score for s in expected.values()]
+        for ticker, exp in expected.items():
+            diff = abs(got[ticker].composite_score - exp.composite_score)
+            if diff > self.tolerance:
+                raise AssertionError(
+                    f"IncrementalRanker[{domain}]: {ticker} composite "
+                    f"{got[ticker].composite_score} != {exp.composite_score}"
+                )
+            tied = sum(abs(v - exp.composite_score) <= self.tolerance for v in scores) > 1
+            if got[ticker].rank != exp.rank and not tied:
+                raise AssertionError(
+                    f"IncrementalRanker[{domain}]: {ticker} rank {got[ticker].rank} != {exp.rank}"
+                )
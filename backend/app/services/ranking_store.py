@@ -0,0 +1,159 @@
+"""
+ranking_store.py — Full or change-only storage of ranking_results, and the reads
+that rebuild a run from either.
+
+RANKING_STORAGE=full writes every ticker's row on every run. RANKING_STORAGE=delta
+writes, per domain:
+
+  - a keyframe (every ticker's row, keyframe=true) when the domain has none yet,
+    when its ticker set differs from the stored state, or once
+    RANKING_KEYFRAME_EVERY change-only writes have followed the last keyframe
+  - otherwise only the tickers whose rank changed or whose score, factors or
+    long-term score moved by more than RANKING_DELTA_EPSILON (relative; absolute
+    near zero) from the value stored for them
+
+Changes are measured against the stored state rather than the previous run, so
+moves below epsilon cannot accumulate into unrecorded drift.
+
+A domain's state at T is its latest keyframe at or before T with each ticker's
+newest row in (keyframe, T] laid over it. Full storage is the case where every
+row is a keyframe, so readers always go through run_bounds() + state() and see
+the same rows in both modes; computed_at comes back as the domain's latest write,
+as it would on a full run.
+
+A domain left with no tickers gets a keyframe of one TOMBSTONE row (empty
+ticker), which ends its previous state; state() never returns it.
+
+Rollups (rollups.py) are built from the same reconstructed states, one sample
+per stored write of the domain, so a ticker's buckets do not depend on whether
+its own row was rewritten.
+"""
+
+from __future__ import annotations
+
+import math
+from datetime import datetime
+
+from sqlalchemy import Select, and_, func, literal, or_, select
+from sqlalchemy.dialects.postgresql import distinct_on
+from sqlalchemy.orm import Session, aliased
+
+from ..config import settings
+from ..models.ranking_result import RankingResult
+from ..models.stock import Domain
+
+# Compared between a new row and the stored one; rank is compared exactly
+_VALUES = (
+    "composite_score",
+    "momentum",
+    "volume_change",
+    "volatility",
+    "relative_strength",
+    "financial_ratio",
+    "long_term_score",
+)
+
+
+TOMBSTONE = ""
+
+
+def tombstone(domain: str, computed_at: datetime) -> RankingResult:
+    """The whole keyframe of a domain that has no tickers left."""
+    return RankingResult(
+        ticker=TOMBSTONE, domain=domain, composite_score=0.0, rank=0, computed_at=computed_at
+    )
+
+
+def run_bounds(at: datetime | None = None, domain: str | None = None) -> Select:
+    """(domain, keyframe_at, latest_at) per domain, as of *at* (default: now).
+
+    Without *domain*, one row per current domain; either timestamp is None when
+    the domain has no rows yet.
+    """
+    name = Domain.name if domain is None else literal(domain)
+
+    def newest(*where):
+        stmt = select(func.max(RankingResult.computed_at)).where(
+            RankingResult.domain == name, *where
+        )
+        if at is not None:
+            stmt = stmt.where(RankingResult.computed_at <= at)
+        return stmt.scalar_subquery()
+
+    return select(
+        name.label("domain"),
+        newest(RankingResult.keyframe).label("keyframe_at"),
+        newest().label("latest_at"),
+    )
+
+
+def state(bounds: list[tuple[str, datetime, datetime]]) -> Select:
+    """Reconstructed rows for each (domain, keyframe_at, latest_at), by domain and rank.
+
+    Each domain's window is spelled out so the planner reads only the partitions
+    between its keyframe and latest write (a single run under full storage).
+    """
+    newest = (
+        select(RankingResult)
+        .where(
+            or_(
+                *(
+                    and_(
+                        RankingResult.domain == domain,
+                        RankingResult.computed_at >= keyframe_at,
+                        RankingResult.computed_at <= latest_at,
+                    )
+                    for domain, keyframe_at, latest_at in bounds
+                )
+            )
+        )
+        .ext(distinct_on(RankingResult.domain, RankingResult.ticker))
+        .order_by(RankingResult.domain, RankingResult.ticker, RankingResult.computed_at.desc())
+        .subquery()
+    )
+    run_at = func.max(newest.c.computed_at).over(partition_by=newest.c.domain)
+    rows = select(
+        *(column for column in newest.c if column.name != "computed_at"),
+        run_at.label("computed_at"),
+    ).subquery()
+    row = aliased(RankingResult, rows, adapt_on_names=True)
+    return select(row).where(row.ticker != TOMBSTONE).order_by(row.domain, row.rank)
+
+
+def _moved(stored: RankingResult, new: RankingResult) -> bool:
+    if stored.rank != new.rank:
+        return True
+    eps = settings.ranking_delta_epsilon
+    for name in _VALUES:
+        old, value = getattr(stored, name), getattr(new, name)
+        if (old is None) != (value is None):
+            return True
+        if old is not None and not math.isclose(old, value, rel_tol=eps, abs_tol=eps):
+            return True
+    return False
+
+
+def rows_to_store(session: Session, domain: str, rows: list[RankingResult]) -> list[RankingResult]:
+    """The subset of a run's *rows* for *domain* that RANKING_STORAGE keeps."""
+    if settings.ranking_storage == "full":
+        return rows
+    _, keyframe_at, latest_at = session.execute(run_bounds(domain=domain)).one()
+    if keyframe_at is None:
+        return rows
+    stored = {
+        r.ticker: r for r in session.execute(state([(domain, keyframe_at, latest_at)])).scalars()
+    }
+    writes_since = session.execute(
+        select(func.count(func.distinct(RankingResult.computed_at))).where(
+            RankingResult.domain == domain, RankingResult.computed_at > keyframe_at
+        )
+    ).scalar_one()
+    tickers = {r.ticker for r in rows} - {TOMBSTONE}
+    if not tickers and not stored:
+        return []  # already empty
+    if set(stored) != tickers or writes_since >= settings.ranking_keyframe_every:
+        return rows
+    changed = [r for r in rows if _moved(stored[r.ticker], r)]
+    for r in changed:
+        r.keyframe = False
+    return changed
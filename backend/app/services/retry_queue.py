@@ -0,0 +1,103 @@
+"""
+retry_queue.py — Per-ticker retry bookkeeping with exponential backoff.
+
+fetch_cycle records every ticker that came back without a price or with a
+missing factor. The scheduler's retry job asks for the entries that are due,
+re-fetches just those symbols and reports each one back as recovered or
+failed again. A failure doubles the ticker's delay (base → max); after
+max_attempts the ticker is parked until a full cycle succeeds for it, so a
+permanently missing value (no trailing P/E for a loss-making company) costs a
+handful of retries, not one per cycle.
+
+Pure bookkeeping: no I/O, thread-safe, clock injectable for tests.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+
+@dataclass
+class RetryEntry:
+    ticker: str
+    domain: str
+    missing: set[str]  # "price" and/or factor names
+    attempts: int = 0
+    next_at: float = 0.0
+
+
+@dataclass
+class RetryQueue:
+    base_seconds: float = 30.0
+    max_seconds: float = 900.0
+    max_attempts: int = 6
+    clock: Callable[[], float] = time.monotonic
+    _entries: dict[str, RetryEntry] = field(default_factory=dict)
+    _parked: set[str] = field(default_factory=set)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def _delay(self, attempts: int) -> float:
+        return min(self.base_seconds * (2**attempts), self.max_seconds)
+
+    def record(self, ticker: str, domain: str, missing: set[str]) -> None:
+        """A full cycle came back incomplete for *ticker*. Keeps any existing backoff."""
+        with self._lock:
+            if ticker in self._parked:
+                return
+            entry = self._entries.get(ticker)
+            if entry is None:
+                self._entries[ticker] = RetryEntry(
+                    ticker, domain, set(missing), next_at=self.clock() + self._delay(0)
+                )
+            else:
+                entry.domain = domain
+                entry.missing = set(missing)
+
+    def resolve(self, ticker: str) -> None:
+        """*ticker* is complete again: forget its entry and un-park it."""
+        with self._lock:
+            self._entries.pop(ticker, None)
+            self._parked.discard(ticker)
+
+    def retain(self, tickers: set[str]) -> None:
+        """Drop entries for tickers that are no longer tracked."""
+        with self._lock:
+            for ticker in set(self._entries) - tickers:
+                del self._entries[ticker]
+            self._parked &= tickers
+
+    def due(self) -> list[RetryEntry]:
+        """Entries whose backoff has elapsed (copies; report back via succeeded/failed)."""
+        now = self.clock()
+        with self._lock:
+            return [
+                RetryEntry(e.ticker, e.domain, set(e.missing), e.attempts, e.next_at)
+                for e in self._entries.values()
+                if e.next_at <= now
+            ]
+
+    def failed(self, ticker: str, missing: set[str]) -> bool:
+        """A retry did not recover *ticker*. Returns False once it is parked."""
+        with self._lock:
+            entry = self._entries.get(ticker)
+            if entry is None:
+                return False
+            entry.attempts += 1
+            entry.missing = set(missing)
+            if entry.attempts >= self.max_attempts:
+                del self._entries[ticker]
+                self._parked.add(ticker)
+                return False
+            entry.next_at = self.clock() + self._delay(entry.attempts)
+            return True
+
+    def pending(self) -> list[RetryEntry]:
+        with self._lock:
+            return sorted(self._entries.values(), key=lambda e: e.next_at)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,154 @@
+"""
+rollups.py — Hourly and daily score rollups, maintained incrementally.
+
+Every ranking write (_persist_rankings: fetch cycles, retry patches, membership
+re-ranks, queue-mode finalize) marks the domain and computed_at it wrote on its
+session; just before that session commits, refresh_rollups() runs once per
+computed_at for all of them. Only the buckets those writes fall in are touched:
+
+  - the hour bucket of every ticker in the domain is recomputed from the
+    domain's state at each of its writes in that hour, so under
+    RANKING_STORAGE=delta the tickers a write left unchanged still get their
+    sample (under full storage this is just the hour's raw rows)
+  - the day bucket is then recomputed from that day's hour rollups (at most
+    24 rows per ticker)
+
+Both are INSERT ... ON CONFLICT DO UPDATE of whole buckets, so re-running a
+bucket — a retry replacing rows in place, a repeated call — converges to the
+same values instead of double counting. The hour buckets need their raw rows
+(and the keyframe before them) only while the hour is open, so
+RANKING_RETENTION_DAYS can be short; the rollups themselves are kept.
+
+GET /api/history/{ticker}/scores serves them.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+RESOLUTIONS = ("hour", "day")
+_PENDING = "rollups_pending"  # Session.info key: {computed_at: {domains}}
+
+_COLUMNS = (
+    "ticker, resolution, bucket, domain, samples, first_at, last_at, "
+    "score_open, score_high, score_low, score_close, score_mean, "
+    "rank_open, rank_high, rank_low, rank_close, rank_mean"
+)
+_UPSERT = " ON CONFLICT (ticker, resolution, bucket) DO UPDATE SET " + ", ".join(
+    f"{c} = excluded.{c}" for c in _COLUMNS.split(", ")[3:]
+)
+
+# Hour buckets from each domain's reconstructed state (see ranking_store.py): one
+# sample per write of the domain in the hour, taking every ticker's newest row between
+# the domain's latest keyframe and that write, so tickers that delta storage did not
+# rewrite are carried forward. Emptied-domain tombstones are skipped. Open/close are
+# the first/last samples.
+_HOURLY = f"""
+INSERT INTO score_rollups ({_COLUMNS})
+SELECT ticker, 'hour', date_trunc('hour', at, 'UTC'),
+       (array_agg(domain ORDER BY at DESC))[1],
+       count(*), min(at), max(at),
+       (array_agg(composite_score ORDER BY at))[1],
+       max(composite_score), min(composite_score),
+       (array_agg(composite_score ORDER BY at DESC))[1], avg(composite_score),
+       (array_agg(rank ORDER BY at))[1], max(rank), min(rank),
+       (array_agg(rank ORDER BY at DESC))[1], avg(rank)
+FROM (SELECT DISTINCT domain, computed_at AS at FROM ranking_results WHERE {{writes}}) w
+CROSS JOIN LATERAL (
+    SELECT DISTINCT ON (r.ticker) r.ticker, r.composite_score, r.rank
+    FROM ranking_results r
+    WHERE r.domain = w.domain AND r.computed_at <= w.at AND r.ticker <> ''
+      AND r.computed_at >= (
+          SELECT max(k.computed_at) FROM ranking_results k
+          WHERE k.domain = w.domain AND k.computed_at <= w.at AND {{keyframe}}
+      )
+    ORDER BY r.ticker, r.computed_at DESC
+) s
+GROUP BY ticker, date_trunc('hour', at, 'UTC')
+"""
+
+# Day buckets from hour buckets; means are weighted by each hour's sample count
+_DAILY = f"""
+INSERT INTO score_rollups ({_COLUMNS})
+SELECT ticker, 'day', date_trunc('day', bucket, 'UTC'),
+       (array_agg(domain ORDER BY bucket DESC))[1],
+       sum(samples), min(first_at), max(last_at),
+       (array_agg(score_open ORDER BY bucket))[1], max(score_high), min(score_low),
+       (array_agg(score_close ORDER BY bucket DESC))[1], sum(score_mean * samples) / sum(samples),
+       (array_agg(rank_open ORDER BY bucket))[1], max(rank_high), min(rank_low),
+       (array_agg(rank_close ORDER BY bucket DESC))[1], sum(rank_mean * samples) / sum(samples)
+FROM score_rollups
+WHERE resolution = 'hour' AND {{where}}
+GROUP BY ticker, date_trunc('day', bucket, 'UTC')
+"""
+
+
+def refresh_rollups(session: Session, computed_at: datetime, domains: list[str]) -> None:
+    """Recompute the hour and day buckets containing *computed_at* for *domains*' tickers.
+
+    Call after the ranking rows are flushed, inside the same transaction.
+    """
+    if not domains:
+        return
+    at = computed_at.astimezone(timezone.utc)
+    hour = at.replace(minute=0, second=0, microsecond=0)
+    day = hour.replace(hour=0)
+    tickers = (
+        session.execute(
+            text(
+                _HOURLY.format(
+                    writes="computed_at >= :lo AND computed_at < :hi AND domain = ANY(:domains)",
+                    keyframe="k.keyframe",
+                )
+                + _UPSERT
+                + " RETURNING ticker"
+            ),
+            {"lo": hour, "hi": hour + timedelta(hours=1), "domains": domains},
+        )
+        .scalars()
+        .all()
+    )
+    if not tickers:
+        return
+    session.execute(
+        text(
+            _DAILY.format(where="bucket >= :lo AND bucket < :hi AND ticker = ANY(:tickers)")
+            + _UPSERT
+        ),
+        {"lo": day, "hi": day + timedelta(days=1), "tickers": tickers},
+    )
+
+
+def mark_touched(session: Session, computed_at: datetime, domain: str) -> None:
+    """Queue *domain*'s buckets at *computed_at* for refresh when *session* commits."""
+    session.info.setdefault(_PENDING, {}).setdefault(computed_at, set()).add(domain)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_pending(session: Session) -> None:
+    pending = session.info.pop(_PENDING, None)
+    if not pending:
+        return
+    session.flush()
+    for computed_at, domains in pending.items():
+        refresh_rollups(session, computed_at, sorted(domains))
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session: Session) -> None:
+    session.info.pop(_PENDING, None)
+
+
+def backfill_rollups(conn: Connection, full_runs_only: bool = False) -> None:
+    """Build every bucket from all stored rows (the migration that adds the table).
+
+    full_runs_only=True is for a ranking_results table from before delta storage
+    (no keyframe column), where every write is a complete run.
+    """
+    keyframe = "TRUE" if full_runs_only else "k.keyframe"
+    conn.execute(text(_HOURLY.format(writes="TRUE", keyframe=keyframe) + _UPSERT))
+    conn.execute(text(_DAILY.format(where="TRUE") + _UPSERT))
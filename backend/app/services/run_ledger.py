@@ -0,0 +1,209 @@
+"""
+run_ledger.py — Per-run performance ledger for fetch_cycle, fetch_shard and snapshot_job.
+
+Every run writes one PipelineRun row: wall seconds per stage, tickers attempted /
+succeeded / failed, bytes downloaded, rows inserted and peak resident memory.
+
+  with recorded_run(engine, "fetch_cycle") as run:
+      with run.stage("load"):
+          ...
+      run.add(tickers_attempted=len(tickers))
+
+After the row is written, check_regressions() compares each stage against its
+median over the trailing RUN_BASELINE_DAYS of successful runs of the same job
+and logs a warning for any stage slower by more than RUN_REGRESSION_THRESHOLD.
+GET /api/admin/runs serves the ledger.
+
+bytes_downloaded is the in-memory size of the frames the provider returned;
+yfinance does not report wire bytes. Peak RSS is sampled from /proc (None
+elsewhere).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import statistics
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.pipeline_run import PipelineRun
+from app.services.health import health_state
+
+logger = logging.getLogger(__name__)
+
+# Stages faster than this are never reported, whatever the ratio
+MIN_REGRESSION_SECONDS = 0.5
+# Fewer baseline runs than this and a stage is not checked
+MIN_BASELINE_RUNS = 3
+
+
+class RssSampler(threading.Thread):
+    """Samples resident memory every few ms; tracemalloc slows pandas code ~4x."""
+
+    def __init__(self, interval: float = 0.005) -> None:
+        super().__init__(name="rss-sampler", daemon=True)
+        self.interval = interval
+        self.peak = 0
+        self._page = os.sysconf("SC_PAGE_SIZE")
+        self._stop_event = threading.Event()
+
+    def rss(self) -> int:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * self._page
+
+    def reset(self) -> int:
+        self.peak = current = self.rss()
+        return current
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, self.rss())
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def frame_bytes(frame: pd.DataFrame) -> int:
+    """In-memory size of a downloaded frame, the ledger's stand-in for bytes downloaded."""
+    return int(frame.memory_usage(index=True).sum())
+
+
+class RunStats:
+    """Counters of one run; safe to update from pipeline worker threads."""
+
+    def __init__(self, job: str) -> None:
+        self.job = job
+        self.status = "ok"
+        self.started_at = datetime.now(timezone.utc)
+        self.stages: dict[str, float] = {}
+        self.counts = {
+            "tickers_attempted": 0,
+            "tickers_succeeded": 0,
+            "bytes_downloaded": 0,
+            "rows_inserted": 0,
+        }
+        self._lock = threading.Lock()
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                self.counts[name] += value
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        """Add *seconds* to stage *name* (repeated stages accumulate)."""
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(name, time.perf_counter() - start)
+
+
+@contextmanager
+def recorded_run(engine: Engine, job: str) -> Iterator[RunStats]:
+    """Time the block as one *job* run and write its ledger row on the way out.
+
+    A raising block is recorded as failed and the exception propagates. Ledger
+    write errors are logged, never raised into the job.
+    """
+    stats = RunStats(job)
+    try:
+        sampler = RssSampler(interval=0.05)
+        sampler.reset()
+        sampler.start()
+    except OSError:  # no /proc
+        sampler = None
+    start = time.perf_counter()
+    try:
+        yield stats
+    except BaseException:
+        stats.status = "failed"
+        raise
+    finally:
+        total = time.perf_counter() - start
+        if sampler is not None:
+            sampler.stop()
+        health_state.record_run(job, stats.status, datetime.now(timezone.utc), total)
+        try:
+            _write(engine, stats, total, sampler.peak if sampler is not None else None)
+        except Exception:
+            logger.exception("run ledger: could not record %s run", job)
+
+
+def _write(engine: Engine, stats: RunStats, total: float, peak_rss: int | None) -> None:
+    counts = stats.counts
+    run = PipelineRun(
+        job=stats.job,
+        status=stats.status,
+        started_at=stats.started_at,
+        finished_at=stats.started_at + timedelta(seconds=total),
+        stage_seconds={
+            **{k: round(v, 4) for k, v in stats.stages.items()},
+            "total": round(total, 4),
+        },
+        tickers_attempted=counts["tickers_attempted"],
+        tickers_succeeded=counts["tickers_succeeded"],
+        tickers_failed=max(counts["tickers_attempted"] - counts["tickers_succeeded"], 0),
+        bytes_downloaded=counts["bytes_downloaded"],
+        rows_inserted=counts["rows_inserted"],
+        peak_rss_bytes=peak_rss,
+    )
+    with Session(engine) as session:
+        session.add(run)
+        session.commit()
+        if run.status == "ok":
+            for line in check_regressions(session, run):
+                logger.warning("run ledger: %s", line)
+
+
+def check_regressions(
+    session: Session,
+    run: PipelineRun,
+    threshold: float | None = None,
+    days: int | None = None,
+) -> list[str]:
+    """Stages of *run* slower than their trailing median by more than *threshold*."""
+    from app.config import settings
+
+    threshold = settings.run_regression_threshold if threshold is None else threshold
+    days = settings.run_baseline_days if days is None else days
+    previous = (
+        session.execute(
+            select(PipelineRun.stage_seconds).where(
+                PipelineRun.job == run.job,
+                PipelineRun.status == "ok",
+                PipelineRun.id != run.id,
+                PipelineRun.started_at >= run.started_at - timedelta(days=days),
+                PipelineRun.started_at < run.started_at,
+            )
+        )
+        .scalars()
+        .all()
+    )
+    regressions = []
+    for stage, seconds in run.stage_seconds.items():
+        history = [p[stage] for p in previous if stage in p]
+        if len(history) < MIN_BASELINE_RUNS:
+            continue
+        baseline = statistics.median(history)
+        if seconds > baseline * (1 + threshold) and seconds - baseline > MIN_REGRESSION_SECONDS:
+            slower = seconds / max(baseline, 1e-9) - 1
+            regressions.append(
+                f"{run.job} stage {stage} took {seconds:.2f}s vs a {days}-day median of "
+                f"{baseline:.2f}s over {len(history)} runs (+{slower:.0%})"
+            )
+    return regressions
@@ -0,0 +1,208 @@
+"""
+slow_queries.py — Slow-query log with EXPLAIN plans, served by GET /api/admin/slow-queries.
+
+watch_slow_queries() times every statement an engine runs. Any statement over
+SLOW_QUERY_MS is recorded in an in-memory ring buffer (the last
+SLOW_QUERY_BUFFER entries) with its parameters, and queued for a plan:
+
+  - SELECTs are re-run as EXPLAIN (ANALYZE, BUFFERS); anything else gets a
+    plain EXPLAIN, since ANALYZE would execute the write again
+  - plans run on a background thread, on their own connection, in a
+    transaction that is always rolled back, under EXPLAIN_TIMEOUT_MS
+  - at most SLOW_QUERY_EXPLAINS_PER_MINUTE plans are taken, and one statement
+    is not explained again within EXPLAIN_COOLDOWN_SECONDS; entries over the
+    limit keep their timing and parameters with explain_skipped set
+
+Statements from the async engine use asyncpg's $n placeholders, so they are
+explained through PREPARE / EXPLAIN EXECUTE / DEALLOCATE with the captured
+parameters, all in the plan's one transaction so it also works through PgBouncer.
+executemany batches are logged without a plan.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN_TIMEOUT_MS = 30_000
+EXPLAIN_COOLDOWN_SECONDS = 600
+# Longer parameter reprs are truncated in the log
+_MAX_PARAMETERS = 1000
+
+_entries: deque[dict] = deque(maxlen=settings.slow_query_buffer)
+_entries_lock = threading.Lock()
+_ids = itertools.count(1)
+
+
+def recent(limit: int | None = None) -> list[dict]:
+    """Logged statements, newest first."""
+    with _entries_lock:
+        entries = [dict(e) for e in reversed(_entries)]
+    return entries[:limit] if limit is not None else entries
+
+
+class _Explainer(threading.Thread):
+    """Takes EXPLAIN plans for queued entries, within the rate limits."""
+
+    def __init__(self) -> None:
+        super().__init__(name="slow-query-explain", daemon=True)
+        self.jobs: queue.Queue = queue.Queue(maxsize=64)
+        self._taken: deque[float] = deque()
+        self._last_explained: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def admit(self, statement: str) -> str | None:
+        """None when a plan may be taken now, else the reason it is skipped."""
+        key = hashlib.sha1(statement.encode()).hexdigest()
+        now = time.monotonic()
+        with self._lock:
+            while self._taken and now - self._taken[0] > 60:
+                self._taken.popleft()
+            if now - self._last_explained.get(key, -EXPLAIN_COOLDOWN_SECONDS) < (
+                EXPLAIN_COOLDOWN_SECONDS
+            ):
+                return "explained recently"
+            if len(self._taken) >= settings.slow_query_explains_per_minute:
+                return "rate limited"
+            self._taken.append(now)
+            self._last_explained[key] = now
+        return None
+
+    def run(self) -> None:
+        while True:
+            entry, engine, statement, parameters, positional = self.jobs.get()
+            try:
+                plan = _explain(engine, statement, parameters, positional, entry["analyzed"])
+                update = {"explain": plan}
+            except Exception as exc:
+                update = {"explain_error": f"{type(exc).__name__}: {exc}".strip()}
+            with _entries_lock:
+                entry.update(update)
+
+
+_explainer: _Explainer | None = None
+_explainer_lock = threading.Lock()
+
+
+def _get_explainer() -> _Explainer:
+    global _explainer
+    with _explainer_lock:
+        if _explainer is None:
+            _explainer = _Explainer()
+            _explainer.start()
+        return _explainer
+
+
+def _explain(engine: Engine, statement: str, parameters, positional: bool, analyze: bool) -> str:
+    options = "ANALYZE, BUFFERS" if analyze else "COSTS"
+    # A raw DBAPI cursor: these statements skip the engine's own event hooks
+    with engine.connect() as conn:
+        dbapi_conn = conn.connection.dbapi_connection
+        cursor = dbapi_conn.cursor()
+        try:
+            cursor.execute(f"SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT_MS}")
+            if not positional:
+                # The statement is rendered for these parameters (% is escaped as %%)
+                cursor.execute(f"EXPLAIN ({options}) {statement}", parameters)
+                return "\n".join(row[0] for row in cursor.fetchall())
+            # Prepared and deallocated in one transaction: behind a transaction-mode pooler
+            # (DB_PGBOUNCER) the next one may run on another server connection. The
+            # savepoint keeps the transaction usable for DEALLOCATE if EXPLAIN fails.
+            cursor.execute(f"PREPARE slow_query AS {statement}")
+            cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                args = ", ".join(["%s"] * len(parameters))
+                sql = f"EXPLAIN ({options}) EXECUTE slow_query"
+                cursor.execute(f"{sql} ({args})" if parameters else sql, tuple(parameters))
+                return "\n".join(row[0] for row in cursor.fetchall())
+            except Exception:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                raise
+            finally:
+                cursor.execute("DEALLOCATE slow_query")
+        finally:
+            dbapi_conn.rollback()
+            cursor.close()
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None:
+        context._slow_query_start = time.perf_counter()
+
+
+def watch_slow_queries(engine: Engine, name: str) -> None:
+    """Log *engine*'s statements slower than SLOW_QUERY_MS (0 disables the log).
+
+    Pass a sync Engine (AsyncEngine.sync_engine for async ones). Plans for an
+    async engine's statements are taken over psycopg2 on the same database.
+    """
+    if settings.slow_query_ms <= 0:
+        return
+    positional = engine.dialect.paramstyle in ("numeric_dollar", "numeric")
+    if engine.dialect.is_async:
+        explain_engine = create_engine(
+            engine.url.set(drivername="postgresql+psycopg2"), poolclass=NullPool
+        )
+    else:
+        explain_engine = engine
+    threshold = settings.slow_query_ms / 1000
+
+    def after_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        start = getattr(context, "_slow_query_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        if elapsed >= threshold:
+            _record(name, explain_engine, statement, parameters, executemany, positional, elapsed)
+
+    event.listen(engine, "before_cursor_execute", _before_execute)
+    event.listen(engine, "after_cursor_execute", after_execute)
+
+
+def _record(
+    name: str,
+    explain_engine: Engine,
+    statement: str,
+    parameters,
+    executemany: bool,
+    positional: bool,
+    elapsed: float,
+) -> None:
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+    entry = {
+        "id": next(_ids),
+        "at": datetime.now(timezone.utc).isoformat(),
+        "engine": name,
+        "duration_ms": round(elapsed * 1000, 2),
+        "statement": statement,
+        "parameters": repr(parameters)[:_MAX_PARAMETERS],
+        "analyzed": operation == "SELECT",
+        "explain": None,
+        "explain_error": None,
+        "explain_skipped": None,
+    }
+    explainer = _get_explainer()
+    skipped = "executemany" if executemany else explainer.admit(statement)
+    if skipped is None:
+        try:
+            explainer.jobs.put_nowait((entry, explain_engine, statement, parameters, positional))
+        except queue.Full:
+            skipped = "explain queue full"
+    entry["explain_skipped"] = skipped
+    with _entries_lock:
+        _entries.append(entry)
+    logger.warning("slow query (%s, %.0f ms): %s", name, elapsed * 1000, statement[:200])
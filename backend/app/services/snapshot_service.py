@@ -2,14 +2,19 @@ import logging
 from datetime import date, timedelta
 
 import numpy as np
+from opentelemetry import trace
 from sqlalchemy import select
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 
 from app.models.daily_snapshot import DailySnapshot
-from app.models.ranking_result import RankingResult
 from app.models.stock import Domain
+from app.services.profiler import profiled
+from app.services.ranking_store import run_bounds, state
+from app.services.run_ledger import RunStats, recorded_run
 
 logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
 
 
 def compute_trend(scores: list[float]) -> float:
@@ -21,75 +26,87 @@ def compute_trend(scores: list[float]) -> float:
     return float(slope)
 
 
-def snapshot_job() -> None:
+def snapshot_job(snap_date: date | None = None) -> None:
     """
-    EOD job: reads latest RankingResult per ticker, writes/updates DailySnapshot for today.
+    EOD job: reads each domain's latest rankings (run_bounds + state, as the API
+    does), writes/updates DailySnapshot for snap_date (default: today). The
+    market-calendar schedule passes the session date so a post-close run that
+    crosses midnight UTC still lands on the trading day.
     Uses sync engine (_sync_engine) — runs in APScheduler BackgroundScheduler thread.
+    Every run is recorded in the run ledger with read / trends / write stages.
     """
     from app.scheduler import _sync_engine  # avoid circular import at module level
 
-    today = date.today()
-    with Session(_sync_engine) as session:
-        # Build domain_name -> domain_id map
-        domain_map: dict[str, int] = {
-            name: id_ for name, id_ in session.execute(select(Domain.name, Domain.id)).all()
-        }
-
-        # Get latest RankingResult per ticker (max computed_at subquery)
-        from sqlalchemy import func
-
-        latest_subq = (
-            select(
-                RankingResult.ticker, func.max(RankingResult.computed_at).label("max_computed_at")
-            )
-            .group_by(RankingResult.ticker)
-            .subquery()
-        )
-        results = (
-            session.execute(
-                select(RankingResult).join(
-                    latest_subq,
-                    (RankingResult.ticker == latest_subq.c.ticker)
-                    & (RankingResult.computed_at == latest_subq.c.max_computed_at),
-                )
-            )
-            .scalars()
-            .all()
-        )
-
-        if not results:
-            logger.warning("snapshot_job: no RankingResult rows found, skipping")
-            return
-
-        for result in results:
-            # Get last 7 DailySnapshot scores for this ticker (excluding today)
-            past = (
-                session.execute(
-                    select(DailySnapshot.composite_score)
-                    .where(
-                        DailySnapshot.ticker == result.ticker,
-                        DailySnapshot.snap_date >= today - timedelta(days=7),
-                        DailySnapshot.snap_date < today,
+    with (
+        tracer.start_as_current_span("snapshot_job"),
+        recorded_run(_sync_engine, "snapshot_job") as run,
+        profiled("snapshot_job"),
+    ):
+        _write_snapshots(_sync_engine, snap_date or date.today(), run)
+
+
+def _write_snapshots(engine: Engine, today: date, run: RunStats) -> None:
+    from app.services.compute_pool import get_backend
+
+    with Session(engine) as session:
+        with run.stage("read"):
+            # Build domain_name -> domain_id map
+            domain_map: dict[str, int] = {
+                name: id_ for name, id_ in session.execute(select(Domain.name, Domain.id)).all()
+            }
+
+            # Each domain's current rows, rebuilt from its keyframe and later changes; the
+            # window keeps the read to its recent partitions (see ranking_store.py)
+            bounds = [
+                tuple(bound)
+                for bound in session.execute(run_bounds()).all()
+                if bound.keyframe_at is not None
+            ]
+            results = session.execute(state(bounds)).scalars().all() if bounds else []
+
+            if not results:
+                logger.warning("snapshot_job: no RankingResult rows found, skipping")
+                run.status = "skipped"
+                return
+            run.add(tickers_attempted=len(results))
+
+            # Read every ticker's past week first, then fit all trends in one batch
+            # (a process pool with COMPUTE_BACKEND=process)
+            histories: list[list[float]] = []
+            for result in results:
+                # Get last 7 DailySnapshot scores for this ticker (excluding today)
+                past = (
+                    session.execute(
+                        select(DailySnapshot.composite_score)
+                        .where(
+                            DailySnapshot.ticker == result.ticker,
+                            DailySnapshot.snap_date >= today - timedelta(days=7),
+                            DailySnapshot.snap_date < today,
+                        )
+                        .order_by(DailySnapshot.snap_date)
                     )
-                    .order_by(DailySnapshot.snap_date)
+                    .scalars()
+                    .all()
                 )
-                .scalars()
-                .all()
-            )
-
-            slope = compute_trend(list(past) + [result.composite_score])
-            domain_id = domain_map.get(result.domain)
-
-            session.merge(
-                DailySnapshot(
-                    ticker=result.ticker,
-                    snap_date=today,
-                    composite_score=result.composite_score,
-                    rank=result.rank,
-                    domain_id=domain_id,
-                    trend_slope=slope,
+                histories.append(list(past) + [result.composite_score])
+        with run.stage("trends"):
+            slopes = get_backend().trends(histories)
+
+        with run.stage("write"):
+            for result, slope in zip(results, slopes):
+                domain_id = domain_map.get(result.domain)
+
+                session.merge(
+                    DailySnapshot(
+                        ticker=result.ticker,
+                        snap_date=today,
+                        composite_score=result.composite_score,
+                        rank=result.rank,
+                        domain_id=domain_id,
+                        trend_slope=slope,
+                    )
                 )
-            )
 
-        session.commit()
+            session.commit()
+        run.add(tickers_succeeded=len(results), rows_inserted=len(results))
         logger.info("snapshot_job: wrote %d snapshots for %s", len(results), today)
@@ -0,0 +1,323 @@
+"""
+tracing.py — Sampled OpenTelemetry spans exported to a local JSON-lines file.
+
+Instrumentation uses the plain OpenTelemetry API (pinned in requirements.txt
+alongside the FastAPI release that emits request spans), so any OTel SDK can
+replace this provider later. What is traced:
+
+  - every HTTP request and its dependency / endpoint / serialization steps
+    (FastAPI's built-in telemetry, enabled by installing the provider)
+  - SQL statements, when they run inside a sampled trace (trace_engine)
+  - market-data calls through the provider gateway, with outcome and waits
+  - fetch_cycle / snapshot_job, each pipeline stage item and ranking step
+
+TRACE_SAMPLE_RATE (0..1) is the fraction of root spans kept; children follow
+their root's decision. At 0 (the default) no provider is installed and every
+span is a no-op. Kept spans are appended to TRACE_PATH, one JSON object per
+line with OTLP field names (traceId, spanId, parentSpanId, startTimeUnixNano,
+...). Read them with `python -m app.traces`.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import random
+import threading
+import time
+import traceback
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from opentelemetry import trace
+from opentelemetry.trace import (
+    NonRecordingSpan,
+    SpanContext,
+    SpanKind,
+    Status,
+    StatusCode,
+    TraceFlags,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Longer SQL is truncated in db.statement
+_MAX_STATEMENT = 2000
+_NOT_SAMPLED = TraceFlags(TraceFlags.DEFAULT)
+_SAMPLED = TraceFlags(TraceFlags.SAMPLED)
+
+
+class JsonlExporter:
+    """Appends finished spans to *path*, flushing whenever a root span ends."""
+
+    def __init__(self, path: str | Path, max_buffer: int = 512) -> None:
+        self.path = Path(path)
+        self.max_buffer = max_buffer
+        self._buffer: list[str] = []
+        self._lock = threading.Lock()
+
+    def export(self, record: dict, root: bool) -> None:
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._buffer.append(line)
+            if root or len(self._buffer) >= self.max_buffer:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._buffer:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a") as fh:
+            fh.write("\n".join(self._buffer) + "\n")
+        self._buffer.clear()
+
+
+class _Span(trace.Span):
+    def __init__(
+        self,
+        exporter: JsonlExporter,
+        scope: str,
+        name: str,
+        context: SpanContext,
+        parent: SpanContext | None,
+        kind: SpanKind,
+        attributes: Mapping[str, Any] | None,
+        start_time: int | None,
+    ) -> None:
+        self._exporter = exporter
+        self._scope = scope
+        self._name = name
+        self._context = context
+        self._parent = parent
+        self._kind = kind
+        self._attributes = dict(attributes or {})
+        self._events: list[dict] = []
+        self._status = Status(StatusCode.UNSET)
+        self._start = start_time or time.time_ns()
+        self._end: int | None = None
+
+    def get_span_context(self) -> SpanContext:
+        return self._context
+
+    def is_recording(self) -> bool:
+        return self._end is None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self._attributes[key] = value
+
+    def set_attributes(self, attributes: Mapping[str, Any]) -> None:
+        self._attributes.update(attributes)
+
+    def add_event(
+        self, name: str, attributes: Mapping[str, Any] | None = None, timestamp: int | None = None
+    ) -> None:
+        self._events.append(
+            {
+                "name": name,
+                "timeUnixNano": timestamp or time.time_ns(),
+                "attributes": dict(attributes or {}),
+            }
+        )
+
+    def update_name(self, name: str) -> None:
+        self._name = name
+
+    def set_status(self, status: Status | StatusCode, description: str | None = None) -> None:
+        self._status = status if isinstance(status, Status) else Status(status, description)
+
+    def record_exception(
+        self,
+        exception: BaseException,
+        attributes: Mapping[str, Any] | None = None,
+        timestamp: int | None = None,
+        escaped: bool = False,
+    ) -> None:
+        self.add_event(
+            "exception",
+            {
+                "exception.type": type(exception).__qualname__,
+                "exception.message": str(exception),
+                "exception.stacktrace": "".join(traceback.format_exception(exception)),
+                **(attributes or {}),
+            },
+            timestamp,
+        )
+
+    def end(self, end_time: int | None = None) -> None:
+        if self._end is not None:
+            return
+        self._end = end_time or time.time_ns()
+        record = {
+            "traceId": format(self._context.trace_id, "032x"),
+            "spanId": format(self._context.span_id, "016x"),
+            "parentSpanId": format(self._parent.span_id, "016x") if self._parent else "",
+            "name": self._name,
+            "kind": f"SPAN_KIND_{self._kind.name}",
+            "startTimeUnixNano": self._start,
+            "endTimeUnixNano": self._end,
+            "attributes": self._attributes,
+            "events": self._events,
+            "status": {
+                "code": f"STATUS_CODE_{self._status.status_code.name}",
+                "message": self._status.description or "",
+            },
+            "scope": self._scope,
+        }
+        self._exporter.export(record, root=self._parent is None or self._parent.is_remote)
+
+
+class _Tracer(trace.Tracer):
+    def __init__(self, provider: SampledTracerProvider, scope: str) -> None:
+        self._provider = provider
+        self._scope = scope
+
+    def start_span(
+        self,
+        name: str,
+        context=None,
+        kind: SpanKind = SpanKind.INTERNAL,
+        attributes=None,
+        links=None,
+        start_time: int | None = None,
+        record_exception: bool = True,
+        set_status_on_exception: bool = True,
+    ) -> trace.Span:
+        parent = trace.get_current_span(context).get_span_context()
+        if parent.is_valid:
+            if not parent.trace_flags.sampled:
+                return NonRecordingSpan(parent)  # the root was dropped: so are its children
+            trace_id = parent.trace_id
+        else:
+            parent = None
+            trace_id = random.getrandbits(128)
+            if random.random() >= self._provider.sample_rate:
+                # A valid unsampled context, so children skip the dice roll
+                return NonRecordingSpan(
+                    SpanContext(trace_id, random.getrandbits(64), False, _NOT_SAMPLED)
+                )
+        span_context = SpanContext(trace_id, random.getrandbits(64), False, _SAMPLED)
+        return _Span(
+            self._provider.exporter,
+            self._scope,
+            name,
+            span_context,
+            parent,
+            kind,
+            attributes,
+            start_time,
+        )
+
+    @contextmanager
+    def start_as_current_span(
+        self,
+        name: str,
+        context=None,
+        kind: SpanKind = SpanKind.INTERNAL,
+        attributes=None,
+        links=None,
+        start_time: int | None = None,
+        record_exception: bool = True,
+        set_status_on_exception: bool = True,
+        end_on_exit: bool = True,
+    ) -> Iterator[trace.Span]:
+        span = self.start_span(name, context, kind, attributes, links, start_time)
+        with trace.use_span(
+            span,
+            end_on_exit=end_on_exit,
+            record_exception=record_exception,
+            set_status_on_exception=set_status_on_exception,
+        ) as current:
+            yield current
+
+
+class SampledTracerProvider(trace.TracerProvider):
+    """Head-sampling tracer provider writing to a JsonlExporter; see the module docstring."""
+
+    def __init__(self, sample_rate: float, exporter: JsonlExporter) -> None:
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+
+    def get_tracer(
+        self,
+        instrumenting_module_name: str,
+        instrumenting_library_version: str | None = None,
+        schema_url: str | None = None,
+        attributes=None,
+    ) -> trace.Tracer:
+        return _Tracer(self, instrumenting_module_name)
+
+    def force_flush(self) -> None:
+        self.exporter.flush()
+
+
+_provider: SampledTracerProvider | None = None
+_provider_lock = threading.Lock()
+
+
+def configure_tracing() -> SampledTracerProvider | None:
+    """Install the process-wide provider when TRACE_SAMPLE_RATE > 0 (idempotent)."""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            from app.config import settings
+
+            if settings.trace_sample_rate <= 0:
+                return None
+            _provider = SampledTracerProvider(
+                settings.trace_sample_rate, JsonlExporter(settings.trace_path)
+            )
+            trace.set_tracer_provider(_provider)
+            atexit.register(_provider.force_flush)
+        return _provider
+
+
+_db_tracer = trace.get_tracer("app.db")
+
+
+def _start_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    # Statements only join traces that are already sampled; they never start one
+    if context is None or not trace.get_current_span().is_recording():
+        return
+    context._trace_span = _db_tracer.start_span(
+        "db.execute",
+        kind=SpanKind.CLIENT,
+        attributes={
+            "db.system": "postgresql",
+            "db.operation": statement.lstrip().split(None, 1)[0].upper() if statement else "",
+            "db.statement": statement[:_MAX_STATEMENT],
+            "db.executemany": executemany,
+        },
+    )
+
+
+def _end_statement(conn, cursor, statement, parameters, context, executemany) -> None:
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        span.set_attribute("db.rowcount", cursor.rowcount)
+        span.end()
+
+
+def _statement_failed(exception_context) -> None:
+    span = getattr(exception_context.execution_context, "_trace_span", None)
+    if span is not None:
+        span.record_exception(exception_context.original_exception)
+        span.set_status(
+            Status(StatusCode.ERROR, type(exception_context.original_exception).__name__)
+        )
+        span.end()
+
+
+def trace_engine(engine: Engine) -> None:
+    """Emit a db.execute span for each of *engine*'s statements inside a sampled trace.
+
+    Pass a sync Engine (AsyncEngine.sync_engine for async ones).
+    """
+    event.listen(engine, "before_cursor_execute", _start_statement)
+    event.listen(engine, "after_cursor_execute", _end_statement)
+    event.listen(engine, "handle_error", _statement_failed)
@@ -0,0 +1,115 @@
+"""
+traces.py — Read the JSON-lines span file written with TRACE_SAMPLE_RATE > 0.
+
+  python -m app.traces                          # slowest 20 traces in TRACE_PATH
+  python -m app.traces traces.jsonl --name fetch_cycle --limit 5
+  python -m app.traces traces.jsonl --trace 4bf92f35...   # one trace as a span tree
+  python -m app.traces --tree --limit 3         # trees of the 3 slowest traces
+
+A trace is listed under its root span's name (for requests, FastAPI names it
+"GET /api/rankings" and so on). In a tree each span shows its offset from the
+trace start, its duration and its attributes; the slowest child at every
+level is marked with *.
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from pathlib import Path
+
+from .config import settings
+
+# Attributes too long or too noisy for the one-line span view
+_HIDDEN = {"exception.stacktrace"}
+_MAX_VALUE = 80
+
+
+def load_traces(path: Path) -> dict[str, list[dict]]:
+    """traceId -> spans; unreadable lines (a write cut short) are skipped."""
+    traces: dict[str, list[dict]] = defaultdict(list)
+    with open(path) as fh:
+        for line in fh:
+            try:
+                span = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            traces[span["traceId"]].append(span)
+    return traces
+
+
+def _root(spans: list[dict]) -> dict:
+    ids = {s["spanId"] for s in spans}
+    roots = [s for s in spans if s["parentSpanId"] not in ids]
+    return min(roots, key=lambda s: s["startTimeUnixNano"])
+
+
+def _ms(span: dict) -> float:
+    return (span["endTimeUnixNano"] - span["startTimeUnixNano"]) / 1e6
+
+
+def _attributes(span: dict) -> str:
+    parts = []
+    for key, value in span.get("attributes", {}).items():
+        if key in _HIDDEN:
+            continue
+        text = str(value)
+        parts.append(f"{key}={text[:_MAX_VALUE] + '…' if len(text) > _MAX_VALUE else text}")
+    if span["status"]["code"] == "STATUS_CODE_ERROR":
+        parts.append(f"ERROR {span['status']['message']}".rstrip())
+    return "  ".join(parts)
+
+
+def format_tree(spans: list[dict]) -> list[str]:
+    root = _root(spans)
+    children: dict[str, list[dict]] = defaultdict(list)
+    for span in spans:
+        children[span["parentSpanId"]].append(span)
+    origin = root["startTimeUnixNano"]
+    lines = [f"trace {root['traceId']}  {_ms(root):.1f} ms  {len(spans)} spans"]
+
+    def walk(span: dict, depth: int, slowest: bool) -> None:
+        offset = (span["startTimeUnixNano"] - origin) / 1e6
+        mark = "*" if slowest else " "
+        lines.append(
+            f"{offset:9.1f} {_ms(span):9.1f} ms {mark}{'  ' * depth}{span['name']}"
+            f"  {_attributes(span)}".rstrip()
+        )
+        kids = sorted(children.get(span["spanId"], []), key=lambda s: s["startTimeUnixNano"])
+        top = max(kids, key=_ms) if len(kids) > 1 else None
+        for kid in kids:
+            walk(kid, depth + 1, kid is top)
+
+    walk(root, 0, False)
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Summarize a JSON-lines trace file.")
+    parser.add_argument("path", type=Path, nargs="?", default=Path(settings.trace_path))
+    parser.add_argument("--trace", help="print this trace id as a tree")
+    parser.add_argument("--name", help="only traces whose root span has this name")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--tree", action="store_true", help="print trees, not one line each")
+    args = parser.parse_args()
+
+    traces = load_traces(args.path)
+    if args.trace:
+        matches = [t for t in traces if t.startswith(args.trace)]
+        if not matches:
+            parser.error(f"no trace {args.trace} in {args.path}")
+        print("\n".join(format_tree(traces[matches[0]])))
+        return
+
+    rows = [(tid, _root(spans), spans) for tid, spans in traces.items()]
+    if args.name:
+        rows = [r for r in rows if r[1]["name"] == args.name]
+    rows.sort(key=lambda r: _ms(r[1]), reverse=True)
+    for tid, root, spans in rows[: args.limit]:
+        if args.tree:
+            print("\n".join(format_tree(spans)) + "\n")
+        else:
+            print(f"{tid}  {_ms(root):10.1f} ms  {len(spans):4d} spans  {root['name']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+worker.py — Standalone scheduler and fetch-queue worker process.
+
+Runs the same leader election as the API processes, without serving HTTP, so
+scheduled jobs can live outside the API entirely (set RUN_SCHEDULER=false on
+the API). Several workers may run; only the lock holder schedules jobs.
+
+With FETCH_MODE=queue every worker also consumes fetch shards (see
+services/fetch_queue.py); run more of them, on any node, to fetch faster.
+
+  python -m app.worker                  # scheduler election + shard consumer
+  python -m app.worker --no-scheduler   # shard consumer only
+"""
+
+import argparse
+import logging
+import signal
+import threading
+
+from .config import settings
+from .leader import LeaderElector
+from .scheduler import _sync_engine, create_scheduler
+from .services.fetch_queue import consume
+from .services.tracing import configure_tracing
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Scheduler / fetch-queue worker.")
+    parser.add_argument(
+        "--no-scheduler", action="store_true", help="do not compete for the scheduler lock"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+    )
+    configure_tracing()
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    elector = None
+    if not args.no_scheduler:
+        elector = LeaderElector(create_scheduler)
+        elector.start()
+    if settings.fetch_mode == "queue":
+        consume(_sync_engine, stop=stop.is_set)
+    else:
+        stop.wait()
+    if elector is not None:
+        elector.stop()
+
+
+if __name__ == "__main__":
+    main()
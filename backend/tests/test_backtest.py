@@ -0,0 +1,147 @@
+"""
+Tests for backtest.py — factor history pivoting, forward returns and metrics.
+
+Pure in-memory data except load_factor_history, which reads a scratch schema.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.backtest import (
+    backtest_histories,
+    build_factor_history,
+    evaluate_domain,
+    forward_returns,
+    load_factor_history,
+)
+from app.services.ranking_engine import FACTOR_NAMES
+
+T0 = datetime(2026, 3, 2, 15, 0)
+
+
+def _rows(times, tickers, factor_fn):
+    records = []
+    for t_idx, ts in enumerate(times):
+        for ticker in tickers:
+            record = {"domain": "Tech", "ticker": ticker, "computed_at": ts}
+            record.update({name: factor_fn(t_idx, ticker) for name in FACTOR_NAMES})
+            records.append(record)
+    return pd.DataFrame(records)
+
+
+def test_build_factor_history_shapes_and_presence():
+    times = [T0, T0 + timedelta(minutes=5)]
+    rows = _rows(times, ["AAA", "BBB"], lambda t, tk: 1.0)
+    rows = rows[~((rows["ticker"] == "BBB") & (rows["computed_at"] == times[1]))]
+
+    history = build_factor_history(rows)["Tech"]
+
+    assert history.raw.shape == (2, 2, len(FACTOR_NAMES))
+    assert history.tickers == ["AAA", "BBB"]
+    assert history.present.tolist() == [[True, True], [True, False]]
+
+
+def test_forward_returns_uses_last_price_at_or_before_horizon():
+    prices = pd.DataFrame(
+        {
+            "ticker": ["AAA", "AAA", "AAA"],
+            "fetched_at": [T0, T0 + timedelta(days=1), T0 + timedelta(days=2)],
+            "close_price": [100.0, 110.0, 99.0],
+        }
+    )
+    times = np.array([T0, T0 + timedelta(days=1), T0 + timedelta(days=2)], dtype="datetime64[ns]")
+
+    fwd = forward_returns(times, ["AAA", "MISSING"], prices, timedelta(days=1))
+
+    assert fwd[0, 0] == pytest.approx(0.10)
+    assert fwd[1, 0] == pytest.approx(-0.10)
+    assert np.isnan(fwd[2, 0])  # horizon runs past the newest price
+    assert np.isnan(fwd[:, 1]).all()
+
+
+def test_evaluate_domain_perfect_predictor():
+    scores = np.array([[100.0, 50.0, 0.0], [0.0, 100.0, 50.0]])
+    ranks = np.array([[1, 2, 3], [3, 1, 2]])
+    fwd = np.array([[0.03, 0.02, 0.01], [-0.02, 0.05, 0.00]])
+
+    result = evaluate_domain("Tech", scores, ranks, fwd)
+
+    assert result.periods == 2
+    assert result.hit_rate == pytest.approx(1.0)
+    assert result.rank_ic == pytest.approx(1.0)
+
+
+def test_backtest_histories_end_to_end():
+    """Momentum alone drives the ranking; forward returns follow momentum."""
+    times = [T0 + timedelta(days=d) for d in range(5)]
+    tickers = ["AAA", "BBB", "CCC"]
+    strength = {"AAA": 3.0, "BBB": 2.0, "CCC": 1.0}
+    rows = _rows(times, tickers, lambda t, tk: strength[tk])
+    prices = pd.DataFrame(
+        [
+            {"ticker": tk, "fetched_at": ts, "close_price": 100.0 * (1 + strength[tk] / 100) ** d}
+            for d, ts in enumerate(times)
+            for tk in tickers
+        ]
+    )
+
+    report = backtest_histories(build_factor_history(rows), prices, timedelta(days=1))
+
+    assert [r.domain for r in report] == ["Tech"]
+    assert report[0].periods == 4
+    assert report[0].hit_rate == pytest.approx(1.0)
+    assert report[0].rank_ic == pytest.approx(1.0)
+
+
+def test_build_factor_history_carries_delta_rows_forward_to_next_keyframe():
+    times = [T0 + timedelta(minutes=5 * i) for i in range(4)]
+    rows = _rows(times, ["AAA", "BBB"], lambda t, tk: float(t))
+    rows["keyframe"] = rows["computed_at"].isin([times[0], times[3]])
+    # AAA moved at times[1], BBB at times[2]; the times[3] keyframe no longer has BBB
+    keep = (
+        rows["computed_at"].isin([times[0], times[3]])
+        | ((rows["computed_at"] == times[1]) & (rows["ticker"] == "AAA"))
+        | ((rows["computed_at"] == times[2]) & (rows["ticker"] == "BBB"))
+    ) & ~((rows["computed_at"] == times[3]) & (rows["ticker"] == "BBB"))
+
+    history = build_factor_history(rows[keep])["Tech"]
+
+    assert history.present.tolist() == [[True, True], [True, True], [True, True], [True, False]]
+    assert history.raw[:, :, 0].tolist()[:3] == [[0.0, 0.0], [1.0, 0.0], [1.0, 2.0]]
+    assert np.isnan(history.raw[3, 1]).all()
+
+
+def test_load_factor_history_since_starts_at_the_keyframe(scratch_engine):
+    from sqlalchemy.orm import Session
+
+    from app.models.ranking_result import RankingResult
+    from app.models.stock import Domain
+
+    times = [(T0 + timedelta(minutes=5 * i)).replace(tzinfo=timezone.utc) for i in range(3)]
+    stored = [(0, "AAA", True), (0, "BBB", True), (1, "AAA", False), (2, "BBB", False)]
+    with Session(scratch_engine) as session:
+        session.add(Domain(name="Tech"))
+        for t, ticker, keyframe in stored:
+            session.add(
+                RankingResult(
+                    ticker=ticker,
+                    domain="Tech",
+                    composite_score=0.0,
+                    rank=1,
+                    computed_at=times[t],
+                    keyframe=keyframe,
+                    **{name: float(t) for name in FACTOR_NAMES},
+                )
+            )
+        session.commit()
+
+        history = load_factor_history(session, since=times[1])["Tech"]
+
+    # BBB is unchanged at times[1]: carried from the keyframe before the window
+    assert list(pd.to_datetime(history.times)) == [T0 + timedelta(minutes=5 * i) for i in (1, 2)]
+    assert history.tickers == ["AAA", "BBB"]
+    assert history.present.tolist() == [[True, True], [True, True]]
+    assert history.raw[:, :, 0].tolist() == [[1.0, 0.0], [1.0, 2.0]]
@@ -0,0 +1,34 @@
+from app.bench import compare, main
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {
+        "500": {
+            "factors": {"seconds": 4.0, "peak_mib": 40.0},
+            "rank": {"seconds": 0.01, "peak_mib": 0.5},
+        }
+    }
+    current = {
+        "500": {
+            "factors": {"seconds": 5.5, "peak_mib": 42.0},  # +37% time
+            "rank": {"seconds": 0.03, "peak_mib": 3.0},  # 3x, but within the noise floors
+            "api": {"seconds": 9.0, "peak_mib": 9.0},  # no baseline yet
+        },
+        "5000": {"factors": {"seconds": 60.0, "peak_mib": 90.0}},
+    }
+    assert compare(current, baseline, tolerance=0.25) == [
+        "500 tickers / factors: 5.5s vs baseline 4.0s (+38%)"
+    ]
+    assert compare(current, baseline, tolerance=0.5) == []
+
+
+def test_compute_stages_run_without_a_database(tmp_path, capsys):
+    baseline = tmp_path / "baseline.json"
+    assert main(["--sizes", "20", "--no-db", "--baseline", str(baseline), "--update-baseline"]) == 0
+    assert (
+        main(["--sizes", "20", "--no-db", "--baseline", str(baseline), "--tolerance", "100"]) == 0
+    )
+    out = capsys.readouterr().out
+    for stage in ("history", "factors", "long_term", "rank"):
+        assert stage in out
+    assert "no regressions" in out
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.compute_pool import ComputeBackend, ProcessComputeBackend
+
+
+def _panel(n_tickers: int, days: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range(end="2026-10-16", periods=days)
+    tickers = [f"T{i:03d}" for i in range(n_tickers)]
+    close = pd.DataFrame(
+        100 * np.exp(np.cumsum(rng.normal(0, 0.02, (days, n_tickers)), axis=0)),
+        index=idx,
+        columns=tickers,
+    )
+    close.iloc[:3, 0] = np.nan  # a ticker that listed late
+    close.iloc[:, 1] = np.nan  # a ticker with no data at all
+    volume = pd.DataFrame(rng.uniform(1e6, 2e6, (days, n_tickers)), index=idx, columns=tickers)
+    return pd.concat({"Close": close, "Volume": volume}, axis=1)
+
+
+@pytest.fixture(scope="module")
+def process_backend():
+    backend = ProcessComputeBackend(workers=2, min_tickers=1)
+    yield backend
+    backend.shutdown()
+
+
+def test_process_backend_matches_inline(process_backend):
+    history = _panel(24, 30)
+    tickers = list(history["Close"].columns)
+    domains = {"A": tickers[:10], "B": tickers[10:13], "C": tickers[13:]}
+    inline = ComputeBackend()
+
+    assert process_backend.price_factors(history, domains) == inline.price_factors(history, domains)
+    closes = _panel(12, 250, seed=1)["Close"]
+    assert process_backend.long_term_scores(closes) == inline.long_term_scores(closes)
+    series = [[50.0], [40.0, 45.0, 47.5], [60.0, 58.0, 57.0, 59.0, 61.0, 50.0, 49.0, 48.0]]
+    assert process_backend.trends(series) == pytest.approx(inline.trends(series))
@@ -4,16 +4,23 @@ Tests for data_fetcher.py — yfinance batch fetch and validation.
 All yfinance calls are mocked; no real network calls are made.
 """
 
+import threading
+import time
 from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pandas as pd
 import pytest
 
 from app.services.data_fetcher import (
     SEED_TICKERS,
+    compute_price_factors,
     fetch_all_stocks,
+    fingerprint_inputs,
+    slim_panel,
     validate_ticker_data,
 )
+from app.services.ranking_engine import rank_domain
 
 # ---------------------------------------------------------------------------
 # validate_ticker_data tests
@@ -162,3 +169,104 @@ def test_fetch_all_stocks_default_uses_seed_tickers():
     call_args = mock_dl.call_args
     passed_tickers = call_args[0][0]  # first positional arg
     assert passed_tickers == SEED_TICKERS
+
+
+# ---------------------------------------------------------------------------
+# fingerprint_inputs tests
+# ---------------------------------------------------------------------------
+
+
+def _history(tickers):
+    close = pd.DataFrame({t: [100.0 + i, 101.0 + i] for i, t in enumerate(tickers)})
+    volume = pd.DataFrame({t: [1_000.0, 1_100.0] for t in tickers})
+    return pd.concat({"Close": close, "Volume": volume}, axis=1)
+
+
+def test_fingerprint_ignores_column_and_membership_order():
+    """The same inputs requested in a different order must fingerprint identically."""
+    a = fingerprint_inputs(
+        _history(["AAPL", "MSFT"]), {}, {"AAPL": -30.0, "MSFT": None}, {"Tech": ["AAPL", "MSFT"]}
+    )
+    b = fingerprint_inputs(
+        _history(["AAPL", "MSFT"])[
+            [("Volume", "MSFT"), ("Close", "MSFT")] + [("Close", "AAPL"), ("Volume", "AAPL")]
+        ],
+        {},
+        {"MSFT": None, "AAPL": -30.0},
+        {"Tech": ["MSFT", "AAPL"]},
+    )
+    assert a == b
+
+
+def test_fingerprint_changes_with_any_input():
+    """A new bar, a fundamentals change or a membership move must change the fingerprint."""
+    history = _history(["AAPL", "MSFT"])
+    base = fingerprint_inputs(history, {}, {"AAPL": -30.0}, {"Tech": ["AAPL", "MSFT"]})
+
+    late_print = history.copy()
+    late_print.loc[1, ("Close", "MSFT")] = 102.5
+    assert fingerprint_inputs(late_print, {}, {"AAPL": -30.0}, {"Tech": ["AAPL", "MSFT"]}) != base
+    assert fingerprint_inputs(history, {}, {"AAPL": -31.0}, {"Tech": ["AAPL", "MSFT"]}) != base
+    assert (
+        fingerprint_inputs(history, {}, {"AAPL": -30.0}, {"Tech": ["AAPL"], "EV": ["MSFT"]}) != base
+    )
+
+
+# ---------------------------------------------------------------------------
+# Chunked downloads / slim panels
+# ---------------------------------------------------------------------------
+
+
+def _ohlcv(tickers, days=30, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range(end="2026-10-16", periods=days)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (days, len(tickers))), axis=0))
+    fields = {
+        "Open": close * 0.99,
+        "High": close * 1.01,
+        "Low": close * 0.98,
+        "Close": close,
+        "Volume": rng.uniform(1e6, 5e7, (days, len(tickers))).round(),
+    }
+    return pd.concat(
+        {k: pd.DataFrame(v, index=idx, columns=tickers) for k, v in fields.items()}, axis=1
+    )
+
+
+def test_fetch_all_stocks_chunks_with_bounded_concurrency():
+    """A large universe is split into chunk_size batches with at most max_workers in flight."""
+    tickers = [f"T{i:03d}" for i in range(23)]
+    full = _ohlcv(tickers)
+    in_flight, peak, lock = [0], [0], threading.Lock()
+
+    def fake_download(chunk, **kwargs):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.02)
+        with lock:
+            in_flight[0] -= 1
+        return full.loc[:, (slice(None), chunk)]
+
+    with patch("app.services.data_fetcher.yf.download", side_effect=fake_download) as mock_dl:
+        chunked = fetch_all_stocks(tickers, chunk_size=5, max_workers=2)
+    assert mock_dl.call_count == 5
+    assert peak[0] <= 2
+    with patch("app.services.data_fetcher.yf.download", return_value=full):
+        assert chunked == fetch_all_stocks(tickers)
+
+
+def test_slim_panel_keeps_seed_universe_rankings():
+    """float32 Close/Volume panels must rank the 49 seed tickers exactly as before."""
+    raw = _ohlcv(SEED_TICKERS, seed=7)
+    slim = slim_panel(raw, SEED_TICKERS)
+    assert list(slim.columns.get_level_values(0).unique()) == ["Close", "Volume"]
+    assert (slim.dtypes == np.float32).all()
+
+    groups = [SEED_TICKERS[i : i + 5] for i in range(0, len(SEED_TICKERS), 5)]
+    for group in groups:
+        before = rank_domain({t: compute_price_factors(t, raw, raw, group) for t in group})
+        after = rank_domain({t: compute_price_factors(t, slim, slim, group) for t in group})
+        assert {t: s.rank for t, s in after.items()} == {t: s.rank for t, s in before.items()}
+        for t in group:
+            assert after[t].composite_score == pytest.approx(before[t].composite_score, abs=1e-3)
@@ -0,0 +1,194 @@
+import multiprocessing as mp
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.services.fetch_queue import plan_shards
+
+SHARD_SECONDS = 0.25
+
+
+def test_plan_shards_keeps_domains_whole():
+    groups = {"A": ["A1", "A2", "A3"], "B": ["B1", "B2"], "C": ["C1"] * 6, "D": [], "E": ["E1"]}
+    shards = plan_shards(groups, shard_size=5)
+    assert shards == [
+        {"A": ["A1", "A2", "A3"], "B": ["B1", "B2"]},
+        {"C": ["C1"] * 6},
+        {"E": ["E1"]},
+    ]
+
+
+def _fake_compute(domains, run):
+    time.sleep(SHARD_SECONDS)
+    factors = {}
+    for domain, tickers in domains.items():
+        factors[domain] = {}
+        for ticker in tickers:
+            seed = zlib.crc32(ticker.encode())
+            factors[domain][ticker] = {
+                "momentum": (seed % 200 - 100) / 1000,
+                "volume_change": (seed % 97) / 100,
+                "volatility": (seed % 31) / 100 + 0.01,
+                "relative_strength": (seed % 50 - 25) / 1000,
+                "financial_ratio": float(seed % 40 + 5),
+            }
+    tickers = [t for group in domains.values() for t in group]
+    return {
+        "latest": {t: {"close_price": 100.0, "volume": 1e6} for t in tickers},
+        "factors": factors,
+        "long_term": {t: 50.0 for t in tickers},
+        "fingerprints": {d: str(zlib.crc32(repr(f).encode())) for d, f in factors.items()},
+    }
+
+
+def _engine(url, schema):
+    sync_url = url.replace("postgresql+asyncpg", "postgresql+psycopg2")
+    return create_engine(sync_url, connect_args={"options": f"-csearch_path={schema}"})
+
+
+def _worker(url, schema, worker_id, go, out):
+    from app.services.fetch_queue import consume
+
+    engine = _engine(url, schema)
+    with engine.connect():
+        pass
+    go.wait()
+    started = time.time()  # compared with the shards' finished_at
+    done = consume(engine, worker_id, compute=_fake_compute, poll_seconds=0.05, exit_when_idle=True)
+    out.put((worker_id, done, started))
+
+
+def test_workers_share_shards_and_finalize_once(pg_url, scratch_schema, scratch_engine):
+    from app.models.fetch_queue import FetchRun, FetchShard
+    from app.models.ranking_result import RankingResult
+    from app.models.ranking_run import RankingRun
+    from app.services.fetch_queue import enqueue_run
+
+    engine, schema = scratch_engine, scratch_schema
+    groups = {f"D{i:02d}": [f"T{i:02d}{j}" for j in range(5)] for i in range(16)}
+    with Session(engine) as session:
+        run = enqueue_run(session, groups, shard_size=5)
+        run_id = run.id
+    n_shards = len(groups)
+
+    ctx = mp.get_context("spawn")
+    go, out = ctx.Event(), ctx.Queue()
+    workers = [
+        ctx.Process(target=_worker, args=(pg_url, schema, f"w{i}", go, out)) for i in range(4)
+    ]
+    for proc in workers:
+        proc.start()
+    time.sleep(0.5)
+    go.set()
+    reports = [out.get(timeout=60) for _ in workers]
+    for proc in workers:
+        proc.join(timeout=10)
+
+    assert sum(done for _, done, _ in reports) == n_shards
+    assert all(done > 0 for _, done, _ in reports)
+
+    with Session(engine) as session:
+        # Up to the last shard: the finalizer's ranking pass after it is serial work
+        last = session.execute(select(func.max(FetchShard.finished_at))).scalar_one()
+        wall = last.timestamp() - min(start for *_, start in reports)
+        assert wall < n_shards * SHARD_SECONDS / 2  # 4 workers: well under half the serial time
+        assert session.get(FetchRun, run_id).status == "done"
+        attempts = session.execute(select(FetchShard.attempts)).scalars().all()
+        assert attempts == [1] * n_shards
+        assert session.execute(select(func.count()).select_from(RankingRun)).scalar_one() == 1
+        rows = session.execute(select(func.count()).select_from(RankingResult)).scalar_one()
+        assert rows == 5 * n_shards
+
+
+def test_unchanged_run_only_reverifies(scratch_engine):
+    from app.models.fetch_queue import FetchRun
+    from app.models.ranking_result import RankingResult
+    from app.models.ranking_run import RankingRun
+    from app.models.score_snapshot import ScoreSnapshot
+    from app.services.fetch_queue import consume, enqueue_run
+
+    engine = scratch_engine
+    groups = {f"D{i}": [f"T{i}{j}" for j in range(3)] for i in range(3)}
+
+    def run_once() -> FetchRun:
+        with Session(engine) as session:
+            run_id = enqueue_run(session, groups, shard_size=3).id
+        consume(engine, "w0", compute=_fake_compute, poll_seconds=0.01, exit_when_idle=True)
+        with Session(engine) as session:
+            return session.get(FetchRun, run_id)
+
+    def count(model) -> int:
+        with Session(engine) as session:
+            return session.execute(select(func.count()).select_from(model)).scalar_one()
+
+    assert run_once().status == "done"
+    assert (count(ScoreSnapshot), count(RankingResult), count(RankingRun)) == (9, 9, 1)
+    # Same inputs: no snapshots, rankings or run, only last_verified_at moves
+    assert run_once().status == "skipped"
+    assert (count(ScoreSnapshot), count(RankingResult), count(RankingRun)) == (9, 9, 1)
+
+
+def test_abandoned_shard_is_given_up_after_max_attempts(scratch_engine):
+    from app.config import settings
+    from app.models.fetch_queue import FetchRun, FetchShard
+    from app.models.ranking_result import RankingResult
+    from app.services.fetch_queue import consume, enqueue_run
+
+    engine = scratch_engine
+    with Session(engine) as session:
+        run_id = enqueue_run(session, {"D0": ["A", "B"], "D1": ["C", "D"]}, shard_size=2).id
+        crashing, healthy = session.execute(select(FetchShard).order_by(FetchShard.id)).scalars()
+        # Its last worker died mid-shard, and it has no attempts left
+        crashing.status, crashing.claimed_by = "claimed", "dead-worker"
+        crashing.claimed_at = datetime.now(timezone.utc) - timedelta(hours=1)
+        crashing.attempts = settings.queue_max_attempts
+        session.commit()
+        crashing_id = crashing.id
+
+    done = consume(engine, "w0", compute=_fake_compute, poll_seconds=0.01, exit_when_idle=True)
+    assert done == 1
+    with Session(engine) as session:
+        shard = session.get(FetchShard, crashing_id)
+        assert (shard.status, shard.claimed_by) == ("failed", None)
+        assert shard.attempts == settings.queue_max_attempts
+        assert session.get(FetchRun, run_id).status == "done"
+        tickers = session.execute(select(RankingResult.ticker)).scalars().all()
+        assert sorted(tickers) == ["C", "D"]
+
+
+@pytest.mark.parametrize("scratch_engine", [{"scheduler": True}], indirect=True)
+def test_queue_run_matches_the_local_cycle(scratch_engine, monkeypatch):
+    from app import scheduler
+    from app.models.pipeline_run import PipelineRun
+    from app.models.ranking_run import RankingRun
+    from app.replay import load_universe
+    from app.services import market_data
+    from app.services.fetch_queue import consume, enqueue_run
+    from app.services.market_data import ReplayProvider, synthetic_market
+    from app.services.retry_queue import RetryQueue
+
+    engine = scratch_engine
+    panel, fundamentals, universe = synthetic_market(tickers=10, days=300, domain_size=5)
+    monkeypatch.setattr(market_data, "_provider", ReplayProvider(panel, fundamentals))
+    monkeypatch.setattr(scheduler, "_retry_queue", RetryQueue(base_seconds=0.0))
+    with Session(engine) as session:
+        load_universe(session, universe.to_dict("records"))
+        enqueue_run(session, scheduler._load_domain_groups(session), shard_size=5)
+    assert consume(engine, "w0", poll_seconds=0.01, exit_when_idle=True) == 2
+
+    with Session(engine) as session:
+        run = session.execute(select(RankingRun)).scalar_one()
+        assert set(run.domain_fingerprints) == {"Synthetic 000", "Synthetic 001"}
+        jobs = session.execute(select(PipelineRun.job, PipelineRun.status)).all()
+        assert sorted(jobs) == [("fetch_cycle", "ok"), ("fetch_shard", "ok"), ("fetch_shard", "ok")]
+        verified = run.last_verified_at
+
+    # A local cycle over the same inputs finds every domain unchanged
+    scheduler._run_local_cycle()
+    with Session(engine) as session:
+        run = session.execute(select(RankingRun)).scalar_one()
+        assert run.last_verified_at > verified
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from app.config import settings
+from app.routers import health
+from app.services.health import HealthState
+from app.services.pipeline import StageTiming
+
+
+def _get_all(*paths: str) -> list[httpx.Response]:
+    from app.main import app
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get(path) for path in paths]
+
+    return asyncio.run(run())
+
+
+def test_health_is_served_from_memory_with_a_cached_db_fallback(monkeypatch):
+    state = HealthState()
+    monkeypatch.setattr(health, "health_state", state)
+    monkeypatch.setattr(health, "_probe", health._Probe())
+    fetched = datetime(2026, 1, 5, 14, 30, tzinfo=timezone.utc)
+    probes = []
+
+    async def read_freshness():
+        probes.append(1)
+        return fetched, fetched + timedelta(minutes=5)
+
+    monkeypatch.setattr(health, "_read_freshness", read_freshness)
+
+    # No cycle has run in this process: the DB probe answers, once per cache period
+    first, second, live = _get_all("/api/health", "/api/health", "/api/health/live")
+    assert len(probes) == 1
+    assert first.json()["source"] == "database" and second.json() == {
+        **first.json(),
+        "timestamp": second.json()["timestamp"],
+    }
+    assert first.json()["last_fetched"] == fetched.isoformat()
+    assert first.json()["last_verified"] == (fetched + timedelta(minutes=5)).isoformat()
+    assert first.json()["data_available"] is True
+    assert first.json()["status"] == "ok"
+    assert live.json()["pipeline"]["last_run_id"] is None
+    assert live.json()["provider"]["breaker"] == "closed"
+
+    now = datetime.now(timezone.utc)
+    state.record_run("fetch_cycle", "ok", now, 12.5)
+    timing = StageTiming("download", workers=2, items_in=3, items_out=2, errors=1)
+    state.record_stages([timing])
+    state.record_cycle(41, fetched, now)
+    state.set_stale(["TSLA", "AAPL"])
+    monkeypatch.setattr(settings, "health_cache_seconds", 0.0)
+
+    (body,) = [r.json() for r in _get_all("/api/health")]
+    assert len(probes) == 1  # the scheduler's own state needs no query
+    assert body["source"] == "scheduler"
+    assert body["last_verified"] == now.isoformat()
+    pipeline = body["pipeline"]
+    assert pipeline["last_run_id"] == 41 and pipeline["lag_seconds"] < 60
+    assert pipeline["jobs"]["fetch_cycle"]["last_ok_at"] == now.isoformat()
+    assert pipeline["stages"]["download"] == {
+        "status": "errors",
+        "items": 2,
+        "errors": 1,
+        "seconds": 0.0,
+    }
+    assert (pipeline["stale_tickers"], pipeline["stale_sample"]) == (2, ["AAPL", "TSLA"])
+
+
+def test_readiness_fails_on_a_slow_database(monkeypatch):
+    monkeypatch.setattr(health, "health_state", HealthState())
+    monkeypatch.setattr(health, "_probe", health._Probe())
+    monkeypatch.setattr(settings, "health_probe_timeout_seconds", 0.05)
+
+    async def hang():
+        await asyncio.sleep(1)
+
+    monkeypatch.setattr(health, "_read_freshness", hang)
+    ready, overall = _get_all("/api/health/ready", "/api/health")
+    assert ready.status_code == 503
+    # No cycle in this process and no database: health cannot vouch for the data
+    assert (overall.json()["status"], overall.json()["source"]) == ("degraded", "unavailable")
+    assert ready.json()["database"] == {
+        "ok": False,
+        "error": "timeout",
+        "last_fetched": None,
+        "last_verified": None,
+    }
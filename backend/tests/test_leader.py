@@ -0,0 +1,77 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+import psycopg2
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from app.leader import LeaderElector, _dsn
+from app.services.health import health_state
+
+
+def _wait_for(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_single_leader_and_failover(pg_url):
+    key = 0x7E57
+    first = LeaderElector(BackgroundScheduler, lock_key=key, poll_seconds=0.2)
+    second = LeaderElector(BackgroundScheduler, lock_key=key, poll_seconds=0.2)
+    first.start()
+    try:
+        assert _wait_for(lambda: first.is_leader)
+        second.start()
+        time.sleep(1.0)
+        assert not second.is_leader
+        now = datetime.now(timezone.utc)
+        health_state.record_cycle(7, now, now)
+
+        # Kill the leader's session: Postgres drops the lock and the follower takes over
+        with psycopg2.connect(_dsn()) as admin:
+            admin.autocommit = True
+            with admin.cursor() as cur:
+                cur.execute("SELECT pg_terminate_backend(%s)", (first._conn.get_backend_pid(),))
+        assert _wait_for(lambda: second.is_leader)
+        assert not first.is_leader
+        # The old leader no longer vouches for freshness it stopped maintaining
+        assert health_state.freshness() == (None, None)
+    finally:
+        second.stop()
+        first.stop()
+
+
+def test_stepping_down_waits_for_running_jobs(pg_url):
+    key = 0x7E58
+    started, finished = threading.Event(), threading.Event()
+
+    def slow_job():
+        started.set()
+        time.sleep(1.0)
+        finished.set()
+
+    def factory():
+        scheduler = BackgroundScheduler()
+        scheduler.add_job(slow_job, next_run_time=datetime.now(timezone.utc))
+        return scheduler
+
+    leader = LeaderElector(factory, lock_key=key, poll_seconds=0.2)
+    leader.start()
+    assert started.wait(10)
+    stopping = threading.Thread(target=leader.stop)
+    stopping.start()
+    with psycopg2.connect(_dsn()) as admin:
+        admin.autocommit = True
+        with admin.cursor() as cur:
+            # The lock stays held until the job is done
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (key,))
+            assert cur.fetchone()[0] is False
+            stopping.join(10)
+            assert finished.is_set()
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (key,))
+            assert cur.fetchone()[0] is True
+            cur.execute("SELECT pg_advisory_unlock(%s)", (key,))
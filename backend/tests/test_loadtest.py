@@ -0,0 +1,74 @@
+import asyncio
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from app.loadtest import (
+    RouteStats,
+    make_token,
+    percentile,
+    run_load,
+    seed_database,
+    summarize,
+    user_id,
+)
+
+
+def test_tokens_pass_auth_and_report_percentiles():
+    from app.config import settings
+    from app.routers.auth import get_current_user
+
+    token = make_token(user_id(7), settings.supabase_jwt_secret)
+    assert get_current_user(f"Bearer {token}") == str(user_id(7))
+
+    values = [i / 1000 for i in range(1, 101)]  # 1..100 ms
+    assert percentile(values, 50) == 0.05
+    assert percentile(values, 99) == 0.099
+    report = summarize({"GET /x": RouteStats(values, errors=2)}, elapsed=2.0)
+    assert report["GET /x"] == report["total"]
+    assert report["total"]["count"] == 102
+    assert report["total"]["rps"] == 51.0
+    assert report["total"]["p95_ms"] == 95.0
+
+
+def test_seeded_database_serves_the_mix(pg_url, scratch_schema, scratch_engine):
+    from app.database import get_db
+    from app.main import app
+    from app.replay import load_universe
+
+    async_engine = create_async_engine(
+        pg_url, connect_args={"server_settings": {"search_path": scratch_schema}}
+    )
+    sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def scratch_db():
+        async with sessions() as session:
+            yield session
+
+    try:
+        with Session(scratch_engine) as session:
+            universe = [
+                {"ticker": f"T{i:02d}", "name": f"T{i}", "domain": f"D{i % 3}"} for i in range(12)
+            ]
+            load_universe(session, universe)
+        counts = seed_database(scratch_engine, days=10, users=5, runs_per_day=2)
+        assert counts["user_preferences"] == 5
+        assert counts["ranking_results"] == 12 * counts["ranking_runs"]
+        assert counts["daily_snapshots"] == 12 * counts["ranking_runs"] // 2
+
+        app.dependency_overrides[get_db] = scratch_db
+        report = asyncio.run(
+            run_load(
+                "http://test",
+                users=5,
+                concurrency=4,
+                duration=1.0,
+                transport=httpx.ASGITransport(app=app),
+            )
+        )
+        assert report["total"]["errors"] == 0
+        assert all(r["count"] > 0 for r in report.values())
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        asyncio.run(async_engine.dispose())
@@ -0,0 +1,69 @@
+from datetime import date, datetime, timedelta, timezone
+
+from app.services.market_calendar import (
+    NY,
+    MarketCalendarTrigger,
+    completed_session,
+    early_closes,
+    next_fetch_time,
+    nyse_holidays,
+    trading_session,
+)
+
+DENSE = timedelta(minutes=5)
+SPARSE = timedelta(minutes=30)
+
+
+def test_holidays_match_published_nyse_calendar():
+    assert set(nyse_holidays(2024)) == {
+        date(2024, 1, 1),
+        date(2024, 1, 15),
+        date(2024, 2, 19),
+        date(2024, 3, 29),  # Good Friday
+        date(2024, 5, 27),
+        date(2024, 6, 19),
+        date(2024, 7, 4),
+        date(2024, 9, 2),
+        date(2024, 11, 28),
+        date(2024, 12, 25),
+    }
+    # 2022: Jan 1 was a Saturday (not observed), Christmas on Sunday -> Monday
+    assert date(2021, 12, 31) not in nyse_holidays(2021)
+    assert date(2022, 12, 26) in nyse_holidays(2022)
+    assert date(2025, 1, 9) in nyse_holidays(2025)
+    assert early_closes(2024) == {date(2024, 7, 3), date(2024, 11, 29), date(2024, 12, 24)}
+
+
+def test_session_times_follow_dst_and_early_closes():
+    winter = trading_session(date(2024, 1, 16))
+    summer = trading_session(date(2024, 7, 16))
+    assert winter.open.astimezone(timezone.utc).hour == 14
+    assert summer.open.astimezone(timezone.utc).hour == 13
+    assert trading_session(date(2024, 11, 29)).close == datetime(2024, 11, 29, 13, 0, tzinfo=NY)
+    assert trading_session(date(2024, 7, 4)) is None
+    assert trading_session(date(2024, 7, 6)) is None  # Saturday
+
+
+def test_next_fetch_time_uses_dense_and_sparse_windows():
+    def nxt(*args):
+        return next_fetch_time(datetime(*args, tzinfo=NY), DENSE, SPARSE)
+
+    assert nxt(2024, 7, 16, 5, 10) == datetime(2024, 7, 16, 5, 30, tzinfo=NY)
+    assert nxt(2024, 7, 16, 9, 15) == datetime(2024, 7, 16, 9, 30, tzinfo=NY)
+    assert nxt(2024, 7, 16, 11, 2) == datetime(2024, 7, 16, 11, 5, tzinfo=NY)
+    assert nxt(2024, 7, 16, 16, 0) == datetime(2024, 7, 16, 16, 30, tzinfo=NY)
+    assert nxt(2024, 7, 16, 19, 45) == datetime(2024, 7, 16, 20, 0, tzinfo=NY)
+    # Friday night before a holiday weekend skips to Tuesday pre-market
+    assert nxt(2024, 8, 30, 20, 0) == datetime(2024, 9, 3, 4, 0, tzinfo=NY)
+
+
+def test_trigger_final_cycle_marks_completed_session():
+    trigger = MarketCalendarTrigger(dense_minutes=5, sparse_minutes=30)
+    start = datetime(2024, 12, 24, 16, 45, tzinfo=NY)  # early close day: post-market ends 17:00
+    fire = trigger.get_next_fire_time(None, start)
+    assert fire == datetime(2024, 12, 24, 17, 0, tzinfo=NY)
+    assert completed_session(fire) == date(2024, 12, 24)
+    assert completed_session(fire - timedelta(minutes=1)) is None
+
+    following = trigger.get_next_fire_time(fire, fire)
+    assert following == datetime(2024, 12, 26, 4, 0, tzinfo=NY)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from app.services import market_data
+from app.services.data_fetcher import (
+    compute_long_term_score,
+    fetch_all_stocks,
+    fetch_financial_ratio,
+)
+from app.services.market_data import ReplayProvider, write_synthetic
+
+
+@pytest.fixture(scope="module")
+def replay_dir(tmp_path_factory):
+    return write_synthetic(tmp_path_factory.mktemp("replay"), tickers=40, days=300, seed=3)
+
+
+def test_replay_serves_periods_and_advances_with_speed(replay_dir):
+    frozen = ReplayProvider.from_path(replay_dir)
+    month = frozen.history(["SYN00001", "NOPE"], "30d")
+    assert list(month.columns.get_level_values(0).unique()) == ["Close", "Volume"]
+    assert 19 <= len(month) <= 23  # trading days in 30 calendar days
+    assert month["Close"]["NOPE"].isna().all()
+    assert len(frozen.history(["SYN00001"], "1y")) > 240
+    assert frozen.lookup("SYN00001") == "Synthetic 00001"
+    assert frozen.lookup("NOPE") is None
+
+    now = [0.0]
+    moving = ReplayProvider.from_path(replay_dir, speed=2.0, clock=lambda: now[0])
+    first = moving.history(["SYN00001"], "30d").index[-1]
+    now[0] = 5.0
+    later = moving.history(["SYN00001"], "30d").index[-1]
+    assert np.busday_count(first.date(), later.date()) == 10
+    assert later < month.index[-1]
+
+
+def test_data_fetcher_runs_offline_on_replay(replay_dir, monkeypatch):
+    provider = ReplayProvider.from_path(replay_dir)
+    monkeypatch.setattr(market_data, "_provider", provider)
+    tickers = [f"SYN{i:05d}" for i in range(40)]
+
+    latest = fetch_all_stocks(tickers, chunk_size=15)
+    assert set(latest) == set(tickers)
+    assert latest == provider.latest(tickers)
+    assert 0 <= compute_long_term_score("SYN00002") <= 100
+    pe = provider.fundamentals("SYN00002")["trailing_pe"]
+    assert fetch_financial_ratio("SYN00002") == (None if pe is None else -pe)
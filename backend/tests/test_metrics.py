@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import httpx
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, insert, update
+
+from app.services.metrics import Counter, Histogram, instrument_engine, render
+
+
+def test_thread_cells_sum_and_render():
+    hits = Counter("test_hits", "Hits.", ("cache",))
+    latency = Histogram("test_latency_seconds", "Latency.", buckets=(0.1, 1.0))
+
+    def work():
+        for _ in range(1000):
+            hits.inc("a")
+        latency.observe(0.05)
+        latency.observe(0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    hits.inc("b", amount=3)  # a live cell alongside the retired ones
+    for t in threads:
+        t.join()
+
+    assert hits.collect() == {("a",): 8000, ("b",): 3}
+    assert hits.collect() == {("a",): 8000, ("b",): 3}  # retiring dead cells is idempotent
+    text = render()
+    assert 'test_hits_total{cache="a"} 8000' in text
+    assert 'test_latency_seconds_bucket{le="0.1"} 8' in text
+    assert 'test_latency_seconds_bucket{le="1.0"} 16' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 16' in text
+    assert "test_latency_seconds_count 16" in text
+
+
+def test_requests_rows_and_checkouts_are_recorded(pg_url):
+    from app.main import app
+    from app.services.metrics import POOL_CHECKOUT_SECONDS, ROWS_WRITTEN
+
+    engine = create_engine(pg_url.replace("postgresql+asyncpg", "postgresql+psycopg2"))
+    instrument_engine(engine, "test")
+    table = Table("metrics_rows", MetaData(), Column("id", Integer), prefixes=["TEMPORARY"])
+    with engine.begin() as conn:
+        table.create(conn)
+        conn.execute(insert(table), [{"id": i} for i in range(5)])
+        conn.execute(update(table).where(table.c.id < 2).values(id=table.c.id + 10))
+    engine.dispose()
+    with engine.connect():  # dispose() replaced the pool; checkouts are still timed
+        pass
+    engine.dispose()
+
+    rows = ROWS_WRITTEN.collect()
+    assert rows[("metrics_rows", "insert")] == 5
+    assert rows[("metrics_rows", "update")] == 2
+    assert POOL_CHECKOUT_SECONDS.collect()[("test",)][-1] == 2
+
+    async def scrape():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await client.get("/")
+            await client.get("/no-such-route")
+            return await client.get("/metrics")
+
+    text = asyncio.run(scrape()).text
+    assert 'http_request_duration_seconds_count{route="/",method="GET",status="200"}' in text
+    assert 'route="unmatched",method="GET",status="404"' in text
@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+
+def _result(domain: str, at: datetime):
+    from app.models.ranking_result import RankingResult
+
+    return RankingResult(ticker="AAPL", domain=domain, composite_score=1.0, rank=1, computed_at=at)
+
+
+def test_partitions_are_created_pruned_and_retired(scratch_engine, monkeypatch):
+    from app.models.ranking_result import RankingResult
+    from app.models.score_snapshot import ScoreSnapshot
+    from app.models.stock import Domain
+    from app.services.partitions import apply_retention, ensure_partitions, list_partitions
+
+    monkeypatch.setattr(settings, "partition_interval", "day")
+    monkeypatch.setattr(settings, "partition_premake", 2)
+    now = datetime(2026, 3, 10, 12, tzinfo=timezone.utc)
+    old, recent = now - timedelta(days=40), now - timedelta(hours=1)
+    with Session(scratch_engine) as session:
+        session.add_all([Domain(name="Tech"), Domain(name="Idle")])
+        # Idle's inputs never changed, so its only (and latest) rankings are 40 days old
+        session.add_all([_result("Tech", old), _result("Tech", recent), _result("Idle", old)])
+        session.add_all(
+            ScoreSnapshot(ticker="AAPL", close_price=1.0, volume=1.0, fetched_at=at)
+            for at in (old, recent)
+        )
+        session.commit()
+
+    with scratch_engine.begin() as conn:  # rows written before maintenance ran sit in the default
+        created = ensure_partitions(conn, now)
+        assert "ranking_results_p20260129" in created
+        assert conn.execute(text("SELECT count(*) FROM ranking_results_default")).scalar() == 0
+        days = [p.name for p in list_partitions(conn, "score_snapshots")]
+        assert days[0] == "score_snapshots_p20260129" and days[-1] == "score_snapshots_p20260312"
+        assert ensure_partitions(conn, now) == []
+
+        plan = "\n".join(
+            conn.execute(
+                text("EXPLAIN SELECT * FROM ranking_results WHERE computed_at >= :since"),
+                {"since": now - timedelta(days=1)},
+            ).scalars()
+        )
+        assert "ranking_results_p20260310" in plan and "ranking_results_p20260129" not in plan
+
+    monkeypatch.setattr(settings, "ranking_retention_days", 30)
+    monkeypatch.setattr(settings, "snapshot_retention_days", 30)
+    with scratch_engine.begin() as conn:
+        # Every ranking partition from 40 days ago on still holds Idle's latest rankings
+        retired = apply_retention(conn, now)
+        assert retired == [f"score_snapshots_p202601{d}" for d in (29, 30, 31)] + [
+            f"score_snapshots_p2026020{d}" for d in range(1, 8)
+        ]
+        assert conn.execute(text("SELECT count(*) FROM score_snapshots_p20260129")).scalar() == 1
+    with Session(scratch_engine) as session:
+        assert session.execute(select(ScoreSnapshot.fetched_at)).scalars().all() == [recent]
+        session.execute(RankingResult.__table__.delete().where(RankingResult.domain == "Idle"))
+        session.commit()
+
+    monkeypatch.setattr(settings, "partition_retention_mode", "drop")
+    with scratch_engine.begin() as conn:
+        assert apply_retention(conn, now) == [
+            r.replace("score_snapshots", "ranking_results") for r in retired
+        ]
+        assert (
+            conn.execute(text("SELECT to_regclass('ranking_results_p20260129')")).scalar() is None
+        )
+
+
+def _migration():
+    import importlib.util
+    from pathlib import Path
+
+    path = (
+        Path(__file__).parent.parent
+        / "alembic/versions/f3b7c2d9a1e4_partition_rankings_and_snapshots.py"
+    )
+    spec = importlib.util.spec_from_file_location("partition_migration", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_partition_migration_round_trips_through_asyncpg(pg_url, scratch_schema):
+    import asyncio
+
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.database import Base
+    from app.models import ranking_result, score_snapshot  # noqa: F401
+
+    migration = _migration()
+
+    def kinds(conn) -> list[str]:
+        return [
+            conn.execute(
+                text("SELECT relkind::text FROM pg_class WHERE oid = to_regclass(:t)"), {"t": t}
+            ).scalar()
+            for t in ("ranking_results", "score_snapshots")
+        ]
+
+    def round_trip(conn) -> list[list[str]]:
+        conn.execute(
+            text(
+                "INSERT INTO ranking_results (ticker, domain, composite_score, rank, computed_at)"
+                " VALUES ('AAPL', 'Tech', 1, 1, now())"
+            )
+        )
+        seen = [kinds(conn)]
+        with Operations.context(MigrationContext.configure(conn)):
+            for step in (migration.downgrade, migration.upgrade) * 2:
+                step()
+                seen.append(kinds(conn))
+        assert conn.execute(text("SELECT count(*) FROM ranking_results")).scalar() == 1
+        return seen
+
+    async def run():
+        # create_all builds the partitioned tables, as main.lifespan does before alembic runs
+        engine = create_async_engine(
+            pg_url, connect_args={"server_settings": {"search_path": scratch_schema}}
+        )
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                return await conn.run_sync(round_trip)
+        finally:
+            await engine.dispose()
+
+    assert asyncio.run(run()) == [["p", "p"], ["r", "r"], ["p", "p"], ["r", "r"], ["p", "p"]]
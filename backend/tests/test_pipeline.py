@@ -0,0 +1,48 @@
+import threading
+import time
+
+from app.services.pipeline import Stage, run_pipeline
+
+
+def test_pipeline_runs_every_item_through_every_stage():
+    def split(n):
+        return [n, n + 100]
+
+    def fail_on_seven(n):
+        if n == 7:
+            raise ValueError("boom")
+        return [n * 2]
+
+    report = run_pipeline(
+        range(10), [Stage("split", split, 2), Stage("double", fail_on_seven, 3)], queue_size=2
+    )
+    expected = sorted(2 * n for i in range(10) for n in (i, i + 100) if n != 7)
+    assert sorted(report.results) == expected
+    split_t, double_t = report.stages
+    assert (split_t.items_in, split_t.items_out) == (10, 20)
+    assert (double_t.items_in, double_t.items_out, double_t.errors) == (20, 19, 1)
+
+
+def test_stages_overlap_and_respect_worker_counts():
+    active = {"slow": 0}
+    peak = {"slow": 0}
+    lock = threading.Lock()
+
+    def slow(n):
+        with lock:
+            active["slow"] += 1
+            peak["slow"] = max(peak["slow"], active["slow"])
+        time.sleep(0.05)
+        with lock:
+            active["slow"] -= 1
+        return [n]
+
+    def also_slow(n):
+        time.sleep(0.05)
+        return [n]
+
+    report = run_pipeline(range(8), [Stage("a", slow, 2), Stage("b", also_slow, 2)])
+    assert peak["slow"] == 2
+    # Serial would be 8 * 2 * 0.05 = 0.8s; two overlapped 2-worker stages take ~0.25s
+    assert report.wall_seconds < 0.6
+    assert "a " in report.format() and "busy=" in report.format()
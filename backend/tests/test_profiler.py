@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from app.config import settings
+from app.services import profiler
+
+
+@pytest.fixture(autouse=True)
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "profile_interval_ms", 1.0)
+    return tmp_path
+
+
+def _busy_worker(seconds: float) -> list[bytes]:
+    deadline = time.monotonic() + seconds
+    blocks = []
+    while time.monotonic() < deadline:
+        blocks.append(bytes(10_000))
+        time.sleep(0.0005)
+    return blocks
+
+
+def test_armed_job_run_is_profiled_once(profile_dir):
+    with profiler.profiled("fetch_cycle"):
+        pass  # not armed: nothing written
+    assert list(profile_dir.iterdir()) == []
+
+    meta = profiler.arm_job("fetch_cycle")
+    with profiler.profiled("fetch_cycle"):
+        worker = threading.Thread(target=_busy_worker, args=(0.1,), name="stage-worker")
+        worker.start()
+        worker.join()
+    with profiler.profiled("fetch_cycle"):
+        pass  # the arming was used up
+
+    done = profiler.read_meta(meta["id"])
+    assert done["status"] == "done" and done["samples"] > 0
+    stacks = profiler.artifact_path(meta["id"], "stacks.collapsed").read_text()
+    assert any(
+        line.startswith("stage-worker;") and "_busy_worker" in line for line in stacks.splitlines()
+    )
+    allocations = profiler.artifact_path(meta["id"], "allocations.txt").read_text()
+    assert allocations.startswith("traced memory:")
+    with pytest.raises(profiler.ProfileError):
+        profiler.artifact_path(meta["id"], "../meta.json")
+
+
+def test_route_profile_covers_the_next_requests():
+    from app.main import app
+    from app.routers.auth import require_admin
+
+    app.dependency_overrides[require_admin] = lambda: "admin"
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            armed = await client.post(
+                "/api/admin/profiles", json={"target": "route", "route": "/", "requests": 2}
+            )
+            conflict = await client.post(
+                "/api/admin/profiles", json={"target": "route", "route": "/"}
+            )
+            missing = await client.post(
+                "/api/admin/profiles", json={"target": "route", "route": "/nope"}
+            )
+            handle = armed.json()["id"]
+            pending = await client.get(f"/api/admin/profiles/{handle}")
+            for _ in range(2):
+                await client.get("/")
+            await client.get("/")  # past N: not profiled
+            done = await client.get(f"/api/admin/profiles/{handle}")
+            stacks = await client.get(f"/api/admin/profiles/{handle}/stacks.collapsed")
+            return armed, conflict, missing, pending, done, stacks
+
+    try:
+        armed, conflict, missing, pending, done, stacks = asyncio.run(scenario())
+    finally:
+        app.dependency_overrides.pop(require_admin, None)
+
+    assert armed.status_code == 202 and armed.json()["status"] == "armed"
+    assert conflict.status_code == 409 and missing.status_code == 404
+    assert pending.json()["artifacts"] == []
+    assert done.json()["status"] == "done"
+    assert done.json()["artifacts"] == ["stacks.collapsed", "allocations.txt"]
+    assert stacks.status_code == 200
+    assert profiler._routes == {}
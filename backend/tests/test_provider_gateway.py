@@ -0,0 +1,107 @@
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+
+import pytest
+
+from app.services.provider_gateway import ProviderGateway, ProviderUnavailable
+
+
+class _FakeProvider(ThreadingHTTPServer):
+    """Local upstream: answers 429 while `throttle` is set, sleeps `latency` otherwise."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.throttle = False
+        self.latency = 0.0
+        self.hits = 0
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/quote"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.hits += 1
+        if self.server.throttle:
+            self.send_response(429, "Too Many Requests")
+            self.end_headers()
+            return
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def provider():
+    server = _FakeProvider()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _gateway(**overrides):
+    options = dict(
+        rate_per_second=1000.0,
+        burst=1000.0,
+        max_concurrency=8,
+        latency_tolerance=2.0,
+        breaker_threshold=3,
+        breaker_reset_seconds=0.3,
+    )
+    return ProviderGateway(**{**options, **overrides})
+
+
+def _get(url):
+    return urllib.request.urlopen(url, timeout=5).read()
+
+
+def test_breaker_fails_fast_on_429s_and_recovers(provider):
+    gateway = _gateway()
+    provider.throttle = True
+    for _ in range(3):
+        with pytest.raises(HTTPError):
+            gateway.call("quote", lambda: _get(provider.url))
+    assert gateway.breaker.state == "open"
+    assert gateway.bucket.rate < 1000.0  # throttling slowed the shared budget
+
+    # Open circuit: rejected without touching the provider
+    with pytest.raises(ProviderUnavailable):
+        gateway.call("quote", lambda: _get(provider.url))
+    assert provider.hits == 3
+
+    provider.throttle = False
+    time.sleep(0.35)
+    assert gateway.call("quote", lambda: _get(provider.url)) == b"{}"  # half-open probe
+    m = gateway.metrics()
+    assert m["breaker"] == "closed"
+    assert (m["throttled"], m["rejected"], m["ok"]) == (3, 1, 1)
+
+
+def test_latency_shrinks_concurrency_and_bucket_paces_calls(provider):
+    gateway = _gateway()
+    for _ in range(40):
+        gateway.call("quote", lambda: _get(provider.url))
+    assert gateway.limiter.limit == 8  # fast responses grew it to the ceiling
+
+    provider.latency = 0.2
+    for _ in range(4):
+        gateway.call("quote", lambda: _get(provider.url))
+    assert gateway.limiter.limit < 4
+    assert gateway.breaker.state == "closed"  # slow is not down
+
+    paced = _gateway(rate_per_second=20.0, burst=1.0)
+    provider.latency = 0.0
+    start = time.monotonic()
+    for _ in range(6):
+        paced.call("quote", lambda: _get(provider.url))
+    assert time.monotonic() - start >= 5 / 20
@@ -10,16 +10,22 @@ All 6 required test cases covering:
   6. Score breakdown structure (FactorScore fields)
 """
 
+import numpy as np
+import pytest
+
 from app.services.ranking_engine import (
+    FACTOR_NAMES,
     WEIGHT_FINANCIAL_RATIO,
     WEIGHT_MOMENTUM,
     WEIGHT_RELATIVE_STRENGTH,
     WEIGHT_VOLATILITY,
     WEIGHT_VOLUME_CHANGE,
     FactorScore,
+    IncrementalRanker,
     StockScore,
     normalize_factor,
     rank_domain,
+    rank_domain_batch,
 )
 
 # ---------------------------------------------------------------------------
@@ -245,3 +251,125 @@ def test_weight_constants_sum_to_1():
         + WEIGHT_FINANCIAL_RATIO
     )
     assert abs(total - 1.0) < 1e-9, f"Weights must sum to 1.0, got {total}"
+
+
+# ---------------------------------------------------------------------------
+# rank_domain_batch matches rank_domain row by row
+# ---------------------------------------------------------------------------
+
+
+def test_rank_domain_batch_matches_rank_domain():
+    """Vectorized ranking over (time x ticker x factor) must equal a loop of rank_domain."""
+    rng = np.random.default_rng(7)
+    n_times, tickers = 40, ["A", "B", "C", "D", "E"]
+    raw = rng.normal(size=(n_times, len(tickers), len(FACTOR_NAMES)))
+    raw[rng.random(raw.shape) < 0.15] = np.nan  # sprinkle missing factors
+    raw[3, :, 0] = 0.05  # std == 0 guard on one factor
+    present = rng.random((n_times, len(tickers))) < 0.85
+    present[5] = [True, False, False, False, False]  # single-stock timestamp
+    present[6] = False  # empty timestamp
+
+    scores, ranks = rank_domain_batch(raw, present)
+
+    for t in range(n_times):
+        stocks_data = {
+            ticker: {
+                name: (None if np.isnan(raw[t, i, k]) else float(raw[t, i, k]))
+                for k, name in enumerate(FACTOR_NAMES)
+            }
+            for i, ticker in enumerate(tickers)
+            if present[t, i]
+        }
+        expected = rank_domain(stocks_data)
+        for i, ticker in enumerate(tickers):
+            if ticker in expected:
+                assert scores[t, i] == pytest.approx(expected[ticker].composite_score, abs=1e-9)
+                assert ranks[t, i] == expected[ticker].rank
+            else:
+                assert np.isnan(scores[t, i])
+                assert ranks[t, i] == 0
+
+
+# ---------------------------------------------------------------------------
+# IncrementalRanker: running statistics match a full recompute
+# ---------------------------------------------------------------------------
+
+
+def _random_domain(rng, tickers):
+    return {
+        t: {
+            name: (None if rng.random() < 0.1 else float(rng.normal(scale=10)))
+            for name in FACTOR_NAMES
+        }
+        for t in tickers
+    }
+
+
+def test_incremental_ranker_matches_full_recompute_over_many_updates():
+    """verify=True raises on any divergence from rank_domain(); drive it through
+    changes, additions, removals and identical values."""
+    rng = np.random.default_rng(11)
+    ranker = IncrementalRanker(verify=True)
+    data = _random_domain(rng, [f"T{i}" for i in range(8)])
+    ranker.update("Tech", data)
+
+    for step in range(200):
+        data = {t: dict(f) for t, f in data.items()}
+        for ticker in rng.choice(list(data), size=2, replace=False):
+            data[ticker] = _random_domain(rng, [ticker])[ticker]
+        if step % 25 == 0:
+            data.pop(next(iter(data)))
+            data[f"N{step}"] = _random_domain(rng, ["x"])["x"]
+        if step % 40 == 0:
+            for f in data.values():
+                f["momentum"] = 0.05  # std == 0 guard
+        result = ranker.update("Tech", data)
+        expected = rank_domain(data)
+        assert {t: s.rank for t, s in result.items()} == {t: s.rank for t, s in expected.items()}
+
+
+def test_incremental_ranker_skips_unchanged_domain():
+    """An identical input returns the cached StockScore objects without re-scoring."""
+    ranker = IncrementalRanker()
+    data = {
+        "AAPL": {"momentum": 0.05, "volume_change": 0.1},
+        "MSFT": {"momentum": 0.03, "volume_change": 0.2},
+    }
+    first = ranker.update("Tech", data)
+    second = ranker.update("Tech", {t: dict(f) for t, f in data.items()})
+    assert all(second[t] is first[t] for t in data)
+
+
+def test_incremental_ranker_apply_changes_removes_ticker():
+    ranker = IncrementalRanker(verify=True)
+    ranker.update(
+        "EV",
+        {
+            "TSLA": {"momentum": 0.05},
+            "RIVN": {"momentum": 0.01},
+            "NIO": {"momentum": -0.02},
+        },
+    )
+    result = ranker.apply_changes("EV", {"NIO": None})
+    assert set(result) == {"TSLA", "RIVN"}
+    assert ranker.domains() == {"EV": ["TSLA", "RIVN"]}
+
+
+def test_incremental_ranker_survives_churn_away_from_the_shift_holder():
+    """Once the ticker whose value fixed a factor's shift has left, sums kept around
+    that shift lose precision; identical survivors (with some None factors) must still
+    hit the std == 0 guard exactly as rank_domain() does."""
+    rng = np.random.default_rng(5)
+    for step in range(20):
+        ranker = IncrementalRanker(verify=True)
+        tickers = [f"T{i}" for i in range(6)]
+        holder = {f: float(rng.normal(scale=1e4)) for f in FACTOR_NAMES}
+        ranker.update("Tech", {"HOLDER": holder, **_random_domain(rng, tickers)})
+        level = float(rng.normal(scale=10))
+        survivors = {t: {f: level for f in FACTOR_NAMES} for t in tickers}
+        for ticker in rng.choice(tickers, size=2, replace=False):
+            survivors[ticker][rng.choice(FACTOR_NAMES)] = None
+        survivors[tickers[0]]["momentum"] = level + 1.0
+        result = ranker.update("Tech", survivors)
+        expected = rank_domain(survivors)
+        assert {t: s.rank for t, s in result.items()} == {t: s.rank for t, s in expected.items()}
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+
+def _run(session: Session, at: datetime, scores: dict[str, float]) -> int:
+    from app.models.ranking_result import RankingResult
+    from app.services.ranking_store import rows_to_store
+
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    rows = [
+        RankingResult(
+            ticker=t,
+            domain="Tech",
+            composite_score=scores[t],
+            rank=ordered.index(t) + 1,
+            momentum=0.1,
+            computed_at=at,
+        )
+        for t in scores
+    ]
+    stored = rows_to_store(session, "Tech", rows)
+    session.add_all(stored)
+    session.commit()
+    return len(stored)
+
+
+def _state(session: Session, at: datetime | None = None) -> list[tuple]:
+    from app.services.ranking_store import run_bounds, state
+
+    bounds = session.execute(run_bounds(at=at, domain="Tech")).one()
+    return [
+        (r.ticker, r.rank, r.composite_score, r.computed_at)
+        for r in session.execute(state([tuple(bounds)])).scalars()
+    ]
+
+
+def test_delta_storage_writes_changes_and_rebuilds_full_runs(scratch_engine, monkeypatch):
+    from app.models.ranking_result import RankingResult
+    from app.models.stock import Domain
+
+    monkeypatch.setattr(settings, "ranking_storage", "delta")
+    monkeypatch.setattr(settings, "ranking_keyframe_every", 2)
+    t = [
+        datetime(2026, 3, 10, 14, tzinfo=timezone.utc) + timedelta(minutes=5 * i) for i in range(5)
+    ]
+    with Session(scratch_engine) as session:
+        session.add(Domain(name="Tech"))
+        assert _run(session, t[0], {"AAA": 50.0, "BBB": 40.0, "CCC": 30.0}) == 3  # first keyframe
+        # BBB overtook AAA; CCC moved under epsilon
+        assert _run(session, t[1], {"AAA": 50.0, "BBB": 55.0, "CCC": 30.01}) == 2
+        assert _run(session, t[2], {"AAA": 50.0, "BBB": 55.0, "CCC": 30.01}) == 0
+        assert _run(session, t[3], {"AAA": 50.0, "BBB": 55.0, "CCC": 31.0}) == 1
+        assert _run(session, t[4], {"AAA": 50.0, "BBB": 55.0, "CCC": 31.0}) == 3  # cadence
+
+        assert _state(session, at=t[2]) == [
+            ("BBB", 1, 55.0, t[1]),
+            ("AAA", 2, 50.0, t[1]),
+            ("CCC", 3, 30.0, t[1]),  # the stored value; 30.01 was within epsilon
+        ]
+        assert _state(session, at=t[3]) == [
+            ("BBB", 1, 55.0, t[3]),
+            ("AAA", 2, 50.0, t[3]),
+            ("CCC", 3, 31.0, t[3]),
+        ]
+        # A ticker leaving the domain forces a keyframe, so it drops out of the state
+        assert _run(session, t[4] + timedelta(minutes=5), {"AAA": 50.0, "BBB": 55.0}) == 2
+        assert [row[0] for row in _state(session)] == ["BBB", "AAA"]
+        assert session.execute(select(func.count()).select_from(RankingResult)).scalar() == 11
+
+    monkeypatch.setattr(settings, "ranking_storage", "full")
+    with Session(scratch_engine) as session:
+        later = t[4] + timedelta(minutes=10)
+        assert _run(session, later, {"AAA": 50.0, "BBB": 55.0}) == 2
+        assert [row[3] for row in _state(session)] == [later, later]
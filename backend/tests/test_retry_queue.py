@@ -0,0 +1,50 @@
+from app.services.retry_queue import RetryQueue
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_backoff_doubles_up_to_cap_then_parks():
+    clock = _Clock()
+    q = RetryQueue(base_seconds=10, max_seconds=35, max_attempts=4, clock=clock)
+    q.record("RIVN", "EV", {"financial_ratio"})
+    assert q.due() == []
+
+    waits = []
+    for _ in range(3):
+        entry = q.pending()[0]
+        waits.append(entry.next_at - clock.now)
+        clock.now = entry.next_at
+        assert [e.ticker for e in q.due()] == ["RIVN"]
+        assert q.failed("RIVN", {"financial_ratio"})
+    assert waits == [10, 20, 35]
+
+    clock.now = q.pending()[0].next_at
+    assert not q.failed("RIVN", {"financial_ratio"})  # 4th failure parks it
+    assert len(q) == 0
+    q.record("RIVN", "EV", {"financial_ratio"})  # full cycles no longer re-queue it
+    assert len(q) == 0
+
+    q.resolve("RIVN")  # until a cycle gets it right
+    q.record("RIVN", "EV", {"price"})
+    assert len(q) == 1
+
+
+def test_record_keeps_backoff_and_retain_drops_untracked():
+    clock = _Clock()
+    q = RetryQueue(base_seconds=10, max_seconds=100, max_attempts=5, clock=clock)
+    q.record("AAPL", "AI/Tech", {"price"})
+    clock.now = 10
+    q.failed("AAPL", {"price"})
+    q.record("AAPL", "AI/Tech", {"momentum"})  # the next full cycle fails it again
+    entry = q.pending()[0]
+    assert (entry.attempts, entry.next_at, entry.missing) == (1, 30, {"momentum"})
+
+    q.record("GS", "Finance", {"price"})
+    q.retain({"GS"})
+    assert [e.ticker for e in q.pending()] == ["GS"]
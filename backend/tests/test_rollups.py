@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+
+def _write(session: Session, at: datetime, score: float, rank: int) -> None:
+    from app.models.ranking_result import RankingResult
+    from app.services.rollups import mark_touched
+
+    session.add(
+        RankingResult(
+            ticker="AAPL", domain="Tech", composite_score=score, rank=rank, computed_at=at
+        )
+    )
+    mark_touched(session, at, "Tech")
+    session.commit()
+
+
+def test_rollups_track_only_touched_buckets_and_survive_rewrites(scratch_engine):
+    from app.models.ranking_result import RankingResult
+    from app.models.score_rollup import ScoreRollup
+    from app.services.rollups import backfill_rollups
+
+    day = datetime(2026, 3, 10, tzinfo=timezone.utc)
+    writes = [(day + timedelta(hours=14, minutes=m), s, r) for m, s, r in ((0, 50, 3), (20, 80, 1))]
+    writes += [(day + timedelta(hours=15, minutes=5), 60.0, 2)]
+    with Session(scratch_engine) as session:
+        for at, score, rank in writes:
+            _write(session, at, score, rank)
+        # A retry patch replaces the 15:05 row in place; the bucket is recomputed, not added to
+        session.execute(
+            RankingResult.__table__.delete().where(RankingResult.computed_at == writes[2][0])
+        )
+        _write(session, writes[2][0], 70.0, 2)
+
+        rows = {
+            (r.resolution, r.bucket.hour): r for r in session.execute(select(ScoreRollup)).scalars()
+        }
+        assert set(rows) == {("hour", 14), ("hour", 15), ("day", 0)}
+        h14 = rows["hour", 14]
+        assert (h14.samples, h14.score_open, h14.score_close, h14.score_mean) == (2, 50, 80, 65)
+        assert (h14.rank_open, h14.rank_high, h14.rank_low, h14.rank_close) == (3, 3, 1, 1)
+        d = rows["day", 0]
+        assert (d.samples, d.score_open, d.score_high, d.score_low, d.score_close) == (
+            3,
+            50,
+            80,
+            50,
+            70,
+        )
+        assert d.score_mean == pytest.approx(200 / 3)
+        assert d.first_at == writes[0][0] and d.last_at == writes[2][0]
+        incremental = [
+            tuple(getattr(r, c.name) for c in ScoreRollup.__table__.columns)
+            for r in sorted(rows.values(), key=lambda r: (r.resolution, r.bucket))
+        ]
+
+    with scratch_engine.begin() as conn:  # a full rebuild agrees with the incremental upkeep
+        conn.execute(text("DELETE FROM score_rollups"))
+        backfill_rollups(conn)
+        rebuilt = conn.execute(
+            text("SELECT * FROM score_rollups ORDER BY resolution, bucket")
+        ).all()
+    assert [tuple(r) for r in rebuilt] == incremental
+
+
+def test_delta_storage_carries_unchanged_tickers_into_their_buckets(scratch_engine, monkeypatch):
+    from app.config import settings
+    from app.models.ranking_result import RankingResult
+    from app.models.score_rollup import ScoreRollup
+    from app.services.ranking_store import rows_to_store
+    from app.services.rollups import backfill_rollups, mark_touched
+
+    monkeypatch.setattr(settings, "ranking_storage", "delta")
+    start = datetime(2026, 3, 10, 13, 50, tzinfo=timezone.utc)
+    # AAPL holds 90 throughout; only MSFT moves, so delta storage rewrites just MSFT
+    msft = (50.0, 60.0, 70.0)
+    with Session(scratch_engine) as session:
+        for i, score in enumerate(msft):
+            at = start + timedelta(minutes=20 * i)
+            rows = [
+                RankingResult(ticker=t, domain="Tech", composite_score=s, rank=r, computed_at=at)
+                for t, s, r in (("AAPL", 90.0, 1), ("MSFT", score, 2))
+            ]
+            stored = rows_to_store(session, "Tech", rows)
+            assert [r.ticker for r in stored] == (["AAPL", "MSFT"] if i == 0 else ["MSFT"])
+            session.add_all(stored)
+            mark_touched(session, at, "Tech")
+            session.commit()
+
+        rows = {
+            (r.ticker, r.resolution, r.bucket.hour): r
+            for r in session.execute(select(ScoreRollup)).scalars()
+        }
+        # The 13:50 keyframe is carried into hour 14 for both tickers
+        aapl, msft_14 = rows["AAPL", "hour", 14], rows["MSFT", "hour", 14]
+        assert (aapl.samples, aapl.score_open, aapl.score_close, aapl.score_mean) == (2, 90, 90, 90)
+        assert aapl.first_at == start + timedelta(minutes=20)
+        assert (msft_14.samples, msft_14.score_open, msft_14.score_close) == (2, 60, 70)
+        assert rows["AAPL", "hour", 13].samples == 1
+        assert rows["AAPL", "day", 0].samples == 3
+        incremental = sorted(
+            tuple(getattr(r, c.name) for c in ScoreRollup.__table__.columns) for r in rows.values()
+        )
+
+    with scratch_engine.begin() as conn:
+        conn.execute(text("DELETE FROM score_rollups"))
+        backfill_rollups(conn)
+        rebuilt = conn.execute(text("SELECT * FROM score_rollups")).all()
+    assert sorted(tuple(r) for r in rebuilt) == incremental
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+
+@pytest.mark.parametrize("scratch_engine", [{"scheduler": True}], indirect=True)
+def test_runs_are_recorded_and_regressions_flagged(scratch_engine):
+    from app.models.pipeline_run import PipelineRun
+    from app.services.run_ledger import check_regressions, recorded_run
+    from app.services.snapshot_service import snapshot_job
+
+    snapshot_job()  # no rankings yet
+    with pytest.raises(RuntimeError):
+        with recorded_run(scratch_engine, "fetch_cycle") as run:
+            run.add(tickers_attempted=10, tickers_succeeded=7, bytes_downloaded=1024)
+            with run.stage("download"):
+                raise RuntimeError("provider down")
+
+    with Session(scratch_engine) as session:
+        skipped, failed = session.execute(select(PipelineRun).order_by(PipelineRun.id)).scalars()
+        assert (skipped.job, skipped.status) == ("snapshot_job", "skipped")
+        assert set(skipped.stage_seconds) == {"read", "total"}
+        assert failed.status == "failed"
+        assert (failed.tickers_attempted, failed.tickers_failed) == (10, 3)
+        assert failed.bytes_downloaded == 1024
+        assert set(failed.stage_seconds) == {"download", "total"}
+        assert failed.peak_rss_bytes > 0
+
+        now = datetime.now(timezone.utc)
+        for days_ago in (1, 2, 3, 30):  # the 30-day-old run is outside the baseline
+            stages = {"factors": 1.0 if days_ago < 30 else 9.0, "rank": 0.05}
+            session.add(_run(now - timedelta(days=days_ago), stages))
+        current = _run(now, {"factors": 2.0, "rank": 0.2})
+        session.add(current)
+        session.commit()
+
+        regressions = check_regressions(session, current, threshold=0.5, days=7)
+        # rank quadrupled but stays under the noise floor
+        assert len(regressions) == 1
+        assert "fetch_cycle stage factors took 2.00s" in regressions[0]
+        assert "median of 1.00s over 3 runs (+100%)" in regressions[0]
+
+
+def _run(started_at, stages):
+    from app.models.pipeline_run import PipelineRun
+
+    return PipelineRun(
+        job="fetch_cycle",
+        status="ok",
+        started_at=started_at,
+        finished_at=started_at,
+        stage_seconds=stages,
+        tickers_attempted=0,
+        tickers_succeeded=0,
+        tickers_failed=0,
+        bytes_downloaded=0,
+        rows_inserted=0,
+    )
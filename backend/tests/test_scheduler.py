@@ -0,0 +1,252 @@
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+_FACTORS = {
+    "momentum": 0.1,
+    "volume_change": 0.2,
+    "volatility": 0.3,
+    "relative_strength": 0.4,
+    "financial_ratio": 0.5,
+}
+
+# The scheduler's engine, ranker and cycle cache are swapped for scratch ones
+scheduler_engine = pytest.mark.parametrize("scratch_engine", [{"scheduler": True}], indirect=True)
+
+
+class _FlakyProvider:
+    """*provider* with the price bars of the tickers in *failing* blanked out."""
+
+    def __init__(self, provider) -> None:
+        self._provider = provider
+        self.failing: set[str] = set()
+
+    def history(self, tickers, period="30d"):
+        frame = self._provider.history(tickers, period)
+        frame.loc[:, frame.columns.get_level_values(1).isin(self.failing)] = np.nan
+        return frame
+
+    def __getattr__(self, name):
+        return getattr(self._provider, name)
+
+
+def _state(session: Session, domain: str) -> list[str]:
+    from app.services.ranking_store import run_bounds, state
+
+    bounds = session.execute(run_bounds(domain=domain)).one()
+    return [r.ticker for r in session.execute(state([tuple(bounds)])).scalars()]
+
+
+def test_refresh_membership_skips_while_a_cycle_holds_the_lock(monkeypatch):
+    from app import scheduler
+
+    calls = []
+    monkeypatch.setattr(scheduler, "_refresh_membership", lambda: calls.append(1))
+    with scheduler._cycle_lock:
+        worker = threading.Thread(target=scheduler.refresh_membership)
+        worker.start()
+        worker.join(timeout=5)
+    assert not worker.is_alive()
+    assert calls == []
+
+    scheduler.refresh_membership()
+    assert calls == [1]
+    assert not scheduler._cycle_lock.locked()
+
+
+@scheduler_engine
+@pytest.mark.parametrize("storage", ["full", "delta"])
+def test_emptied_domain_is_published_empty(scratch_engine, monkeypatch, storage):
+    from app import scheduler
+    from app.models.ranking_result import RankingResult
+    from app.models.stock import Domain, Stock
+
+    monkeypatch.setattr(settings, "ranking_storage", storage)
+    t0 = datetime(2026, 3, 10, 14, tzinfo=timezone.utc)
+    with Session(scratch_engine) as session:
+        ev, auto = Domain(name="EV"), Domain(name="Auto")
+        session.add_all([ev, auto])
+        session.flush()
+        session.add(Stock(ticker="TSLA", name="Tesla", domain_id=auto.id))
+        results = scheduler._ranker.update("EV", {"TSLA": _FACTORS})
+        scheduler._ranker.update("Auto", {})
+        scheduler._persist_rankings(session, "EV", results, {}, t0)
+        session.commit()
+        assert _state(session, "EV") == ["TSLA"]
+
+    # TSLA moved to Auto: its cached factors are re-ranked there and EV is emptied
+    scheduler._cycle_cache.history = pd.DataFrame(
+        {("Close", "TSLA"): [1.0, 2.0]}, index=pd.date_range("2026-03-09", periods=2)
+    )
+    scheduler._cycle_cache.factors = {"TSLA": dict(_FACTORS)}
+    scheduler._cycle_cache.long_term = {"TSLA": None}
+    scheduler.refresh_membership()
+
+    with Session(scratch_engine) as session:
+        assert _state(session, "EV") == []
+        assert _state(session, "Auto") == ["TSLA"]
+        # Rollups never see the tombstone
+        assert (
+            session.execute(text("SELECT count(*) FROM score_rollups WHERE ticker = ''")).scalar()
+            == 0
+        )
+
+        # Another empty run: delta storage has nothing new to record
+        later = t0 + timedelta(hours=1)
+        written = scheduler._persist_rankings(session, "EV", {}, {}, later)
+        session.commit()
+        assert written == (1 if storage == "full" else 0)
+        assert _state(session, "EV") == []
+        tombstones = session.execute(
+            select(RankingResult).where(RankingResult.domain == "EV", RankingResult.ticker == "")
+        ).scalars()
+        assert len(tombstones.all()) == (2 if storage == "full" else 1)
+
+
+def _rows(session: Session, domain: str, computed_at: datetime) -> list[tuple]:
+    from app.models.ranking_result import RankingResult
+
+    return session.execute(
+        select(RankingResult.ticker, RankingResult.rank, RankingResult.composite_score)
+        .where(RankingResult.domain == domain, RankingResult.computed_at == computed_at)
+        .order_by(RankingResult.ticker)
+    ).all()
+
+
+@scheduler_engine
+@pytest.mark.parametrize("storage", ["full", "delta"])
+def test_retry_patches_the_current_run(scratch_engine, monkeypatch, storage):
+    from app import scheduler
+    from app.models.ranking_result import RankingResult
+    from app.models.ranking_run import RankingRun
+    from app.replay import load_universe
+    from app.services import market_data
+    from app.services.market_data import ReplayProvider, synthetic_market
+    from app.services.ranking_store import run_bounds, state
+    from app.services.retry_queue import RetryQueue
+
+    monkeypatch.setattr(settings, "ranking_storage", storage)
+    panel, fundamentals, universe = synthetic_market(tickers=10, days=300, domain_size=5)
+    provider = _FlakyProvider(ReplayProvider(panel, fundamentals))
+    monkeypatch.setattr(market_data, "_provider", provider)
+    monkeypatch.setattr(scheduler, "_retry_queue", RetryQueue(base_seconds=0.0))
+    with Session(scratch_engine) as session:
+        load_universe(session, universe.to_dict("records"))
+
+    # Run 1 misses SYN00001; run 2 also misses SYN00007, so only Synthetic 001 changes
+    provider.failing = {"SYN00001"}
+    scheduler._run_local_cycle()
+    provider.failing = {"SYN00001", "SYN00007"}
+    scheduler._run_local_cycle()
+    with Session(scratch_engine) as session:
+        old, current = session.execute(select(RankingRun).order_by(RankingRun.id)).scalars()
+        old_rows = _rows(session, "Synthetic 000", old.computed_at)
+        assert len(old_rows) == 5
+        assert _rows(session, "Synthetic 000", current.computed_at) == []
+        before = (dict(current.domain_fingerprints), current.last_verified_at)
+
+    provider.failing = set()
+    scheduler.retry_failed()
+    assert {e.ticker for e in scheduler._retry_queue.pending()} & {"SYN00001", "SYN00007"} == set()
+
+    with Session(scratch_engine) as session:
+        # The older run keeps its rows; both domains are patched into the current run
+        assert _rows(session, "Synthetic 000", old.computed_at) == old_rows
+        bounds = [tuple(b) for b in session.execute(run_bounds())]
+        rows = session.execute(state(bounds)).scalars().all()
+        assert {r.computed_at for r in rows} == {current.computed_at}
+        assert len(rows) == 10
+        assert all(r.momentum is not None for r in rows if r.ticker in ("SYN00001", "SYN00007"))
+        for domain in ("Synthetic 000", "Synthetic 001"):
+            stored = session.execute(
+                select(RankingResult.keyframe).where(
+                    RankingResult.domain == domain,
+                    RankingResult.computed_at == current.computed_at,
+                )
+            ).scalars()
+            assert stored.all() == [True] * 5
+
+        run = session.get(RankingRun, current.id)
+        assert set(run.domain_fingerprints) == set(before[0])
+        assert all(run.domain_fingerprints[d] != before[0][d] for d in before[0])
+        assert run.last_verified_at > before[1]
+
+    # The next cycle sees the patched inputs and has nothing to write
+    scheduler._run_local_cycle()
+    with Session(scratch_engine) as session:
+        assert session.execute(select(func.count()).select_from(RankingRun)).scalar() == 2
+
+
+@scheduler_engine
+def test_snapshots_cover_the_current_rankings_only(scratch_engine, monkeypatch):
+    from app import scheduler
+    from app.models.daily_snapshot import DailySnapshot
+    from app.models.stock import Domain
+    from app.services.snapshot_service import snapshot_job
+
+    monkeypatch.setattr(settings, "ranking_storage", "delta")
+    t0 = datetime(2026, 3, 10, 14, tzinfo=timezone.utc)
+    runs = [
+        (t0, {"EV": {"TSLA": _FACTORS, "RIVN": {**_FACTORS, "momentum": 0.9}}, "Auto": {"F": {}}}),
+        # TSLA left EV, Auto was emptied
+        (t0 + timedelta(minutes=5), {"EV": {"RIVN": {**_FACTORS, "momentum": 0.9}}, "Auto": {}}),
+    ]
+    with Session(scratch_engine) as session:
+        session.add_all([Domain(name="EV"), Domain(name="Auto")])
+        for at, domains in runs:
+            for domain, data in domains.items():
+                results = scheduler._ranker.update(domain, data)
+                scheduler._persist_rankings(session, domain, results, {}, at)
+            session.commit()
+
+    snapshot_job(date(2026, 3, 10))
+    with Session(scratch_engine) as session:
+        snaps = session.execute(select(DailySnapshot)).scalars().all()
+        assert [(s.ticker, s.rank) for s in snaps] == [("RIVN", 1)]
+
+
+@pytest.mark.parametrize(
+    ("started", "snapshot"),
+    [
+        ((20, 0, 2), date(2024, 7, 16)),  # the post-close fire
+        ((20, 20, 0), date(2024, 7, 16)),  # the same fire, late but within its grace
+        ((21, 15, 0), None),  # any later run, e.g. a catch-up after a stall
+        ((19, 30, 1), None),  # a post-market fire before the close of the schedule
+    ],
+)
+def test_market_cycle_snapshots_after_the_post_close_fire_only(monkeypatch, started, snapshot):
+    from zoneinfo import ZoneInfo
+
+    from app import scheduler
+
+    at = datetime(2024, 7, 16, *started, tzinfo=ZoneInfo("America/New_York"))
+
+    class _Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return at.astimezone(tz)
+
+    snapshots = []
+    monkeypatch.setattr(settings, "market_sparse_minutes", 30)
+    monkeypatch.setattr(scheduler, "datetime", _Clock)
+    monkeypatch.setattr(scheduler, "fetch_cycle", lambda: None)
+    monkeypatch.setattr(scheduler, "snapshot_job", lambda snap_date: snapshots.append(snap_date))
+    scheduler.market_fetch_cycle()
+    assert snapshots == ([snapshot] if snapshot else [])
+
+
+def test_market_schedule_primes_with_a_plain_cycle(monkeypatch):
+    from app import scheduler
+
+    monkeypatch.setattr(settings, "schedule_mode", "market")
+    monkeypatch.setattr(scheduler, "_active_scheduler", None)
+    jobs = {job.id: job for job in scheduler.create_scheduler().get_jobs()}
+    assert jobs["data_fetch_prime"].func is scheduler.fetch_cycle
+    assert jobs["data_fetch"].func is scheduler.market_fetch_cycle
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from collections import deque
+
+import psycopg2
+import pytest
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+from app.services import slow_queries
+
+SLOW = text("SELECT pg_sleep(:seconds), 'ab' LIKE 'a%' AS matched")
+
+
+def _wait_for_plans(count: int) -> list[dict]:
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        entries = slow_queries.recent()
+        if (
+            sum(e["explain"] is not None or e["explain_error"] is not None for e in entries)
+            >= count
+        ):
+            return entries
+        time.sleep(0.05)
+    raise AssertionError(f"no plans in {slow_queries.recent()}")
+
+
+def test_slow_statements_are_logged_with_plans(pg_url, monkeypatch):
+    monkeypatch.setattr(settings, "slow_query_ms", 100.0)
+    monkeypatch.setattr(slow_queries, "_entries", deque(maxlen=10))
+
+    sync_engine = create_engine(pg_url.replace("postgresql+asyncpg", "postgresql+psycopg2"))
+    slow_queries.watch_slow_queries(sync_engine, "scheduler")
+    with sync_engine.connect() as conn:
+        conn.execute(text("SELECT 1"))  # fast: not logged
+        conn.execute(SLOW, {"seconds": 0.15})
+        conn.execute(SLOW, {"seconds": 0.15})  # same statement: no second plan
+
+    async_engine = create_async_engine(pg_url)
+    slow_queries.watch_slow_queries(async_engine.sync_engine, "api")
+
+    async def run_async():
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT pg_sleep(:seconds) AS napped"), {"seconds": 0.15})
+        await async_engine.dispose()
+
+    asyncio.run(run_async())
+
+    api, repeat, scheduler = _wait_for_plans(2)
+    sync_engine.dispose()
+    assert [e["engine"] for e in (api, repeat, scheduler)] == ["api", "scheduler", "scheduler"]
+    assert repeat["explain_skipped"] == "explained recently" and repeat["explain"] is None
+    for entry in (api, scheduler):
+        assert entry["duration_ms"] >= 100 and entry["analyzed"]
+        assert entry["explain_error"] is None, entry["explain_error"]
+        assert "actual time" in entry["explain"]
+    assert "$1" in api["statement"] and "0.15" in api["parameters"]
+
+
+class _RecordingCursor(psycopg2.extensions.cursor):
+    """Notes whether each statement starts inside the previous one's transaction."""
+
+    log: list[tuple[str, bool]] = []
+
+    def execute(self, query, vars=None):
+        in_transaction = self.connection.info.transaction_status != TRANSACTION_STATUS_IDLE
+        self.log.append((query.split()[0], in_transaction))
+        return super().execute(query, vars)
+
+
+def test_async_plans_prepare_and_deallocate_in_one_transaction(pg_url, monkeypatch):
+    monkeypatch.setattr(_RecordingCursor, "log", [])
+    engine = create_engine(
+        pg_url.replace("postgresql+asyncpg", "postgresql+psycopg2"),
+        connect_args={"cursor_factory": _RecordingCursor},
+    )
+    plan = slow_queries._explain(engine, "SELECT $1::int AS n", [7], True, True)
+    assert "actual time" in plan
+    # A failing EXPLAIN ANALYZE still deallocates before the rollback
+    with pytest.raises(psycopg2.errors.DivisionByZero):
+        slow_queries._explain(engine, "SELECT 1 / $1::int", [0], True, True)
+    deallocations = [
+        in_tx for statement, in_tx in _RecordingCursor.log if statement == "DEALLOCATE"
+    ]
+    assert deallocations == [True, True]
+    with engine.connect() as conn:  # the pooled connection holds no leftover statement
+        assert conn.execute(text("SELECT count(*) FROM pg_prepared_statements")).scalar() == 0
+    engine.dispose()
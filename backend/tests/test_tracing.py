@@ -0,0 +1,44 @@
+import json
+
+from opentelemetry import trace
+
+from app.services import pipeline
+from app.services.pipeline import Stage, run_pipeline
+from app.services.tracing import JsonlExporter, SampledTracerProvider
+from app.traces import format_tree, load_traces
+
+
+def test_sampled_spans_join_their_root_across_pipeline_threads(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    provider = SampledTracerProvider(1.0, JsonlExporter(path))
+    tracer = provider.get_tracer("test")
+    monkeypatch.setattr(pipeline, "tracer", provider.get_tracer("pipeline"))
+
+    with tracer.start_as_current_span("fetch_cycle", attributes={"domains": 2}):
+        run_pipeline(range(3), [Stage("double", lambda x: [x * 2], 2)])
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    root = next(s for s in spans if s["name"] == "fetch_cycle")
+    items = [s for s in spans if s["name"] == "pipeline.double"]
+    assert len(items) == 3
+    assert {s["traceId"] for s in spans} == {root["traceId"]}
+    assert {s["parentSpanId"] for s in items} == {root["spanId"]}
+    assert root["parentSpanId"] == "" and root["attributes"] == {"domains": 2}
+
+    tree = format_tree(load_traces(path)[root["traceId"]])
+    assert tree[0].startswith(f"trace {root['traceId']}") and "4 spans" in tree[0]
+    assert "fetch_cycle  domains=2" in tree[1]
+    assert sum("pipeline.double" in line for line in tree) == 3
+
+
+def test_dropped_roots_drop_their_children(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = SampledTracerProvider(0.0, JsonlExporter(path)).get_tracer("test")
+
+    with tracer.start_as_current_span("snapshot_job") as root:
+        with tracer.start_as_current_span("child") as child:
+            assert not root.is_recording() and not child.is_recording()
+            assert child.get_span_context().trace_id == root.get_span_context().trace_id
+            assert trace.get_current_span() is child
+
+    assert not path.exists()